@@ -0,0 +1,84 @@
+import asyncio
+from datetime import date
+from typing import Optional
+from loguru import logger
+from sqlalchemy import or_, update
+
+from .catalog_snapshot import publish_snapshot_sync
+from .database import engine, bump_data_version
+from .models import Subsidy
+
+def is_active_on(application_end: Optional[date], today: Optional[date] = None) -> bool:
+    """募集中かどうか（締切なし、または締切が今日以降）"""
+    return application_end is None or application_end >= (today or date.today())
+
+# 募集中フラグを最後に更新した日付
+_refreshed_on: Optional[date] = None
+_refresh_task: Optional[asyncio.Task] = None
+
+def active_flags_current() -> bool:
+    """募集中フラグが今日の日付に合っているか"""
+    return _refreshed_on == date.today()
+
+def active_condition(today: Optional[date] = None):
+    """募集中の条件（フラグの更新が終わるまでは締切日で判定、更新後は ix_subsidy_active を使う）"""
+    if active_flags_current():
+        return Subsidy.active == True
+    today = today or date.today()
+    return or_(Subsidy.application_end >= today, Subsidy.application_end == None)
+
+def refresh_active_flags(today: Optional[date] = None) -> int:
+    """募集中フラグを日付に合わせて更新
+
+    変化する行（締切を過ぎた行・再び募集中になった行）のみを ix_subsidy_active で
+    探して更新する。更新した行があればデータバージョンを進め、スナップショットを書き出す。
+    """
+    global _refreshed_on
+    today = today or date.today()
+    with engine.begin() as conn:
+        closed = conn.execute(
+            update(Subsidy)
+            .where(Subsidy.active == True, Subsidy.application_end < today)
+            .values(active=False)
+        ).rowcount
+        reopened = conn.execute(
+            update(Subsidy)
+            .where(
+                Subsidy.active == False,
+                or_(Subsidy.application_end >= today, Subsidy.application_end == None)
+            )
+            .values(active=True)
+        ).rowcount
+    _refreshed_on = today
+
+    changed = (closed or 0) + (reopened or 0)
+    if changed:
+        bump_data_version()
+        logger.info(f"募集中フラグを更新: 終了 {closed}件, 再開 {reopened}件")
+        publish_snapshot_sync()
+    return changed
+
+async def _refresh_in_background() -> int:
+    try:
+        return await asyncio.to_thread(refresh_active_flags)
+    except Exception as e:
+        logger.error(f"募集中フラグの更新に失敗: {e}")
+        return 0
+
+def schedule_active_refresh() -> asyncio.Task:
+    """バックグラウンドで募集中フラグを更新（実行中ならそのタスクを返す）"""
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.get_running_loop().create_task(_refresh_in_background())
+    return _refresh_task
+
+async def ensure_active_flags() -> None:
+    """日付が変わっていれば募集中フラグの更新を開始（深夜の定期更新より先にリクエストが来た場合用）
+
+    リクエストは更新を待たず、完了までは active_condition が締切日で判定する。
+    """
+    if active_flags_current() or (_refresh_task is not None and not _refresh_task.done()):
+        return
+    # 前日のフラグで作ったキャッシュを使わないようデータバージョンを進める
+    bump_data_version()
+    schedule_active_refresh()
@@ -1,170 +1,382 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlmodel import Session, select, or_, func
-from typing import List, Dict, Any, Optional
-from datetime import date
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Dict, Any, Optional, Union
+from datetime import date, timedelta
+import asyncio
+import base64
+import orjson
 
-from .database import get_session
+from .active_window import active_condition, active_flags_current, ensure_active_flags
+from .catalog_snapshot import check_snapshot, current_snapshot
+from .database import get_async_session, get_data_version
 from .models import Subsidy
+from .metrics import registry
+from .match_index import (
+    BATCH_CHUNK_SIZE, MatchIndex, MatchProfile, current_match_index, get_match_index, match_to_dict,
+    schedule_match_rebuild,
+)
+from .config import settings
+from .search_index import apply_keyword_search
+from .normalization import normalize_query
+from .stats import get_cached_stats
+from .response_cache import cached_response, response_cache
+from .scheduler import source_scheduler
+from .serialization import SUBSIDY_FIELDS, subsidy_columns, rows_to_dicts
+from .similar import SIMILAR_FIELDS, similar_query
+from .suggest_index import current_suggest_index, get_suggest_index, schedule_suggest_rebuild
 
-# APIルーター
-router = APIRouter()
+# APIルーター（応答前に、日付が変わっていれば募集中フラグを更新し、新しいスナップショットがあれば切り替える）
+router = APIRouter(dependencies=[Depends(ensure_active_flags), Depends(check_snapshot)])
+
+def _encode_cursor(last_id: int) -> str:
+    """カーソルを不透明な文字列に変換"""
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> int:
+    """カーソル文字列から最終IDを取得"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, value = base64.urlsafe_b64decode(padded).decode().split(":", 1)
+        if prefix != "id":
+            raise ValueError(prefix)
+        return int(value)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="カーソルが不正です")
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    """fields パラメータを検証"""
+    if not fields:
+        return list(SUBSIDY_FIELDS)
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    invalid = [f for f in selected if f not in SUBSIDY_FIELDS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"不正な項目: {', '.join(invalid)}")
+    return selected
+
+def subsidies_query(
+    selected: List[str],
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    active_only: bool = False
+):
+    """一覧取得のクエリを作成"""
+    # 必要な列のみ取得
+    query = select(*subsidy_columns(selected)).order_by(Subsidy.id)
+    if active_only:
+        query = query.where(active_condition())
+
+    if cursor is not None:
+        # キーセットページング（id > 最終ID）
+        if cursor:
+            query = query.where(Subsidy.id > _decode_cursor(cursor))
+    else:
+        # 互換用のオフセットページング
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def search_query(
+    q: Optional[str] = None,
+    organization: Optional[str] = None,
+    target: Optional[str] = None,
+    active_only: bool = False
+):
+    """検索のクエリを作成"""
+    query = select(*subsidy_columns(SUBSIDY_FIELDS))
+    
+    # キーワード検索（FTS5、利用できなければLIKE）
+    query = apply_keyword_search(query, q)
+    
+    # 交付団体フィルター
+    if organization:
+        query = query.where(Subsidy.organization == organization)
+    
+    # 対象者フィルター（正規化した列で照合）
+    target = normalize_query(target or "")
+    if target:
+        query = query.where(Subsidy.target_norm.contains(target))
+    
+    # 募集中のみ（保存済みの募集中フラグ、ix_subsidy_active）
+    if active_only:
+        query = query.where(active_condition())
+    return query
+
+def closing_soon_query(days: int, limit: int = 100, today: Optional[date] = None):
+    """締切が days 日以内の募集中の補助金を締切順に取得するクエリ（ix_subsidy_active の範囲検索）"""
+    today = today or date.today()
+    return (
+        select(*subsidy_columns(SUBSIDY_FIELDS))
+        .where(
+            active_condition(today),
+            Subsidy.application_end >= today,
+            Subsidy.application_end <= today + timedelta(days=days)
+        )
+        .order_by(Subsidy.application_end, Subsidy.id)
+        .limit(limit)
+    )
 
 @router.get("/subsidies", response_model=List[Dict[str, Any]])
 async def get_subsidies(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_session)
+    cursor: Optional[str] = Query(None, description="次ページのカーソル（X-Next-Cursor の値、空文字で先頭）"),
+    fields: Optional[str] = Query(None, description="取得する項目（カンマ区切り）"),
+    active_only: bool = Query(False, description="募集中のみ"),
+    db: AsyncSession = Depends(get_async_session)
 ):
     """補助金一覧を取得"""
-    subsidies = db.exec(select(Subsidy).offset(skip).limit(limit)).all()
-    return [subsidy.to_dict() for subsidy in subsidies]
+    selected = _parse_fields(fields)
+
+    async def build() -> Response:
+        snapshot = current_snapshot()
+        # 募集中フラグの更新中は締切日で判定するためDBから取得
+        if snapshot is not None and (not active_only or active_flags_current()):
+            # スナップショットから取得（DBを読まない）
+            page = snapshot.active_page if active_only else snapshot.page
+            if cursor is None:
+                positions = page(skip=skip, limit=limit)
+            else:
+                positions = page(after_id=_decode_cursor(cursor) if cursor else None, limit=limit)
+            response = ORJSONResponse(snapshot.records(positions, selected))
+            if positions and len(positions) == limit:
+                response.headers["X-Next-Cursor"] = _encode_cursor(snapshot.value(positions[-1], "id"))
+            return response
+
+        query = subsidies_query(selected, cursor, skip, limit, active_only)
+        rows = (await db.exec(query)).all()
+        response = ORJSONResponse(rows_to_dicts(rows, selected, query.selected_columns))
+
+        # 続きがある可能性があれば次のカーソルを返す
+        if rows and len(rows) == limit:
+            response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1].id)
+        return response
+
+    return await cached_response(request, build)
 
 @router.get("/subsidies/{subsidy_id}", response_model=Dict[str, Any])
 async def get_subsidy(
+    request: Request,
     subsidy_id: int,
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     """特定の補助金情報を取得"""
-    subsidy = db.get(Subsidy, subsidy_id)
-    if not subsidy:
-        raise HTTPException(status_code=404, detail="補助金が見つかりません")
-    return subsidy.to_dict()
+    async def build() -> Response:
+        snapshot = current_snapshot()
+        if snapshot is not None:
+            pos = snapshot.find(subsidy_id)
+            if pos is None:
+                raise HTTPException(status_code=404, detail="補助金が見つかりません")
+            return ORJSONResponse(snapshot.records([pos], SUBSIDY_FIELDS)[0])
+
+        query = select(*subsidy_columns(SUBSIDY_FIELDS)).where(Subsidy.id == subsidy_id)
+        row = (await db.exec(query)).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="補助金が見つかりません")
+        return ORJSONResponse(rows_to_dicts([row], SUBSIDY_FIELDS, query.selected_columns)[0])
+
+    return await cached_response(request, build)
+
+@router.get("/subsidies/{subsidy_id}/similar", response_model=List[Dict[str, Any]])
+async def get_similar_subsidies(
+    request: Request,
+    subsidy_id: int,
+    limit: int = Query(5, ge=1, le=settings.SIMILAR_TOP_K, description="取得件数"),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """類似する補助金を取得（取り込み後に計算済みのリスト、類似度順）"""
+    async def build() -> Response:
+        query = similar_query(subsidy_id, limit)
+        rows = (await db.exec(query)).all()
+        if not rows:
+            # 類似する補助金がないのか、補助金自体がないのかを確認
+            snapshot = current_snapshot()
+            exists = (
+                snapshot.find(subsidy_id) is not None if snapshot is not None
+                else (await db.exec(select(Subsidy.id).where(Subsidy.id == subsidy_id))).first() is not None
+            )
+            if not exists:
+                raise HTTPException(status_code=404, detail="補助金が見つかりません")
+        return ORJSONResponse(rows_to_dicts(rows, SIMILAR_FIELDS, query.selected_columns))
+
+    return await cached_response(request, build)
 
 @router.get("/search", response_model=List[Dict[str, Any]])
 async def search_subsidies(
+    request: Request,
     q: Optional[str] = Query(None, description="検索キーワード"),
     organization: Optional[str] = Query(None, description="交付団体"),
     target: Optional[str] = Query(None, description="対象者"),
     active_only: bool = Query(False, description="募集中のみ"),
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     """補助金検索API"""
-    query = select(Subsidy)
-    
-    # キーワード検索
-    if q:
-        query = query.where(
-            or_(
-                Subsidy.title.contains(q),
-                Subsidy.description.contains(q),
-                Subsidy.keywords.contains(q)
-            )
-        )
-    
-    # 交付団体フィルター
-    if organization:
-        query = query.where(Subsidy.organization == organization)
-    
-    # 対象者フィルター
-    if target:
-        query = query.where(Subsidy.target.contains(target))
-    
-    # 募集中のみ
-    if active_only:
-        today = date.today()
-        query = query.where(
-            (Subsidy.application_end >= today) | 
-            (Subsidy.application_end == None)
-        )
-    
-    # 結果取得
-    subsidies = db.exec(query).all()
-    return [subsidy.to_dict() for subsidy in subsidies]
+    async def build() -> Response:
+        query = search_query(q, organization, target, active_only)
+        
+        # 結果取得（行のタプルから直接JSONを作成）
+        rows = (await db.exec(query)).all()
+        return ORJSONResponse(rows_to_dicts(rows, SUBSIDY_FIELDS, query.selected_columns))
+
+    return await cached_response(request, build)
+
+@router.get("/suggest", response_model=List[Dict[str, Any]])
+async def suggest(
+    prefix: str = Query(..., min_length=1, max_length=100, description="入力中の文字列（前方一致）"),
+    limit: int = Query(10, ge=1, le=settings.SUGGEST_MAX_LIMIT, description="取得件数")
+):
+    """入力補完（タイトル・キーワード・交付団体・対象者の前方一致、出現数の多い順）"""
+    index = current_suggest_index()
+    if index is None:
+        index = await asyncio.to_thread(get_suggest_index)
+    elif index.version != get_data_version():
+        # 入力中の応答を待たせないよう、再構築が終わるまでは前のインデックスで返す
+        schedule_suggest_rebuild()
+    return ORJSONResponse(index.suggest(prefix, limit))
+
+@router.get("/closing-soon", response_model=List[Dict[str, Any]])
+async def get_closing_soon(
+    request: Request,
+    days: int = Query(settings.CLOSING_SOON_DAYS, ge=0, le=365, description="締切までの日数"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """締切間近の補助金（締切の早い順）"""
+    async def build() -> Response:
+        query = closing_soon_query(days, limit)
+        rows = (await db.exec(query)).all()
+        return ORJSONResponse(rows_to_dicts(rows, SUBSIDY_FIELDS, query.selected_columns))
+
+    return await cached_response(request, build)
+
+async def _match_index() -> MatchIndex:
+    """マッチングインデックス（データ更新後は再構築をバックグラウンドで行い、終わるまでは前のインデックスを使う）"""
+    index = current_match_index()
+    if index is None:
+        return await asyncio.to_thread(get_match_index)
+    if index.version != get_data_version():
+        schedule_match_rebuild()
+    return index
 
 @router.get("/match", response_model=Dict[str, Any])
 async def match_subsidies(
+    request: Request,
     business_type: Optional[str] = Query(None, description="業種"),
     prefecture: Optional[str] = Query(None, description="都道府県"),
     target_type: Optional[str] = Query(None, description="対象者タイプ"),
-    keywords: str = Query("", description="キーワード（カンマ区切り）"),
-    db: Session = Depends(get_session)
+    keywords: str = Query("", description="キーワード（カンマ区切り）")
 ):
     """補助金マッチングAPI"""
-    # 全補助金取得
-    query = select(Subsidy)
-    all_subsidies = db.exec(query).all()
-    
-    # マッチングスコア計算
-    matched_subsidies = []
-    
     # キーワードリスト作成
     keyword_list = [k.strip() for k in keywords.split(",") if k.strip()]
-    
-    for subsidy in all_subsidies:
-        score = 0
-        
-        # 地域マッチング
-        if prefecture and prefecture in subsidy.organization:
-            score += 3
-        
-        # 対象者マッチング
-        if target_type and target_type in subsidy.target:
-            score += 5
-        
-        # 業種マッチング
-        if business_type and business_type in subsidy.description:
-            score += 3
-        
-        # キーワードマッチング
-        for keyword in keyword_list:
-            if keyword in subsidy.title:
-                score += 2
-            elif keyword in subsidy.description:
-                score += 1
-            elif keyword in subsidy.keywords:
-                score += 1
+
+    index = await _match_index()
+
+    async def build() -> Response:
+        # インデックスからスコア上位を取得（全件走査しない）
+        matched_subsidies = index.match(
+            business_type=business_type,
+            prefecture=prefecture,
+            target_type=target_type,
+            keyword_list=keyword_list
+        )
         
-        if score > 0:
-            matched_subsidies.append({
-                "subsidy": subsidy,
-                "score": score
-            })
-    
-    # スコア順にソート
-    matched_subsidies.sort(key=lambda x: x["score"], reverse=True)
-    
-    # 返却
-    return {
-        "matches": [
-            {
-                "id": item["subsidy"].id,
-                "title": item["subsidy"].title,
-                "organization": item["subsidy"].organization,
-                "score": item["score"],
-                "url": item["subsidy"].url,
-                "target": item["subsidy"].target,
-                "is_active": item["subsidy"].is_active()
-            }
-            for item in matched_subsidies[:20]  # 上位20件
+        # 返却
+        return ORJSONResponse({
+            "matches": [
+                match_to_dict(row, score)
+                for row, score in matched_subsidies
+            ]
+        })
+
+    if index.version != get_data_version():
+        # 前のインデックスの結果は現在のデータバージョンでキャッシュしない
+        return await build()
+    return await cached_response(request, build)
+
+class MatchProfileRequest(BaseModel):
+    """一括マッチングの条件（/match のクエリパラメータと同じ項目）"""
+    business_type: Optional[str] = None
+    prefecture: Optional[str] = None
+    target_type: Optional[str] = None
+    keywords: Union[str, List[str]] = ""  # カンマ区切り、またはリスト
+
+    def to_profile(self) -> MatchProfile:
+        """マッチング条件に変換"""
+        keywords = self.keywords.split(",") if isinstance(self.keywords, str) else self.keywords
+        return MatchProfile(
+            business_type=self.business_type,
+            prefecture=self.prefecture,
+            target_type=self.target_type,
+            keyword_list=tuple(k.strip() for k in keywords if k.strip())
+        )
+
+class MatchBatchRequest(BaseModel):
+    """一括マッチングのリクエスト"""
+    profiles: List[MatchProfileRequest] = Field(..., max_items=settings.MATCH_BATCH_MAX_PROFILES)
+
+@router.post("/match/batch", response_model=Dict[str, Any])
+async def match_subsidies_batch(
+    body: MatchBatchRequest,
+    stream: bool = Query(False, description="NDJSON（1行1条件）で逐次返す")
+):
+    """補助金一括マッチングAPI（条件ごとに /match と同じ上位20件を返す）"""
+    profiles = [profile.to_profile() for profile in body.profiles]
+    index = await _match_index()
+
+    if stream:
+        async def lines():
+            # チャンク単位でスレッド実行し、計算済みの結果から送信する
+            for start in range(0, len(profiles), BATCH_CHUNK_SIZE):
+                chunk = profiles[start:start + BATCH_CHUNK_SIZE]
+                results = await asyncio.to_thread(index.match_batch, chunk)
+                yield b"".join(
+                    orjson.dumps({
+                        "index": start + offset,
+                        "matches": [match_to_dict(row, score) for row, score in matched]
+                    }) + b"\n"
+                    for offset, matched in enumerate(results)
+                )
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    results = await asyncio.to_thread(index.match_batch, profiles)
+    return ORJSONResponse({
+        "results": [
+            {"matches": [match_to_dict(row, score) for row, score in matched]}
+            for matched in results
         ]
-    }
+    })
 
 @router.get("/stats", response_model=Dict[str, Any])
-async def get_stats(
-    db: Session = Depends(get_session)
-):
+async def get_stats(request: Request):
     """補助金統計情報API"""
-    # 総数
-    total_count_query = select(func.count(Subsidy.id))
-    total_count = db.exec(total_count_query).one()
-    
-    # 募集中の数
-    today = date.today()
-    active_count_query = select(func.count(Subsidy.id)).where(
-        (Subsidy.application_end >= today) | 
-        (Subsidy.application_end == None)
-    )
-    active_count = db.exec(active_count_query).one()
-    
-    # 交付団体別の数
-    org_results = {}
-    orgs = db.exec(select(Subsidy.organization).distinct()).all()
-    for org in orgs:
-        org_count_query = select(func.count(Subsidy.id)).where(Subsidy.organization == org)
-        org_results[org] = db.exec(org_count_query).one()
-    
-    return {
-        "total_count": total_count,
-        "active_count": active_count,
-        "organizations": org_results
-    }
+    # データ更新があるまではキャッシュを返す
+    async def build() -> Response:
+        return ORJSONResponse(await get_cached_stats())
+
+    return await cached_response(request, build)
+
+@router.get("/scheduler/status", response_model=Dict[str, Any])
+async def get_scheduler_status():
+    """データソースごとの定期更新の状況（前回・次回の実行時刻、所要時間、書き込み件数）
+
+    他プロセスの実行も反映するためDBから読む（取り込み中の書き込みを待たないよう読み取り用エンジンを使う）。
+    """
+    runs = await source_scheduler.read_runs()
+    return ORJSONResponse(source_scheduler.status(runs))
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus のテキスト形式のメトリクス（METRICS_ENABLED=false なら404）"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@router.get("/cache/stats", response_model=Dict[str, Any])
+async def get_cache_stats():
+    """レスポンスキャッシュのヒット・ミス数"""
+    return response_cache.stats()
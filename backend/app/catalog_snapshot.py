@@ -0,0 +1,377 @@
+import asyncio
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from loguru import logger
+from sqlalchemy import case, func, select
+from sqlalchemy.engine import make_url
+
+from .config import settings
+from .database import SYNC_DATABASE_URL, bump_data_version, engine
+from .metrics import CallbackMetric, registry
+from .models import Subsidy
+
+# ファイル形式（リトルエンディアン環境を前提とする）
+#   ヘッダー: マジック, 形式バージョン, 文字列項目数, 件数, 世代（書き出し時刻ns）, 文字列ヒープのバイト数
+#   固定長の列: id(int64), 作成・更新日時(int64 マイクロ秒), 募集開始・締切(int32 序数), 募集中フラグ(uint8)
+#   文字列: 行 x 項目 ごとのオフセット(uint32) と NULL フラグ(uint8)、UTF-8 のヒープ
+MAGIC = b"SUBSNAP1"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sHHIQQ")
+ALIGNMENT = 8
+
+# 文字列として持つ列（出力用の列とマッチング用の正規化済みの列）
+STRING_COLUMNS = (
+    "title", "description", "organization", "target", "amount", "url", "keywords", "source",
+    "title_norm", "description_norm", "target_norm", "keywords_norm",
+)
+_STRING_INDEX = {name: i for i, name in enumerate(STRING_COLUMNS)}
+DATE_COLUMNS = ("application_start", "application_end")
+DATETIME_COLUMNS = ("created_at", "updated_at")
+
+_EPOCH = datetime(1, 1, 1)
+_NO_DATE = 0
+_NO_DATETIME = -1
+
+def _date_value(value: Optional[date]) -> int:
+    return value.toordinal() if value else _NO_DATE
+
+def _datetime_value(value: Optional[datetime]) -> int:
+    return (value - _EPOCH) // timedelta(microseconds=1) if value else _NO_DATETIME
+
+def _padding(size: int) -> bytes:
+    return b"\0" * (-size % ALIGNMENT)
+
+def default_snapshot_path() -> str:
+    """スナップショットの保存先（未指定ならSQLiteのDBと同じディレクトリ）"""
+    if settings.CATALOG_SNAPSHOT_PATH:
+        return settings.CATALOG_SNAPSHOT_PATH
+    url = make_url(SYNC_DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        return os.path.join(os.path.dirname(url.database), "catalog.snapshot")
+    return os.path.join("data", "catalog.snapshot")
+
+# 同じプロセス内の書き出し（取り込み後・日付の変更時）を直列にする
+_export_lock = threading.Lock()
+
+def export_snapshot(path: Optional[str] = None) -> int:
+    """DBの補助金をスナップショットに書き出す（一時ファイルに書いてから置き換える）
+
+    書き出しは1つずつ行い、後から置き換えるファイルが必ず新しいDBの内容になるようにする。
+    """
+    with _export_lock:
+        return _write_snapshot(path or default_snapshot_path())
+
+def _write_snapshot(path: str) -> int:
+    columns = ["id", "active"] + list(DATETIME_COLUMNS) + list(DATE_COLUMNS) + list(STRING_COLUMNS)
+
+    ids = array("q")
+    created = array("q")
+    updated = array("q")
+    starts = array("i")
+    ends = array("i")
+    active = bytearray()
+    offsets = array("I", [0])
+    nulls = bytearray()
+    heap = bytearray()
+
+    with engine.connect() as conn:
+        result = conn.execute(select(*(getattr(Subsidy, name) for name in columns)).order_by(Subsidy.id))
+        for row in result:
+            ids.append(row[0])
+            active.append(1 if row[1] else 0)
+            created.append(_datetime_value(row[2]))
+            updated.append(_datetime_value(row[3]))
+            starts.append(_date_value(row[4]))
+            ends.append(_date_value(row[5]))
+            for value in row[6:]:
+                nulls.append(value is None)
+                if value:
+                    heap += value.encode("utf-8")
+                offsets.append(len(heap))
+                # uint32 のオフセットで表せる範囲を超えた場合は書き出さない
+                if len(heap) > 0xFFFFFFFF:
+                    raise ValueError("スナップショットの文字列が大きすぎます")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # 一時ファイル名は書き出しごとに一意（他のワーカーの書き出しと混ざらない）
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    generation = time.time_ns()
+    try:
+        with os.fdopen(fd, "wb") as f:
+            os.fchmod(f.fileno(), 0o644)
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(STRING_COLUMNS), len(ids), generation, len(heap)))
+            for section in (ids, created, updated, starts, ends, offsets, active, nulls):
+                data = section.tobytes() if isinstance(section, array) else bytes(section)
+                f.write(data)
+                f.write(_padding(len(data)))
+            f.write(heap)
+            f.flush()
+            os.fsync(f.fileno())
+        # 読み込み中のワーカーは古いファイルを開いたまま使い続けられる
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    logger.info(f"カタログスナップショットを書き出し: {len(ids)}件, {os.path.getsize(path)}バイト")
+    return len(ids)
+
+class CatalogSnapshot:
+    """mmap したスナップショット（読み取り専用）
+
+    ページはプロセス間で共有され、値は参照した行・項目の分だけ Python のオブジェクトにする。
+    行は id 順に並び、id の検索・キーセットページングは二分探索で行う。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, version, string_count, count, generation, heap_size = HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION or string_count != len(STRING_COLUMNS):
+            raise ValueError(f"スナップショットの形式が異なります: {path}")
+        self.generation = generation
+        self._count = count
+
+        offset = HEADER.size
+
+        def section(length: int, fmt: str) -> memoryview:
+            nonlocal offset
+            data = view[offset:offset + length].cast(fmt)
+            offset += length + (-length % ALIGNMENT)
+            return data
+
+        self.ids = section(8 * count, "q")
+        self._created = section(8 * count, "q")
+        self._updated = section(8 * count, "q")
+        self._starts = section(4 * count, "i")
+        self._ends = section(4 * count, "i")
+        self._offsets = section(4 * (count * len(STRING_COLUMNS) + 1), "I")
+        self._active = section(count, "B")
+        self._nulls = section(count * len(STRING_COLUMNS), "B")
+        self._heap = view[offset:offset + heap_size]
+        self._heap_start = offset
+        if len(self._heap) != heap_size:
+            raise ValueError(f"スナップショットが途中までしかありません: {path}")
+
+        # 出力項目 -> 値の取得関数
+        self._getters: Dict[str, Callable[[int], Any]] = {
+            "id": self.ids.__getitem__,
+            "is_active": lambda pos: self._active[pos] == 1,
+            "application_start": lambda pos: self._date(self._starts[pos]),
+            "application_end": lambda pos: self._date(self._ends[pos]),
+            "created_at": lambda pos: self._datetime(self._created[pos]),
+            "updated_at": lambda pos: self._datetime(self._updated[pos]),
+        }
+        for i, name in enumerate(STRING_COLUMNS):
+            self._getters[name] = self._string_getter(i)
+
+    def __len__(self) -> int:
+        return self._count
+
+    @staticmethod
+    def _date(value: int) -> Optional[date]:
+        return date.fromordinal(value) if value != _NO_DATE else None
+
+    @staticmethod
+    def _datetime(value: int) -> Optional[datetime]:
+        return _EPOCH + timedelta(microseconds=value) if value != _NO_DATETIME else None
+
+    def _string_getter(self, column: int) -> Callable[[int], Optional[str]]:
+        width = len(STRING_COLUMNS)
+        offsets, nulls, heap = self._offsets, self._nulls, self._heap
+
+        def get(pos: int) -> Optional[str]:
+            i = pos * width + column
+            if nulls[i]:
+                return None
+            return str(heap[offsets[i]:offsets[i + 1]], "utf-8")
+
+        return get
+
+    def contains(self, name: str, text: str) -> Callable[[int], bool]:
+        """行番号 -> 文字列の列 name が text を含むか（文字列を作らずに mmap 上の UTF-8 のまま検索）"""
+        width = len(STRING_COLUMNS)
+        column = _STRING_INDEX[name]
+        offsets, nulls, find, base = self._offsets, self._nulls, self._mmap.find, self._heap_start
+        needle = text.encode("utf-8")
+
+        def contains(pos: int) -> bool:
+            i = pos * width + column
+            return not nulls[i] and find(needle, base + offsets[i], base + offsets[i + 1]) != -1
+
+        return contains
+
+    def fingerprint(self) -> Tuple[int, int, int, int]:
+        """(件数, 最大ID, 募集中の件数, 最終更新日時) の組（DBとの照合用）"""
+        if not self._count:
+            return (0, 0, 0, _NO_DATETIME)
+        return (self._count, self.ids[-1], sum(self._active), max(self._updated))
+
+    def value(self, pos: int, name: str) -> Any:
+        """pos 行目の項目（出力項目名、または STRING_COLUMNS の列名）"""
+        return self._getters[name](pos)
+
+    def find(self, subsidy_id: int) -> Optional[int]:
+        """id の行番号（なければ None）"""
+        pos = bisect_left(self.ids, subsidy_id)
+        if pos < self._count and self.ids[pos] == subsidy_id:
+            return pos
+        return None
+
+    def page(self, after_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> range:
+        """一覧の行番号（after_id 指定時はキーセット、それ以外はオフセット）"""
+        start = bisect_right(self.ids, after_id) if after_id is not None else max(skip, 0)
+        stop = self._count if limit < 0 else min(start + limit, self._count)
+        return range(start, max(start, stop))
+
+    def active_page(self, after_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> List[int]:
+        """募集中の行のみの一覧の行番号（保存済みの募集中フラグで判定）"""
+        start = bisect_right(self.ids, after_id) if after_id is not None else 0
+        skip = 0 if after_id is not None else max(skip, 0)
+        active = self._active
+        positions: List[int] = []
+        for pos in range(start, self._count):
+            if not active[pos]:
+                continue
+            if skip:
+                skip -= 1
+                continue
+            if 0 <= limit <= len(positions):
+                break
+            positions.append(pos)
+        return positions
+
+    def records(self, positions: Sequence[int], fields: Sequence[str]) -> List[Dict[str, Any]]:
+        """行番号の項目の辞書（serialization.rows_to_dicts と同じ形式）"""
+        getters = [(field, self._getters[field]) for field in fields]
+        return [{field: get(pos) for field, get in getters} for pos in positions]
+
+# 現在のスナップショットと、そのファイルの識別情報（inode, 更新時刻, サイズ）
+_snapshot: Optional[CatalogSnapshot] = None
+_file_key: Optional[Tuple[int, int, int]] = None
+_checked_at = 0.0
+_reload_lock = threading.Lock()
+
+def current_snapshot() -> Optional[CatalogSnapshot]:
+    """読み込み済みのスナップショット（無効・未作成なら None、呼び出し元はDBを使う）"""
+    return _snapshot if settings.CATALOG_SNAPSHOT_ENABLED else None
+
+def reload_snapshot(path: Optional[str] = None) -> bool:
+    """ファイルが置き換わっていれば開き直す（切り替えたらデータバージョンを進める）
+
+    他のワーカーが書き出した場合もここで検知し、キャッシュ・マッチングインデックスを更新させる。
+    古いスナップショットは参照がなくなった時点で解放される（使用中のリクエストはそのまま読める）。
+    """
+    if not settings.CATALOG_SNAPSHOT_ENABLED:
+        return False
+    with _reload_lock:
+        return _reload(path or default_snapshot_path())
+
+def _reload(path: str) -> bool:
+    global _snapshot, _file_key
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return False
+    key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if key == _file_key:
+        return False
+
+    try:
+        snapshot = CatalogSnapshot(path)
+    except (OSError, ValueError) as e:
+        logger.error(f"カタログスナップショットを開けません: {e}")
+        return False
+    _file_key = key
+    if _snapshot is not None and _snapshot.generation == snapshot.generation:
+        return False
+    _snapshot = snapshot
+    bump_data_version()
+    logger.info(f"カタログスナップショットを切り替え: {len(snapshot)}件")
+    return True
+
+def db_fingerprint() -> Tuple[int, int, int, int]:
+    """DBの (件数, 最大ID, 募集中の件数, 最終更新日時) の組"""
+    with engine.connect() as conn:
+        count, max_id, active, updated_at = conn.execute(select(
+            func.count(Subsidy.id),
+            func.max(Subsidy.id),
+            func.sum(case((Subsidy.active == True, 1), else_=0)),
+            func.max(Subsidy.updated_at),
+        )).one()
+    return (count, max_id or 0, active or 0, _datetime_value(updated_at))
+
+def open_existing_snapshot() -> bool:
+    """起動時に前回のスナップショットを開く
+
+    停止中にDBだけが変わった場合（復元・手動の更新など）は使わず、初期データ取得後の書き出しを待つ。
+    """
+    global _snapshot
+    if not reload_snapshot():
+        return False
+    if _snapshot.fingerprint() != db_fingerprint():
+        logger.warning("カタログスナップショットがDBと一致しないため、書き出し直すまでDBから読み取ります")
+        _snapshot = None
+        bump_data_version()
+        return False
+    return True
+
+async def check_snapshot() -> None:
+    """新しいスナップショットがあれば切り替え（CATALOG_SNAPSHOT_CHECK_SECONDS ごとに確認）"""
+    global _checked_at
+    if not settings.CATALOG_SNAPSHOT_ENABLED:
+        return
+    now = time.monotonic()
+    if now - _checked_at < settings.CATALOG_SNAPSHOT_CHECK_SECONDS:
+        return
+    _checked_at = now
+    reload_snapshot()
+
+def publish_snapshot_sync() -> bool:
+    """スナップショットを書き出して切り替え（失敗した場合は古いスナップショットを捨ててDBから読む）"""
+    global _snapshot
+    if not settings.CATALOG_SNAPSHOT_ENABLED:
+        return False
+    try:
+        export_snapshot()
+    except (OSError, ValueError) as e:
+        logger.error(f"カタログスナップショットの書き出しに失敗、DBから読み取ります: {e}")
+        with _reload_lock:
+            if _snapshot is not None:
+                _snapshot = None
+                bump_data_version()
+        return False
+    return reload_snapshot()
+
+async def publish_snapshot() -> bool:
+    """データ更新後にスナップショットを書き出して切り替え"""
+    return await asyncio.to_thread(publish_snapshot_sync)
+
+def snapshot_is_current() -> bool:
+    """最新のスナップショット（他のワーカーが書き出したものを含む）がDBと一致するか"""
+    reload_snapshot()
+    snapshot = current_snapshot()
+    return snapshot is not None and snapshot.fingerprint() == db_fingerprint()
+
+async def publish_snapshot_if_stale() -> bool:
+    """スナップショットがない・DBと一致しない場合のみ書き出す（起動時、ワーカーごとに書き出し直さない）"""
+    if not settings.CATALOG_SNAPSHOT_ENABLED or await asyncio.to_thread(snapshot_is_current):
+        return False
+    return await publish_snapshot()
+
+registry.register(CallbackMetric(
+    "catalog_snapshot_rows", "読み込み済みのカタログスナップショットの件数",
+    lambda: {(): len(_snapshot)} if _snapshot is not None else {}
+))
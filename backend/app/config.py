@@ -18,6 +18,45 @@ class Settings(BaseSettings):
     # データベース
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///../../data/subsidies.db")
 
+    # SQLiteの接続設定（接続ごとに適用するPRAGMA）
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # バイト
+    SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # 負数はKiB単位
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+    # 読み取り用エンジンの接続プール
+    DB_READ_POOL_SIZE: int = int(os.getenv("DB_READ_POOL_SIZE", "2"))
+    DB_READ_MAX_OVERFLOW: int = int(os.getenv("DB_READ_MAX_OVERFLOW", "0"))
+
+    # APIレスポンスキャッシュ
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+    RESPONSE_CACHE_TTL_SECONDS: float = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+    HTTP_CACHE_MAX_AGE: int = int(os.getenv("HTTP_CACHE_MAX_AGE", "60"))  # Cache-Control の max-age（秒）
+
+    # メトリクス（/api/metrics、リクエストごとの処理時間・SQLクエリ数の計測）
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # カタログスナップショット（取り込み後に書き出し、各ワーカーが mmap して一覧・詳細・マッチングに使う）
+    CATALOG_SNAPSHOT_ENABLED: bool = os.getenv("CATALOG_SNAPSHOT_ENABLED", "true").lower() == "true"
+    CATALOG_SNAPSHOT_PATH: str = os.getenv("CATALOG_SNAPSHOT_PATH", "")  # 空ならDBと同じディレクトリ
+    CATALOG_SNAPSHOT_CHECK_SECONDS: float = float(os.getenv("CATALOG_SNAPSHOT_CHECK_SECONDS", "1"))  # 置き換えの確認間隔
+
+    # 締切間近とみなす日数（/api/closing-soon の既定値）
+    CLOSING_SOON_DAYS: int = int(os.getenv("CLOSING_SOON_DAYS", "14"))
+
+    # 類似する補助金（取り込み後に文字n-gramのTF-IDFで計算して保存）
+    SIMILAR_TOP_K: int = int(os.getenv("SIMILAR_TOP_K", "10"))
+    SIMILAR_BATCH_SIZE: int = int(os.getenv("SIMILAR_BATCH_SIZE", "128"))  # 1回の行列積に含める補助金数
+    SIMILAR_FULL_REBUILD_RATIO: float = float(os.getenv("SIMILAR_FULL_REBUILD_RATIO", "0.2"))  # 変更がこの割合を超えたら全件を再計算
+
+    # 入力補完（/api/suggest）で返す件数の上限（語の頭文字ごとに上位をこの件数まで事前計算する）
+    SUGGEST_MAX_LIMIT: int = int(os.getenv("SUGGEST_MAX_LIMIT", "20"))
+
+    # 一括マッチングで受け付ける条件数の上限
+    MATCH_BATCH_MAX_PROFILES: int = int(os.getenv("MATCH_BATCH_MAX_PROFILES", "10000"))
+
     # jGrants API
     JGRANTS_API_URL: str = os.getenv(
         "JGRANTS_API_URL", 
@@ -31,6 +70,46 @@ class Settings(BaseSettings):
     )
     SCRAPE_INTERVAL_HOURS: int = int(os.getenv("SCRAPE_INTERVAL_HOURS", "24"))
 
+    # 定期更新のスケジューラ（既定では本番環境のみ有効）
+    SCHEDULER_ENABLED: bool = os.getenv(
+        "SCHEDULER_ENABLED", "true" if os.getenv("APP_ENV") == "production" else "false"
+    ).lower() == "true"
+    JGRANTS_INTERVAL_HOURS: float = float(os.getenv("JGRANTS_INTERVAL_HOURS", str(SCRAPE_INTERVAL_HOURS)))
+    TOKYO_INTERVAL_HOURS: float = float(os.getenv("TOKYO_INTERVAL_HOURS", str(SCRAPE_INTERVAL_HOURS)))
+    SCHEDULER_JITTER_SECONDS: float = float(os.getenv("SCHEDULER_JITTER_SECONDS", "300"))  # 複数台で開始をずらす幅
+    SCHEDULER_RETRY_SECONDS: float = float(os.getenv("SCHEDULER_RETRY_SECONDS", "600"))  # 失敗時の再実行まで
+    SCHEDULER_POLL_SECONDS: float = float(os.getenv("SCHEDULER_POLL_SECONDS", "300"))  # 実行記録の再確認間隔
+
+    # 詳細ページのクロール設定
+    CRAWL_DETAILS: bool = os.getenv("CRAWL_DETAILS", "true").lower() == "true"
+    CRAWL_CONCURRENCY: int = int(os.getenv("CRAWL_CONCURRENCY", "8"))
+    CRAWL_HOST_RATE: float = float(os.getenv("CRAWL_HOST_RATE", "20"))  # ホストごとの秒間リクエスト数
+    CRAWL_MAX_RETRIES: int = int(os.getenv("CRAWL_MAX_RETRIES", "3"))
+    CRAWL_BACKOFF_SECONDS: float = float(os.getenv("CRAWL_BACKOFF_SECONDS", "0.5"))
+    CRAWL_CACHE_DIR: str = os.getenv("CRAWL_CACHE_DIR", "cache/crawl")
+    CRAWL_CACHE_TTL_HOURS: float = float(os.getenv("CRAWL_CACHE_TTL_HOURS", "24"))
+
+    # HTTPクライアント設定（全データソースで共有）
+    HTTP2: bool = os.getenv("HTTP2", "false").lower() == "true"
+    HTTP_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+    # データソースごとの更新タイムアウト（秒）
+    SOURCE_TIMEOUT_SECONDS: float = float(os.getenv("SOURCE_TIMEOUT_SECONDS", "300"))
+
+    # 一括登録のチャンクサイズ
+    BULK_CHUNK_SIZE: int = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+
+    # jGrants APIのページング
+    JGRANTS_PAGE_SIZE: int = int(os.getenv("JGRANTS_PAGE_SIZE", "100"))
+    JGRANTS_MAX_PAGES: int = int(os.getenv("JGRANTS_MAX_PAGES", "1000"))
+
+    # 取り込みバッチ（件数・書き込み待ちのバッチ数上限）
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+    INGEST_QUEUE_SIZE: int = int(os.getenv("INGEST_QUEUE_SIZE", "2"))
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import defaultdict
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from loguru import logger
+
+from .config import settings
+from .http_client import get_http_client
+from .parsers import parse_tokyo_detail_html
+
+# 再試行するHTTPステータス
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class HostRateLimiter:
+    """ホストごとのリクエスト間隔を制限"""
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next_allowed: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def wait(self, host: str):
+        """次のリクエストが許可されるまで待機"""
+        if not self.interval:
+            return
+        async with self._locks[host]:
+            now = time.monotonic()
+            next_allowed = self._next_allowed.get(host, now)
+            if next_allowed > now:
+                await asyncio.sleep(next_allowed - now)
+            self._next_allowed[host] = max(now, next_allowed) + self.interval
+
+class CrawlCache:
+    """詳細ページの取得結果（本文）のディスクキャッシュ（APIの response_cache とは別）"""
+
+    def __init__(self, directory: str, ttl_seconds: float):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".html")
+
+    def get(self, url: str) -> Optional[bytes]:
+        """有効期限内のキャッシュを取得"""
+        path = self._path(url)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set(self, url: str, content: bytes):
+        """キャッシュを保存（一時ファイル経由で置き換え）"""
+        path = self._path(url)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+class DetailCrawler:
+    """補助金詳細ページのクローラー
+
+    同時実行数（Semaphore）、ホストごとのレート制限、指数バックオフでの再試行、
+    ディスクキャッシュを備える。
+    """
+
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        concurrency: Optional[int] = None,
+        host_rate: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff_seconds: Optional[float] = None,
+        cache: Optional[CrawlCache] = None
+    ):
+        self.client = client or get_http_client()
+        self.semaphore = asyncio.Semaphore(concurrency or settings.CRAWL_CONCURRENCY)
+        self.rate_limiter = HostRateLimiter(settings.CRAWL_HOST_RATE if host_rate is None else host_rate)
+        self.max_retries = settings.CRAWL_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_seconds = settings.CRAWL_BACKOFF_SECONDS if backoff_seconds is None else backoff_seconds
+        self.cache = cache if cache is not None else CrawlCache(
+            settings.CRAWL_CACHE_DIR, settings.CRAWL_CACHE_TTL_HOURS * 3600
+        )
+
+    async def fetch(self, url: str) -> Optional[bytes]:
+        """詳細ページを取得（キャッシュ優先）"""
+        cached = self.cache.get(url)
+        if cached is not None:
+            return cached
+
+        host = urlsplit(url).netloc
+        async with self.semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self.rate_limiter.wait(host)
+                try:
+                    response = await self.client.get(url)
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        response.raise_for_status()
+                        self.cache.set(url, response.content)
+                        return response.content
+                    error = f"HTTP {response.status_code}"
+                except httpx.TransportError as e:
+                    error = str(e) or type(e).__name__
+                except httpx.HTTPStatusError as e:
+                    logger.warning(f"詳細ページの取得に失敗: {url} ({e.response.status_code})")
+                    return None
+
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.backoff_seconds * (2 ** attempt))
+
+        logger.warning(f"詳細ページの取得に失敗（{self.max_retries}回再試行）: {url} ({error})")
+        return None
+
+    async def crawl_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """1件の詳細ページを取得して項目を補完"""
+        url = item.get("url")
+        if not url:
+            return item
+        content = await self.fetch(url)
+        if not content:
+            return item
+        detail = await asyncio.to_thread(parse_tokyo_detail_html, content)
+        return {**item, **detail}
+
+    async def crawl(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """全件の詳細ページを取得して項目を補完"""
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self.crawl_item(item) for item in items))
+        enriched = sum(1 for before, after in zip(items, results) if before is not after)
+        logger.info(f"詳細ページを取得: {enriched}/{len(items)}件（{time.perf_counter() - started:.1f}秒）")
+        return list(results)
+
+async def crawl_tokyo_details(
+    items: List[Dict[str, Any]],
+    client: Optional[httpx.AsyncClient] = None
+) -> List[Dict[str, Any]]:
+    """東京都の補助金一覧に詳細ページの項目（対象者・金額・申請期間）を補完"""
+    if not items:
+        return items
+    return await DetailCrawler(client=client).crawl(items)
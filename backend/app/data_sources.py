@@ -1,198 +1,444 @@
 import httpx
 import asyncio
-from bs4 import BeautifulSoup
+import hashlib
+import json
+import time
+from contextvars import ContextVar
 from datetime import datetime, date
 from loguru import logger
-from typing import List, Dict, Any, Optional
-from sqlmodel import Session, select
-import dateutil.parser
+from typing import List, Dict, Any, Optional, Callable, Awaitable, AsyncIterator
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from .config import settings
-from .models import Subsidy
-from .database import engine
-
-async def fetch_jgrants_data() -> Optional[List[Dict[str, Any]]]:
-    """jGrants APIからデータ取得"""
+from .models import Subsidy, SourceState
+from .catalog_snapshot import publish_snapshot
+from .database import async_engine, bump_data_version
+from .match_index import rebuild_match_index
+from .suggest_index import rebuild_suggest_index
+from .http_client import get_http_client
+from .normalization import normalized_columns
+from .similar import refresh_similar_subsidies
+from .active_window import is_active_on
+from .metrics import record_fetched, record_ingest
+
+class SourceFetchError(Exception):
+    """データソースの取得に失敗（失敗までに書き込んだ行は残す）"""
+
+# 実行中のソースでコミット済みの件数 [件数]（run_source が設定し、bulk_upsert_subsidies が加算する）
+_written_rows: ContextVar[Optional[List[int]]] = ContextVar("written_rows", default=None)
+
+async def load_source_validators(prefix: str) -> Dict[str, Dict[str, Any]]:
+    """保存済みのバリデータを取得（key が prefix で始まるもの）"""
+    async with AsyncSession(async_engine) as session:
+        states = (await session.exec(
+            select(SourceState).where(
+                (SourceState.key == prefix) | SourceState.key.startswith(f"{prefix}:")
+            )
+        )).all()
+        return {state.key: state.dict() for state in states}
+
+async def save_source_validators(validators: Dict[str, Dict[str, Any]]):
+    """バリデータを保存"""
+    if not validators:
+        return
+    async with AsyncSession(async_engine) as session:
+        for key, values in validators.items():
+            await session.merge(SourceState(**dict(values, key=key)))
+        await session.commit()
+
+def _conditional_headers(validator: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """If-None-Match / If-Modified-Since ヘッダーを作成"""
+    headers = {}
+    if validator:
+        if validator.get("etag"):
+            headers["If-None-Match"] = validator["etag"]
+        if validator.get("last_modified"):
+            headers["If-Modified-Since"] = validator["last_modified"]
+    return headers
+
+def _new_validator(response: httpx.Response, digest: str, item_count: int = 0, next_url: Optional[str] = None) -> Dict[str, Any]:
+    """レスポンスからバリデータを作成"""
+    return {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_sha256": digest,
+        "item_count": item_count,
+        "next_url": next_url,
+        "checked_at": datetime.now()
+    }
+
+async def iter_jgrants_pages(
+    client: Optional[httpx.AsyncClient] = None,
+    validators: Optional[Dict[str, Dict[str, Any]]] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """jGrants APIをページ単位で取得（async generator）
+
+    validators を渡すとページごとに条件付きリクエストを送り、
+    304 または本文ハッシュが前回と同じページは解析せずに読み飛ばす。
+    validators は取得結果で上書きされる（保存は呼び出し側で行う）。
+    """
+    client = client or get_http_client()
     url = settings.JGRANTS_API_URL
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers={"Accept": "application/json"})
-
-            if response.status_code == 200:
-                data = response.json()
-                logger.info(f"jGrants APIから{len(data.get('data', []))}件の補助金情報を取得")
-                return data.get("data", [])
+    page_size = settings.JGRANTS_PAGE_SIZE
+    params: Optional[Dict[str, Any]] = {"page": 1, "per_page": page_size}
+
+    for page in range(1, settings.JGRANTS_MAX_PAGES + 1):
+        key = f"jgrants:{page}"
+        previous = validators.get(key) if validators is not None else None
+        headers = {"Accept": "application/json", **_conditional_headers(previous)}
+        response = await client.get(url, params=params, headers=headers)
+
+        if response.status_code == 304 and previous:
+            # 変更なし: 前回の件数・次ページで継続判定
+            logger.debug(f"jGrants APIの{page}ページ目は変更なし（304）")
+            item_count, next_url = previous["item_count"], previous["next_url"]
+            validators[key] = dict(previous, checked_at=datetime.now())
+        elif response.status_code != 200:
+            raise SourceFetchError(f"ステータス {response.status_code}（{page}ページ目）")
+        else:
+            digest = hashlib.sha256(response.content).hexdigest()
+            if previous and previous["content_sha256"] == digest:
+                # 本文が同じなら解析しない
+                logger.debug(f"jGrants APIの{page}ページ目は変更なし（ハッシュ一致）")
+                item_count, next_url = previous["item_count"], previous["next_url"]
             else:
-                logger.error(f"jGrants API エラー: {response.status_code}")
-                return None
-    except Exception as e:
-        logger.error(f"jGrants API 取得エラー: {e}")
-        return None
+                payload = response.json()
+                items = payload.get("data", [])
+                item_count, next_url = len(items), payload.get("next")
+                logger.debug(f"jGrants APIから{page}ページ目を取得: {item_count}件")
+                if items:
+                    yield items
+            if validators is not None:
+                validators[key] = _new_validator(response, digest, item_count, next_url)
+
+        # 次ページ: next リンクがあれば優先、なければページ番号を進める
+        if next_url:
+            url, params = next_url, None
+        elif item_count < page_size:
+            return
+        else:
+            params = {"page": page + 1, "per_page": page_size}
+
+    logger.warning(f"jGrants APIの取得を{settings.JGRANTS_MAX_PAGES}ページで打ち切りました")
+
+async def iter_jgrants_batches(
+    batch_size: Optional[int] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    validators: Optional[Dict[str, Dict[str, Any]]] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """jGrantsのデータを固定件数のバッチで取得"""
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    batch: List[Dict[str, Any]] = []
+    async for items in iter_jgrants_pages(client, validators):
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
 
 def parse_date(date_str: Optional[str]) -> Optional[date]:
     """日付文字列をパース"""
     if not date_str:
         return None
+    import dateutil.parser  # 取り込み時のみ使用（起動時に読み込まない）
+
     try:
         return dateutil.parser.parse(date_str).date()
     except (ValueError, TypeError):
         return None
 
-async def update_jgrants_subsidies() -> int:
-    """jGrantsデータ取得・DB更新"""
-    data = await fetch_jgrants_data()
-    if not data:
-        logger.warning("更新するデータがありません")
-        return 0
-
-    updated_count = 0
-    added_count = 0
-
-    with Session(engine) as session:
-        for item in data:
-            # 既存データ確認
-            subsidy = session.exec(select(Subsidy).where(
-                Subsidy.source == "jgrants",
-                Subsidy.url == item.get("url", "")
-            )).first()
-
-            # 基本データ準備
-            subsidy_data = {
-                "title": item.get("title", ""),
-                "description": item.get("description", ""),
-                "organization": item.get("organization", "国"),
-                "target": item.get("target", ""),
-                "amount": item.get("amount", ""),
-                "application_start": parse_date(item.get("application_start")),
-                "application_end": parse_date(item.get("application_end")),
-                "url": item.get("url", ""),
-                "keywords": ",".join(item.get("keywords", [])) if isinstance(item.get("keywords", []), list) else item.get("keywords", ""),
-                "source": "jgrants",
-                "updated_at": datetime.now()
-            }
-
-            if subsidy:
-                # 既存レコード更新
-                for key, value in subsidy_data.items():
-                    setattr(subsidy, key, value)
-                updated_count += 1
+# 内容ハッシュの対象列
+CONTENT_FIELDS = (
+    "title", "description", "organization", "target", "amount",
+    "application_start", "application_end", "url", "keywords",
+)
+
+def content_hash(row: Dict[str, Any]) -> str:
+    """補助金内容のハッシュを計算（変更検知用）"""
+    payload = json.dumps(
+        [row.get(field) for field in CONTENT_FIELDS],
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _upsert_statement(dialect: str, columns: List[str]):
+    """(source, url) で衝突したら更新する INSERT 文を作成"""
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(Subsidy)
+    update_columns = [c for c in columns if c not in ("source", "url", "created_at")]
+    return stmt.on_conflict_do_update(
+        index_elements=["source", "url"],
+        set_={c: stmt.excluded[c] for c in update_columns}
+    )
+
+def existing_hashes_query(source: str, urls: List[str]):
+    """既存行の (url, content_hash) を取得するクエリ（ix_subsidy_source_url を使用）"""
+    return select(Subsidy.url, Subsidy.content_hash).where(
+        Subsidy.source == source,
+        Subsidy.url.in_(urls)
+    )
+
+async def bulk_upsert_subsidies(source: str, items: List[Dict[str, Any]]) -> Dict[str, int]:
+    """補助金を一括登録・更新（内容が変わらない行は書き込まない）
+
+    データバージョンは進めない（取り込み1回の書き込みが終わってから呼び出し側で進める）。
+    """
+    counts = {"added": 0, "updated": 0, "unchanged": 0}
+    if not items:
+        return counts
+
+    # 同一URLは後勝ち
+    today = date.today()
+    rows: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        row = dict(item, source=source)
+        row["content_hash"] = content_hash(row)
+        # 検索・マッチング用の正規化済みの列
+        row.update(normalized_columns(row))
+        # 募集中フラグ（以降は日付の変更時に refresh_active_flags で更新）
+        row["active"] = is_active_on(row.get("application_end"), today)
+        rows[row["url"]] = row
+
+    now = datetime.now()
+    async with AsyncSession(async_engine) as session:
+        # 対象URLの既存 (url -> content_hash) をチャンクごとに1クエリで取得
+        urls = list(rows)
+        existing: Dict[str, str] = {}
+        chunk_size = settings.BULK_CHUNK_SIZE
+        for i in range(0, len(urls), chunk_size):
+            existing.update((await session.exec(
+                existing_hashes_query(source, urls[i:i + chunk_size])
+            )).all())
+
+        pending = []
+        for url, row in rows.items():
+            if url not in existing:
+                counts["added"] += 1
+            elif existing[url] != row["content_hash"]:
+                counts["updated"] += 1
             else:
-                # 新規レコード作成
-                new_subsidy = Subsidy(**subsidy_data)
-                session.add(new_subsidy)
-                added_count += 1
+                counts["unchanged"] += 1
+                continue
+            pending.append(dict(row, created_at=now, updated_at=now))
+
+        # 列構成ごとにチャンク単位で executemany
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in pending:
+            groups.setdefault(tuple(row), []).append(row)
+        for columns, group in groups.items():
+            stmt = _upsert_statement(async_engine.dialect.name, list(columns))
+            for i in range(0, len(group), chunk_size):
+                await session.execute(stmt, group[i:i + chunk_size])
+        if pending:
+            await session.commit()
+            written = _written_rows.get()
+            if written is not None:
+                written[0] += len(pending)
+
+    return counts
+
+def _jgrants_row(item: Dict[str, Any]) -> Dict[str, Any]:
+    """jGrantsのデータをSubsidyの列に変換"""
+    keywords = item.get("keywords", [])
+    return {
+        "title": item.get("title", ""),
+        "description": item.get("description", ""),
+        "organization": item.get("organization", "国"),
+        "target": item.get("target", ""),
+        "amount": item.get("amount", ""),
+        "application_start": parse_date(item.get("application_start")),
+        "application_end": parse_date(item.get("application_end")),
+        "url": item.get("url", ""),
+        "keywords": ",".join(keywords) if isinstance(keywords, list) else keywords,
+    }
+
+async def update_jgrants_subsidies(client: Optional[httpx.AsyncClient] = None) -> int:
+    """jGrantsデータ取得・DB更新（ページ取得とDB書き込みを並行実行）"""
+    counts = {"added": 0, "updated": 0, "unchanged": 0}
+    fetched = 0
+    error: Optional[Exception] = None
+
+    # 前回のバリデータ（条件付きリクエスト用）
+    validators = await load_source_validators("jgrants")
+
+    # 取得側と書き込み側をキューでつなぎ、メモリ上のバッチ数を制限する
+    queue: asyncio.Queue = asyncio.Queue(maxsize=settings.INGEST_QUEUE_SIZE)
+
+    async def produce():
+        nonlocal error
+        try:
+            async for batch in iter_jgrants_batches(client=client, validators=validators):
+                await queue.put(batch)
+        except Exception as e:
+            error = e
+        finally:
+            await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                break
+            fetched += len(batch)
+            record_fetched("jgrants", len(batch))
+            rows = [_jgrants_row(item) for item in batch]
+            batch_counts = await bulk_upsert_subsidies("jgrants", rows)
+            for key, value in batch_counts.items():
+                counts[key] += value
+    finally:
+        producer.cancel()
+
+    # 全ページを書き込めた場合のみバリデータを保存
+    if error is not None:
+        # 取得できた分の書き込みは残し、失敗として呼び出し側（run_source）に伝える
+        detail = str(error) if isinstance(error, SourceFetchError) else repr(error)
+        raise SourceFetchError(f"jGrants API 取得エラー: {detail}") from error
+    await save_source_validators(validators)
+
+    if fetched == 0:
+        logger.info("jGrantsのデータに変更はありません")
+        return 0
 
-        # コミット
-        session.commit()
+    logger.info(f"jGrants更新完了: {fetched}件取得, {counts['added']}件追加, {counts['updated']}件更新, {counts['unchanged']}件変更なし")
+    return counts["added"] + counts["updated"]
 
-    logger.info(f"jGrants更新完了: {added_count}件追加, {updated_count}件更新")
-    return added_count + updated_count
+async def scrape_tokyo_subsidies(
+    validators: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Optional[List[Dict[str, Any]]]:
+    """東京都の補助金ページをスクレイピング
 
-async def scrape_tokyo_subsidies() -> List[Dict[str, Any]]:
-    """東京都の補助金ページをスクレイピング"""
+    validators を渡すと条件付きリクエストを送り、
+    304 または本文ハッシュが前回と同じ場合は解析せずに None を返す。
+    取得に失敗した場合は SourceFetchError を送出する。
+    """
     url = settings.TOKYO_SUBSIDY_URL
-    subsidies = []
 
+    client = get_http_client()
+    previous = validators.get("tokyo") if validators is not None else None
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.content, 'lxml')
-
-            # セレクタは実際のサイト構造に合わせて調整が必要
-            # ここでは一般的なセレクタを例として使用
-            subsidy_items = soup.select('.subsidy-item, .content-box, article, .list-item')
-
-            for item in subsidy_items:
-                # タイトル要素を探す（複数のパターンを試す）
-                title_elem = (
-                    item.select_one('h3, h2, .title, .heading') or
-                    item.select_one('a[href*="subsidy"], a[href*="josei"]') or
-                    item.select_one('a')
-                )
-
-                # 説明文を探す
-                desc_elem = item.select_one('p, .description, .summary')
-
-                # リンク要素を探す
-                link_elem = item.select_one('a')
-
-                if title_elem and link_elem:
-                    title_text = title_elem.get_text(strip=True)
-
-                    # リンクのhref属性を取得
-                    href = link_elem.get('href', '')
-
-                    # 相対URLを絶対URLに変換
-                    if href and not href.startswith(('http://', 'https://')):
-                        href = f"{url.rstrip('/')}/{href.lstrip('/')}"
-
-                    # 説明文を取得
-                    description = desc_elem.get_text(strip=True) if desc_elem else ""
-
-                    subsidy = {
-                        "title": title_text,
-                        "description": description,
-                        "organization": "東京都",
-                        "target": "中小企業等",  # 詳細ページから取得するとよい
-                        "url": href,
-                        "source": "scraping"
-                    }
-                    subsidies.append(subsidy)
+        response = await client.get(url, headers=_conditional_headers(previous))
+        if response.status_code == 304 and previous:
+            logger.info("東京都の補助金ページは変更なし（304）")
+            return None
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        raise SourceFetchError(f"東京都の補助金ページの取得に失敗: {e!r}") from e
+
+    digest = hashlib.sha256(response.content).hexdigest()
+    if validators is not None:
+        validators["tokyo"] = _new_validator(response, digest)
+    if previous and previous["content_sha256"] == digest:
+        logger.info("東京都の補助金ページは変更なし（ハッシュ一致）")
+        return None
 
-            logger.info(f"東京都から{len(subsidies)}件の補助金情報を取得")
-            return subsidies
+    # 解析はイベントループを止めないようスレッドで実行（lxml は取り込み時のみ読み込む）
+    from .parsers import parse_tokyo_html
+    subsidies = await asyncio.to_thread(parse_tokyo_html, response.content, url)
 
-    except Exception as e:
-        logger.error(f"東京都スクレイピングエラー: {e}")
-        return []
+    logger.info(f"東京都から{len(subsidies)}件の補助金情報を取得")
+    return subsidies
 
 async def update_tokyo_subsidies() -> int:
     """東京都補助金データ取得・DB更新"""
-    subsidies = await scrape_tokyo_subsidies()
+    validators = await load_source_validators("tokyo")
+    subsidies = await scrape_tokyo_subsidies(validators)
+    if subsidies is None:
+        return 0
     if not subsidies:
         logger.warning("更新するデータがありません")
         return 0
-
-    added_count = 0
-    updated_count = 0
-
-    with Session(engine) as session:
-        for item in subsidies:
-            # 既存データ確認
-            subsidy = session.exec(select(Subsidy).where(
-                Subsidy.source == "scraping",
-                Subsidy.url == item["url"]
-            )).first()
-
-            if subsidy:
-                # 既存レコード更新
-                for key, value in item.items():
-                    setattr(subsidy, key, value)
-                setattr(subsidy, "updated_at", datetime.now())
-                updated_count += 1
-            else:
-                # 新規レコード作成
-                new_subsidy = Subsidy(**item, created_at=datetime.now(), updated_at=datetime.now())
-                session.add(new_subsidy)
-                added_count += 1
-
-        # コミット
-        session.commit()
-
-    logger.info(f"東京都補助金更新完了: {added_count}件追加, {updated_count}件更新")
-    return added_count + updated_count
+    record_fetched("tokyo", len(subsidies))
+
+    # 詳細ページから対象者・金額・申請期間を補完
+    if settings.CRAWL_DETAILS:
+        from .crawler import crawl_tokyo_details
+        subsidies = await crawl_tokyo_details(subsidies)
+
+    rows = [{k: v for k, v in item.items() if k != "source"} for item in subsidies]
+    counts = await bulk_upsert_subsidies("scraping", rows)
+
+    # 書き込み後にバリデータを保存
+    await save_source_validators(validators)
+
+    logger.info(f"東京都補助金更新完了: {counts['added']}件追加, {counts['updated']}件更新, {counts['unchanged']}件変更なし")
+    return counts["added"] + counts["updated"]
+
+# データソース（名前 -> 更新関数）
+SOURCES: Dict[str, Callable[[], Awaitable[int]]] = {
+    "jgrants": update_jgrants_subsidies,
+    "tokyo": update_tokyo_subsidies,
+}
+
+async def run_source(name: str, update: Callable[[], Awaitable[int]]) -> Dict[str, Any]:
+    """データソースを1つ実行（タイムアウト・例外はこのソース内で処理）"""
+    started = time.perf_counter()
+    error = None
+    count = 0
+    written = [0]
+    token = _written_rows.set(written)
+    try:
+        count = await asyncio.wait_for(update(), timeout=settings.SOURCE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        error = "timeout"
+        logger.error(f"{name} の更新がタイムアウトしました（{settings.SOURCE_TIMEOUT_SECONDS}秒）")
+    except SourceFetchError as e:
+        error = str(e)
+        logger.error(f"{name} の取得に失敗: {e}")
+    except Exception as e:
+        error = repr(e)
+        logger.error(f"{name} の更新に失敗: {e!r}")
+    finally:
+        _written_rows.reset(token)
+    if error is not None:
+        # 失敗までにコミットしたバッチはデータバージョン・スナップショット等の更新対象にする
+        count = written[0]
+        if count:
+            logger.warning(f"{name} は失敗までに{count}件書き込み済み")
+    if count:
+        # 書き込みがあればソースの実行ごとに1回データバージョンを進める（バッチごとには進めない）
+        bump_data_version()
+    duration = round(time.perf_counter() - started, 3)
+    record_ingest(name, count, duration, error)
+    return {
+        "count": count,
+        "duration": duration,
+        "error": error
+    }
+
+def summarize_runs(results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """run_source の結果をまとめる（ソースごとの件数・合計・所要時間・エラー）"""
+    summary: Dict[str, Any] = {name: result["count"] for name, result in results.items()}
+    summary["total"] = sum(result["count"] for result in results.values())
+    summary["durations"] = {name: result["duration"] for name, result in results.items()}
+    errors = {name: result["error"] for name, result in results.items() if result["error"]}
+    if errors:
+        summary["errors"] = errors
+    return summary
 
 # 全データソースの更新を一括実行
-async def update_all_subsidies() -> Dict[str, int]:
-    """全データソースの補助金情報を更新"""
-    jgrants_count = await update_jgrants_subsidies()
-    tokyo_count = await update_tokyo_subsidies()
-
-    return {
-        "jgrants": jgrants_count,
-        "tokyo": tokyo_count,
-        "total": jgrants_count + tokyo_count
-    }
\ No newline at end of file
+async def update_all_subsidies() -> Dict[str, Any]:
+    """全データソースの補助金情報を並行して更新
+
+    実行の重複防止・実行記録は行わない（アプリからは scheduler.source_scheduler を使う）。
+    """
+    names = list(SOURCES)
+    results = await asyncio.gather(*(run_source(name, SOURCES[name]) for name in names))
+    summary = summarize_runs(dict(zip(names, results)))
+
+    # 変更があれば類似する補助金・スナップショットを更新し、マッチング・入力補完のインデックスを再構築
+    # （データバージョンは run_source で更新済み）
+    if summary["total"]:
+        await refresh_similar_subsidies()
+        await publish_snapshot()
+        await asyncio.to_thread(rebuild_match_index)
+        await asyncio.to_thread(rebuild_suggest_index)
+    return summary
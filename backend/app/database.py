@@ -1,27 +1,233 @@
 import os
+from typing import Any, Dict
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from loguru import logger
 from .config import settings
+from .metrics import CallbackMetric, instrument_engine, registry
+from .search_index import create_search_index
+from .models import Subsidy
+from .normalization import normalized_columns
+
+# 同期ドライバ -> 非同期ドライバ
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def _sync_url(url: str) -> str:
+    """DATABASE_URL から同期ドライバのURLを作成"""
+    parsed = make_url(url)
+    if parsed.drivername in ASYNC_DRIVERS.values():
+        return parsed.set(drivername=parsed.get_backend_name()).render_as_string(hide_password=False)
+    return url
+
+def _async_url(url: str) -> str:
+    """DATABASE_URL から非同期ドライバのURLを作成"""
+    parsed = make_url(url)
+    if parsed.drivername in ASYNC_DRIVERS:
+        return parsed.set(drivername=ASYNC_DRIVERS[parsed.drivername]).render_as_string(hide_password=False)
+    return url
+
+# DATABASE_URL は sqlite:/// と sqlite+aiosqlite:/// のどちらでも指定可能
+SYNC_DATABASE_URL = _sync_url(settings.DATABASE_URL)
+ASYNC_DATABASE_URL = _async_url(settings.DATABASE_URL)
+_is_sqlite = make_url(SYNC_DATABASE_URL).get_backend_name() == "sqlite"
+_connect_args = {"check_same_thread": False} if _is_sqlite else {}  # SQLite用
 
 # データディレクトリの作成
-os.makedirs(os.path.dirname(settings.DATABASE_URL.replace("sqlite:///", "")), exist_ok=True)
+if _is_sqlite and make_url(SYNC_DATABASE_URL).database:
+    os.makedirs(os.path.dirname(make_url(SYNC_DATABASE_URL).database) or ".", exist_ok=True)
+
+def sqlite_pragmas(read_only: bool = False) -> Dict[str, Any]:
+    """接続ごとに適用するPRAGMA（設定値から作成）"""
+    pragmas: Dict[str, Any] = {
+        # ロック待ちの設定を最初に適用（journal_mode の変更もロックを取るため）
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+    }
+    if read_only:
+        pragmas["query_only"] = "ON"
+    return pragmas
+
+def apply_sqlite_pragmas(engine: Engine, read_only: bool = False) -> Engine:
+    """接続時にPRAGMAを適用するイベントを登録"""
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
 
-# データベースエンジン作成
+    return engine
+
+# データベースエンジン作成（テーブル作成・マイグレーション・インデックス構築用）
 engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}  # SQLite用
+    SYNC_DATABASE_URL,
+    connect_args=_connect_args
 )
 
+# 非同期エンジン
+# - 書き込み用（データ更新）: SQLiteは書き込みが直列化されるため接続は1本
+# - 読み取り用（APIハンドラ）: WALにより書き込み中も読み取りを継続できる
+if _is_sqlite:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        connect_args=_connect_args,
+        pool_size=1,
+        max_overflow=0
+    )
+    async_read_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        connect_args=_connect_args,
+        pool_size=settings.DB_READ_POOL_SIZE,
+        max_overflow=settings.DB_READ_MAX_OVERFLOW
+    )
+    apply_sqlite_pragmas(engine)
+    apply_sqlite_pragmas(async_engine.sync_engine)
+    apply_sqlite_pragmas(async_read_engine.sync_engine, read_only=True)
+else:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL)
+    async_read_engine = async_engine
+
+# クエリ数・実行時間の計測（metrics.instrument_engine）
+if settings.METRICS_ENABLED:
+    instrument_engine(engine, "sync")
+    instrument_engine(async_engine.sync_engine, "writer")
+    if async_read_engine is not async_engine:
+        instrument_engine(async_read_engine.sync_engine, "reader")
+
+# データバージョン（取り込みのたびに加算し、キャッシュの無効化に使用）
+_data_version = 0
+
+def get_data_version() -> int:
+    """現在のデータバージョンを取得"""
+    return _data_version
+
+def bump_data_version() -> int:
+    """データ更新を通知してバージョンを進める"""
+    global _data_version
+    _data_version += 1
+    return _data_version
+
+registry.register(CallbackMetric("data_version", "データバージョン（取り込みのたびに加算）", lambda: {(): _data_version}))
+
 def create_db_and_tables():
     """データベースとテーブルの作成"""
     try:
         SQLModel.metadata.create_all(engine)
+        migrate_schema()
+        backfill_normalized_columns()
+        create_search_index(engine)
         logger.info("データベースとテーブルの初期化完了")
     except Exception as e:
         logger.error(f"データベース初期化エラー: {e}")
         raise
 
+# 定義を変更して不要になったインデックス（テーブル名 -> インデックス名）
+OBSOLETE_INDEXES = {
+    "subsidy": ("ix_subsidy_organization", "ix_subsidy_application_end"),
+}
+
+# 不要になったテーブル（キーワードは subsidy.keywords_norm を使う）
+OBSOLETE_TABLES = ("subsidykeyword",)
+
+def _dedupe_subsidies(conn) -> int:
+    """(source, url) の重複行を削除（最新IDを残す）"""
+    result = conn.execute(text(
+        "DELETE FROM subsidy WHERE id NOT IN "
+        "(SELECT MAX(id) FROM subsidy GROUP BY source, url)"
+    ))
+    return result.rowcount or 0
+
+def migrate_schema():
+    """既存DBに不足している列・インデックスを追加（簡易マイグレーション）"""
+    inspector = inspect(engine)
+    added_indexes = 0
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            # 列の追加
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT '{column.server_default.arg}'"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+                conn.execute(text(ddl))
+                logger.info(f"列を追加: {table.name}.{column.name}")
+
+            # 不要になったインデックスの削除
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for name in OBSOLETE_INDEXES.get(table.name, ()):
+                if name in existing_indexes:
+                    conn.execute(text(f"DROP INDEX {name}"))
+                    logger.info(f"インデックスを削除: {name}")
+
+            # インデックスの追加
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                if table.name == "subsidy" and index.name == "ix_subsidy_source_url":
+                    removed = _dedupe_subsidies(conn)
+                    if removed:
+                        logger.warning(f"重複した補助金を削除: {removed}件")
+                index.create(conn)
+                added_indexes += 1
+                logger.info(f"インデックスを追加: {index.name}")
+
+        # 不要になったテーブルの削除
+        for name in OBSOLETE_TABLES:
+            if inspector.has_table(name):
+                conn.execute(text(f"DROP TABLE {name}"))
+                logger.info(f"テーブルを削除: {name}")
+
+        # 追加したインデックスをクエリプランナーに反映
+        if added_indexes and _is_sqlite:
+            conn.execute(text("ANALYZE"))
+
+def backfill_normalized_columns():
+    """正規化済みの列が未作成の行を補完（正規化導入前のDB用）"""
+    with engine.begin() as conn:
+        pending = select(Subsidy.id).where(Subsidy.title_norm == "", Subsidy.title != "")
+        rows = conn.execute(
+            select(Subsidy.id, Subsidy.title, Subsidy.description, Subsidy.target, Subsidy.keywords)
+            .where(Subsidy.id.in_(pending))
+        ).mappings().all()
+        if not rows:
+            return
+
+        updates = [dict(normalized_columns(row), row_id=row["id"]) for row in rows]
+        conn.execute(
+            text(
+                "UPDATE subsidy SET title_norm = :title_norm, description_norm = :description_norm, "
+                "target_norm = :target_norm, keywords_norm = :keywords_norm WHERE id = :row_id"
+            ),
+            updates
+        )
+        logger.info(f"正規化済みの列を補完: {len(rows)}件")
+
 def get_session():
     """DB接続セッションを取得"""
     with Session(engine) as session:
+        yield session
+
+async def get_async_session():
+    """非同期DB接続セッションを取得（読み取り用エンジン）"""
+    async with AsyncSession(async_read_engine, expire_on_commit=False) as session:
         yield session
\ No newline at end of file
@@ -0,0 +1,37 @@
+import httpx
+from typing import Optional
+from loguru import logger
+
+from .config import settings
+
+# 共有HTTPクライアント（コネクションプールを使い回す）
+_client: Optional[httpx.AsyncClient] = None
+
+def _create_client() -> httpx.AsyncClient:
+    """設定に基づいてHTTPクライアントを作成"""
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+    )
+    timeout = httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS)
+    try:
+        return httpx.AsyncClient(http2=settings.HTTP2, limits=limits, timeout=timeout)
+    except ImportError:
+        # HTTP/2 には h2 パッケージが必要
+        logger.warning("h2 がインストールされていないため HTTP/1.1 を使用します")
+        return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+def get_http_client() -> httpx.AsyncClient:
+    """共有HTTPクライアントを取得"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+    return _client
+
+async def close_http_client():
+    """共有HTTPクライアントを閉じる"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,17 +1,27 @@
 from fastapi import FastAPI, BackgroundTasks, HTTPException  # HTTPExceptionを追加
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse  # FileResponseも追加
+from fastapi.responses import FileResponse, JSONResponse  # FileResponseも追加
 import asyncio
+from datetime import datetime, time, timedelta
 from loguru import logger
 import os
+from typing import Optional
 from sqlalchemy.sql import func
 
 from .api import router as api_router
 from .config import settings
-from .database import create_db_and_tables, engine
-from .data_sources import update_all_subsidies
+from .active_window import refresh_active_flags, schedule_active_refresh
+from .catalog_snapshot import open_existing_snapshot, publish_snapshot, publish_snapshot_if_stale
+from .database import bump_data_version, create_db_and_tables, engine
+from .data_sources import bulk_upsert_subsidies
+from .http_client import close_http_client
+from .match_index import get_match_index, rebuild_match_index
+from .suggest_index import get_suggest_index, rebuild_suggest_index
+from .metrics import MetricsMiddleware
 from .models import Subsidy
+from .scheduler import source_scheduler
+from .similar import refresh_similar_subsidies
 from sqlmodel import Session, select
 
 # ロガー設定
@@ -36,12 +46,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# ルートごとの処理時間・SQLクエリ数の計測（/api/metrics で出力）
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # サンプルデータ作成（デモ用）
 async def create_sample_data():
     """サンプルデータの作成（APIが利用できない場合）"""
-    from datetime import datetime, date, timedelta
+    from datetime import date, timedelta
     from sqlmodel import Session
     from .models import Subsidy
     from .database import engine
@@ -56,7 +71,7 @@ async def create_sample_data():
             "amount": "最大200万円（補助率2/3）",
             "application_start": date.today() - timedelta(days=30),
             "application_end": date.today() + timedelta(days=60),
-            "url": "https://www.jgrants-portal.go.jp/",
+            "url": "https://www.jgrants-portal.go.jp/#sample-1",
             "keywords": "創業,スタートアップ,ベンチャー",
             "source": "jgrants"
         },
@@ -68,7 +83,7 @@ async def create_sample_data():
             "amount": "最大300万円（補助率1/2）",
             "application_start": date.today() - timedelta(days=15),
             "application_end": date.today() + timedelta(days=45),
-            "url": "https://www.jgrants-portal.go.jp/",
+            "url": "https://www.jgrants-portal.go.jp/#sample-2",
             "keywords": "DX,デジタル化,IT",
             "source": "jgrants"
         },
@@ -80,7 +95,7 @@ async def create_sample_data():
             "amount": "最大500万円（補助率3/4）",
             "application_start": date.today() - timedelta(days=5),
             "application_end": date.today() + timedelta(days=25),
-            "url": "https://www.metro.tokyo.lg.jp/",
+            "url": "https://www.metro.tokyo.lg.jp/#sample-3",
             "keywords": "商店街,地域活性化",
             "source": "scraping"
         },
@@ -92,7 +107,7 @@ async def create_sample_data():
             "amount": "最大1000万円（補助率2/3）",
             "application_start": date.today() - timedelta(days=60),
             "application_end": date.today() + timedelta(days=30),
-            "url": "https://www.metro.tokyo.lg.jp/",
+            "url": "https://www.metro.tokyo.lg.jp/#sample-4",
             "keywords": "ものづくり,技術革新,製造業",
             "source": "scraping"
         },
@@ -104,7 +119,7 @@ async def create_sample_data():
             "amount": "最大50万円（定額）",
             "application_start": date.today() - timedelta(days=10),
             "application_end": date.today() + timedelta(days=80),
-            "url": "https://www.jgrants-portal.go.jp/",
+            "url": "https://www.jgrants-portal.go.jp/#sample-5",
             "keywords": "フリーランス,個人事業主,スキルアップ",
             "source": "jgrants"
         }
@@ -115,32 +130,58 @@ async def create_sample_data():
         query = select(func.count(Subsidy.id))
         existing_count = session.exec(query).one()
         
-        if existing_count == 0:
-            logger.info(f"サンプルデータを作成します（{len(sample_data)}件）")
-            
-            # サンプルデータの挿入
-            for item in sample_data:
-                subsidy = Subsidy(**item, created_at=datetime.now(), updated_at=datetime.now())
-                session.add(subsidy)
-            
-            # コミット
-            session.commit()
-            logger.info(f"サンプルデータの作成完了: {len(sample_data)}件")
-        else:
-            logger.info(f"既存データが存在するため、サンプルデータは作成しません: {existing_count}件")
+    if existing_count == 0:
+        logger.info(f"サンプルデータを作成します（{len(sample_data)}件）")
+        
+        # データソースと同じ一括登録（正規化済みの列も作成する）
+        for source in ("jgrants", "scraping"):
+            items = [item for item in sample_data if item["source"] == source]
+            await bulk_upsert_subsidies(source, items)
+        bump_data_version()
+        logger.info(f"サンプルデータの作成完了: {len(sample_data)}件")
+        
+        # 類似する補助金・スナップショットを更新し、マッチング・入力補完のインデックスを再構築
+        await refresh_similar_subsidies()
+        await publish_snapshot()
+        await asyncio.to_thread(rebuild_match_index)
+        await asyncio.to_thread(rebuild_suggest_index)
+    else:
+        logger.info(f"既存データが存在するため、サンプルデータは作成しません: {existing_count}件")
+
+# 起動処理の状態（ヘルスチェック用）
+_db_initialized = False
+_has_data = False  # 起動時に既存のデータがあったか
+_init_task: Optional[asyncio.Task] = None  # 初期データ取得のバックグラウンドタスク
+_active_refresh_task: Optional[asyncio.Task] = None  # 日付の変更時に募集中フラグを更新するタスク
+
+def initial_load_status() -> str:
+    """初期データ取得の状態（pending / running / done / failed）"""
+    if _init_task is None:
+        return "pending"
+    if not _init_task.done():
+        return "running"
+    if _init_task.cancelled() or _init_task.exception() is not None:
+        return "failed"
+    return "done"
+
+def is_ready() -> bool:
+    """リクエストにデータを返せるか（既存データがある、または初期データ取得が完了）"""
+    return _db_initialized and (_has_data or initial_load_status() in ("done", "failed"))
 
 # データ初期化と定期更新
 async def init_data():
-    """初期データの取得"""
+    """初期データの取得（前回の実行記録から予定時刻を過ぎたデータソースのみ）"""
     logger.info("初期データの取得を開始")
+    written = 0
     try:
         # データ取得を試みる
-        result = await update_all_subsidies()
+        result = await source_scheduler.run_due()
+        written = result["total"]
         logger.info(f"初期データの取得完了: {result}")
         
-        # データが0件なら、サンプルデータを追加
+        # 書き込みが0件なら、サンプルデータを追加（既存データがあれば作成しない）
         if result["total"] == 0:
-            logger.info("データが0件のため、サンプルデータを追加します")
+            logger.info("取得データが0件のため、サンプルデータを確認します")
             await create_sample_data()
     except Exception as e:
         # エラーが発生した場合もサンプルデータを追加
@@ -148,39 +189,114 @@ async def init_data():
         logger.info("エラーのため、サンプルデータを追加します")
         await create_sample_data()
 
+    # 取り込みがなければ既存のDBから類似する補助金（未計算の行のみ）を更新し、
+    # スナップショットはない・DBと一致しない場合のみ書き出す（前回の書き出し以降の変更を反映）
+    if not written:
+        await refresh_similar_subsidies()
+        await publish_snapshot_if_stale()
+
+    # 初回のマッチング・入力補完を待たせないようインデックスを構築しておく
+    await asyncio.to_thread(get_match_index)
+    await asyncio.to_thread(get_suggest_index)
+
 # バックグラウンドタスク
-async def scheduled_update():
-    """定期的なデータ更新タスク"""
+async def scheduled_active_refresh():
+    """日付が変わるごとに募集中フラグを更新するタスク"""
     while True:
         try:
-            await asyncio.sleep(settings.SCRAPE_INTERVAL_HOURS * 3600)  # 時間をsecに変換
-            logger.info("定期データ更新を開始")
-            result = await update_all_subsidies()
-            logger.info(f"定期データ更新完了: {result}")
+            now = datetime.now()
+            next_midnight = datetime.combine(now.date() + timedelta(days=1), time.min)
+            await asyncio.sleep((next_midnight - now).total_seconds() + 1)
+            changed = await schedule_active_refresh()
+            logger.info(f"募集中フラグの定期更新完了: {changed}件")
         except Exception as e:
-            logger.error(f"定期データ更新に失敗: {e}")
-            await asyncio.sleep(60)  # エラー時は1分後に再試行
+            logger.error(f"募集中フラグの定期更新に失敗: {e}")
+            await asyncio.sleep(60)
 
 # 起動時の処理
 @app.on_event("startup")
 async def startup_event():
-    """アプリケーション起動時の処理"""
+    """アプリケーション起動時の処理（既存のDBで即時に応答し、初期データはバックグラウンドで取得）"""
+    global _db_initialized, _has_data, _init_task, _active_refresh_task
     logger.info("アプリケーション起動")
     
     # データベース初期化
     create_db_and_tables()
     
-    # 初期データの取得
-    await init_data()  # asyncio.create_taskではなく直接呼び出し
+    # 募集中フラグを今日の日付に合わせる（停止中に締切を過ぎた補助金）
+    await asyncio.to_thread(refresh_active_flags)
+    _active_refresh_task = asyncio.create_task(scheduled_active_refresh())
     
-    # 定期更新タスクの開始
-    if settings.APP_ENV == "production":
-        asyncio.create_task(scheduled_update())
+    # 前回書き出したスナップショットがDBと一致すれば、初期データの取得を待たずに使う
+    open_existing_snapshot()
+    
+    with Session(engine) as session:
+        _has_data = session.exec(select(Subsidy.id).limit(1)).first() is not None
+    _db_initialized = True
+    
+    # 初期データの取得（完了を待たずに起動する、状態は /api/health/ready で確認）
+    _init_task = asyncio.create_task(init_data())
+    
+    # 定期更新の開始（データソースごとの間隔、scheduler.SourceScheduler）
+    if settings.SCHEDULER_ENABLED:
+        source_scheduler.start()
+
+# 終了時の処理
+@app.on_event("shutdown")
+async def shutdown_event():
+    """アプリケーション終了時の処理"""
+    if _init_task is not None and not _init_task.done():
+        _init_task.cancel()
+    if _active_refresh_task is not None:
+        _active_refresh_task.cancel()
+        await asyncio.gather(_active_refresh_task, return_exceptions=True)
+    await source_scheduler.stop()
+    await close_http_client()
 
 # APIルーターを追加
 app.include_router(api_router, prefix="/api")
 
+# APIエンドポイント
+@app.get("/api")
+def read_root():
+    """APIルートエンドポイント"""
+    return {
+        "message": "補助金ファインダー API",
+        "version": "1.0.0",
+        "environment": settings.APP_ENV
+    }
+
+# ヘルスチェックエンドポイント
+@app.get("/api/health")
+def health_check():
+    """ヘルスチェック（liveness: プロセスが応答していれば常に200）"""
+    return {
+        "status": "ok",
+        "ready": is_ready(),
+        "initial_load": initial_load_status()
+    }
+
+@app.get("/api/health/ready")
+def readiness_check():
+    """レディネスチェック（データを返せるまでは503）"""
+    body = {"ready": is_ready(), "initial_load": initial_load_status()}
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+@app.get("/api/update", include_in_schema=False)
+async def trigger_update(background_tasks: BackgroundTasks):
+    """手動更新トリガー（開発用、実行中のデータソースは重複して実行しない）"""
+    background_tasks.add_task(source_scheduler.run)
+    return {"message": "データ更新を開始しました"}
+
+# サンプルデータ生成エンドポイント
+@app.get("/api/generate-samples", include_in_schema=False)
+async def generate_samples():
+    """サンプルデータ生成"""
+    await create_sample_data()  # 直接呼び出し
+    return {"message": "サンプルデータの生成を完了しました"}
+
 # 静的ファイル配信（ビルド済みフロントエンド）
+# SPAのルートは全パスに一致するため、APIエンドポイントの後に登録する
 paths_to_try = [
     "/opt/render/project/src/frontend/dist",
     "./frontend/dist",
@@ -219,32 +335,3 @@ else:
     @app.get("/")
     def root():
         return {"message": "補助金ファインダー API - フロントエンド配信に問題があります"}
-
-# APIエンドポイント
-@app.get("/api")
-def read_root():
-    """APIルートエンドポイント"""
-    return {
-        "message": "補助金ファインダー API",
-        "version": "1.0.0",
-        "environment": settings.APP_ENV
-    }
-
-# ヘルスチェックエンドポイント
-@app.get("/api/health")
-def health_check():
-    """ヘルスチェック"""
-    return {"status": "ok"}
-
-@app.get("/api/update", include_in_schema=False)
-async def trigger_update(background_tasks: BackgroundTasks):
-    """手動更新トリガー（開発用）"""
-    background_tasks.add_task(update_all_subsidies)
-    return {"message": "データ更新を開始しました"}
-
-# サンプルデータ生成エンドポイント
-@app.get("/api/generate-samples", include_in_schema=False)
-async def generate_samples():
-    """サンプルデータ生成"""
-    await create_sample_data()  # 直接呼び出し
-    return {"message": "サンプルデータの生成を完了しました"}
@@ -0,0 +1,420 @@
+import asyncio
+import threading
+from array import array
+from typing import List, Dict, Any, Callable, Optional, Iterable, Iterator, NamedTuple, Tuple, Union, TYPE_CHECKING
+from loguru import logger
+from sqlmodel import Session, select
+
+from .catalog_snapshot import CatalogSnapshot, current_snapshot
+from .database import engine, get_data_version
+from .models import Subsidy
+from .normalization import normalize_query
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# マッチングの重み（api.match_subsidies と同一）
+PREFECTURE_WEIGHT = 3
+TARGET_WEIGHT = 5
+BUSINESS_TYPE_WEIGHT = 3
+KEYWORD_TITLE_WEIGHT = 2
+KEYWORD_DESCRIPTION_WEIGHT = 1
+KEYWORD_KEYWORDS_WEIGHT = 1
+
+# 上位件数
+MATCH_LIMIT = 20
+
+# 一括マッチングで1回の行列積に含めるプロファイル数（スコア行列のメモリ上限）
+BATCH_CHUNK_SIZE = 256
+
+# 語ごとのスコアベクトルのキャッシュ上限
+TERM_CACHE_SIZE = 4096
+
+class MatchProfile(NamedTuple):
+    """マッチング条件（一括マッチング用）"""
+    business_type: Optional[str] = None
+    prefecture: Optional[str] = None
+    target_type: Optional[str] = None
+    keyword_list: Tuple[str, ...] = ()
+
+class MatchRow(NamedTuple):
+    """マッチング対象の補助金（出力用の列と正規化済みの列）"""
+    id: int
+    title: str
+    organization: str
+    target: str
+    url: str
+    active: bool  # 募集中フラグ（Subsidy.active）
+    title_norm: str
+    description_norm: str
+    organization_norm: str
+    target_norm: str
+    keywords: Tuple[str, ...]  # 正規化済みキーワード
+
+class MatchRows:
+    """マッチング対象の行（DBから読み込んだ MatchRow のリスト）
+
+    MatchIndex は行番号で参照する（構築時の走査、タイトル・説明の部分一致の検証、結果の出力）。
+    """
+
+    def __init__(self, rows: List[MatchRow]):
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, pos: int) -> MatchRow:
+        return self._rows[pos]
+
+    def __iter__(self) -> Iterator[MatchRow]:
+        return iter(self._rows)
+
+    def title_contains(self, term: str) -> Callable[[int], bool]:
+        """行番号 -> 正規化済みのタイトルが term を含むか"""
+        rows = self._rows
+        return lambda pos: term in rows[pos].title_norm
+
+    def description_contains(self, term: str) -> Callable[[int], bool]:
+        """行番号 -> 正規化済みの説明が term を含むか"""
+        rows = self._rows
+        return lambda pos: term in rows[pos].description_norm
+
+class SnapshotMatchRows(MatchRows):
+    """カタログスナップショットの行（値を Python の文字列として保持しない）
+
+    部分一致の検証は mmap 上の UTF-8 のまま行い、MatchRow は構築時の走査と結果の出力時にのみ作る。
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.snapshot = snapshot
+
+    def __len__(self) -> int:
+        return len(self.snapshot)
+
+    def __getitem__(self, pos: int) -> MatchRow:
+        value = self.snapshot.value
+        organization = value(pos, "organization") or ""
+        keywords = value(pos, "keywords_norm")
+        return MatchRow(
+            id=value(pos, "id"),
+            title=value(pos, "title") or "",
+            organization=organization,
+            target=value(pos, "target") or "",
+            url=value(pos, "url"),
+            active=value(pos, "is_active"),
+            title_norm=value(pos, "title_norm"),
+            description_norm=value(pos, "description_norm"),
+            organization_norm=normalize_query(organization),
+            target_norm=value(pos, "target_norm"),
+            keywords=tuple(keywords.split(",")) if keywords else (),
+        )
+
+    def __iter__(self) -> Iterator[MatchRow]:
+        return (self[pos] for pos in range(len(self.snapshot)))
+
+    def title_contains(self, term: str) -> Callable[[int], bool]:
+        return self.snapshot.contains("title_norm", term)
+
+    def description_contains(self, term: str) -> Callable[[int], bool]:
+        return self.snapshot.contains("description_norm", term)
+
+def _grams(text: str) -> Iterable[str]:
+    """1文字・2文字のn-gramを列挙"""
+    yield from text
+    for i in range(len(text) - 1):
+        yield text[i:i + 2]
+
+class MatchIndex:
+    """補助金マッチング用の転置インデックス
+
+    正規化済みの列（normalization.normalize_text）で構築し、条件も同じ規則で正規化する。
+    - 交付団体・対象者は値の種類が少ないため、値ごとのポスティングを持つ
+    - タイトル・説明は1-gram/2-gramのポスティングを持ち、候補行のみ部分一致を検証する
+    - キーワードは語ごとのポスティング（完全一致）を持つ
+    """
+
+    def __init__(self, rows: Union[MatchRows, List[MatchRow]], version: int = 0):
+        self.rows = rows if isinstance(rows, MatchRows) else MatchRows(rows)
+        self.version = version
+        self._organizations: Dict[str, array] = {}
+        self._targets: Dict[str, array] = {}
+        self._grams: Dict[str, array] = {}
+        self._keywords: Dict[str, array] = {}
+        # (種別, 語) -> 各補助金への加点（一括マッチング用）
+        self._term_vectors: Dict[Tuple[str, str], "np.ndarray"] = {}
+
+        for pos, row in enumerate(self.rows):
+            self._organizations.setdefault(row.organization_norm, array("i")).append(pos)
+            self._targets.setdefault(row.target_norm, array("i")).append(pos)
+            for keyword in row.keywords:
+                self._keywords.setdefault(keyword, array("i")).append(pos)
+
+            grams = set(_grams(row.title_norm))
+            grams.update(_grams(row.description_norm))
+            for gram in grams:
+                postings = self._grams.get(gram)
+                if postings is None:
+                    postings = self._grams[gram] = array("i")
+                postings.append(pos)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _value_candidates(self, postings: Dict[str, array], term: str) -> Iterable[int]:
+        """値ごとのポスティングから部分一致する行を列挙"""
+        for value, positions in postings.items():
+            if term in value:
+                yield from positions
+
+    def _text_candidates(self, term: str) -> Iterable[int]:
+        """タイトル・説明に term を含み得る行を列挙（要検証）"""
+        grams = [term] if len(term) == 1 else [term[i:i + 2] for i in range(len(term) - 1)]
+        smallest = None
+        for gram in grams:
+            postings = self._grams.get(gram)
+            if postings is None:
+                return ()
+            if smallest is None or len(postings) < len(smallest):
+                smallest = postings
+        return smallest
+
+    def match(
+        self,
+        business_type: Optional[str] = None,
+        prefecture: Optional[str] = None,
+        target_type: Optional[str] = None,
+        keyword_list: Optional[List[str]] = None,
+        limit: int = MATCH_LIMIT,
+    ) -> List[Tuple[MatchRow, int]]:
+        """スコア上位の補助金を返す（条件は正規化して照合する）"""
+        rows = self.rows
+        scores: Dict[int, int] = {}
+        business_type = normalize_query(business_type or "")
+        prefecture = normalize_query(prefecture or "")
+        target_type = normalize_query(target_type or "")
+
+        # 地域マッチング
+        if prefecture:
+            for pos in self._value_candidates(self._organizations, prefecture):
+                scores[pos] = scores.get(pos, 0) + PREFECTURE_WEIGHT
+
+        # 対象者マッチング
+        if target_type:
+            for pos in self._value_candidates(self._targets, target_type):
+                scores[pos] = scores.get(pos, 0) + TARGET_WEIGHT
+
+        # 業種マッチング
+        if business_type:
+            in_description = rows.description_contains(business_type)
+            for pos in self._text_candidates(business_type):
+                if in_description(pos):
+                    scores[pos] = scores.get(pos, 0) + BUSINESS_TYPE_WEIGHT
+
+        # キーワードマッチング（タイトル > 説明 > キーワード の順に1回だけ加点）
+        for keyword in keyword_list or []:
+            keyword = normalize_query(keyword)
+            if not keyword:
+                continue
+            in_title, in_description = rows.title_contains(keyword), rows.description_contains(keyword)
+            for pos in self._text_candidates(keyword):
+                if in_title(pos):
+                    scores[pos] = scores.get(pos, 0) + KEYWORD_TITLE_WEIGHT
+                elif in_description(pos):
+                    scores[pos] = scores.get(pos, 0) + KEYWORD_DESCRIPTION_WEIGHT
+            for pos in self._keywords.get(keyword, ()):
+                if not in_title(pos) and not in_description(pos):
+                    scores[pos] = scores.get(pos, 0) + KEYWORD_KEYWORDS_WEIGHT
+
+        # スコア順（同点はID順）
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(rows[pos], score) for pos, score in ranked[:limit]]
+
+    def term_vector(self, kind: str, term: str) -> "np.ndarray":
+        """語1つ分の補助金ごとの加点（match と同じ重み）
+
+        kind は "prefecture" / "target_type" / "business_type" / "keyword"、term は正規化済み。
+        """
+        key = (kind, term)
+        vector = self._term_vectors.get(key)
+        if vector is not None:
+            return vector
+
+        import numpy as np  # 一括マッチングでのみ使用（起動時に読み込まない）
+
+        rows = self.rows
+        vector = np.zeros(len(rows), dtype=np.float32)
+        if kind == "prefecture":
+            for pos in self._value_candidates(self._organizations, term):
+                vector[pos] = PREFECTURE_WEIGHT
+        elif kind == "target_type":
+            for pos in self._value_candidates(self._targets, term):
+                vector[pos] = TARGET_WEIGHT
+        elif kind == "business_type":
+            in_description = rows.description_contains(term)
+            for pos in self._text_candidates(term):
+                if in_description(pos):
+                    vector[pos] = BUSINESS_TYPE_WEIGHT
+        elif kind == "keyword":
+            for pos in self._keywords.get(term, ()):
+                vector[pos] = KEYWORD_KEYWORDS_WEIGHT
+            in_title, in_description = rows.title_contains(term), rows.description_contains(term)
+            for pos in self._text_candidates(term):
+                if in_title(pos):
+                    vector[pos] = KEYWORD_TITLE_WEIGHT
+                elif in_description(pos):
+                    vector[pos] = KEYWORD_DESCRIPTION_WEIGHT
+        else:
+            raise ValueError(f"不明な種別: {kind}")
+
+        if len(self._term_vectors) >= TERM_CACHE_SIZE:
+            self._term_vectors.clear()
+        self._term_vectors[key] = vector
+        return vector
+
+    def match_batch(
+        self,
+        profiles: List[MatchProfile],
+        limit: int = MATCH_LIMIT,
+    ) -> List[List[Tuple[MatchRow, int]]]:
+        """複数の条件をまとめてスコアリング（条件ごとに match と同じ結果を返す）
+
+        条件 x 語 の出現回数行列と 語 x 補助金 の加点行列の積でスコアを求める。
+        """
+        results = []
+        for start in range(0, len(profiles), BATCH_CHUNK_SIZE):
+            results.extend(self._match_chunk(profiles[start:start + BATCH_CHUNK_SIZE], limit))
+        return results
+
+    def _match_chunk(self, profiles: List[MatchProfile], limit: int) -> List[List[Tuple[MatchRow, int]]]:
+        """BATCH_CHUNK_SIZE 件以下の条件をスコアリング"""
+        # 語の列番号を割り当て、条件ごとの出現回数を数える
+        columns: Dict[Tuple[str, str], int] = {}
+        entries = []
+        for i, profile in enumerate(profiles):
+            terms = [
+                ("business_type", profile.business_type),
+                ("prefecture", profile.prefecture),
+                ("target_type", profile.target_type),
+            ] + [("keyword", keyword) for keyword in profile.keyword_list]
+            for kind, term in terms:
+                term = normalize_query(term or "")
+                if term:
+                    entries.append((i, columns.setdefault((kind, term), len(columns))))
+
+        if not columns or not self.rows:
+            return [[] for _ in profiles]
+
+        import numpy as np  # 一括マッチングでのみ使用（起動時に読み込まない）
+
+        counts = np.zeros((len(profiles), len(columns)), dtype=np.float32)
+        for i, column in entries:
+            counts[i, column] += 1
+        weights = np.vstack([self.term_vector(kind, term) for kind, term in columns])
+        scores = counts @ weights
+
+        results = []
+        for profile_scores in scores:
+            positions = np.flatnonzero(profile_scores > 0)
+            if len(positions) > limit:
+                # 上位 limit 件の境界スコア以上に絞ってから並べ替える
+                threshold = np.partition(profile_scores[positions], -limit)[-limit]
+                positions = positions[profile_scores[positions] >= threshold]
+            # スコア順（同点はID順）
+            ordered = positions[np.lexsort((positions, -profile_scores[positions]))][:limit]
+            results.append([(self.rows[pos], int(profile_scores[pos])) for pos in ordered])
+        return results
+
+def load_match_rows(session: Session) -> List[MatchRow]:
+    """DBからマッチング対象の列（正規化済みの列）を取得"""
+    results = session.exec(
+        select(
+            Subsidy.id,
+            Subsidy.title,
+            Subsidy.organization,
+            Subsidy.target,
+            Subsidy.url,
+            Subsidy.active,
+            Subsidy.title_norm,
+            Subsidy.description_norm,
+            Subsidy.target_norm,
+            Subsidy.keywords_norm,
+        ).order_by(Subsidy.id)
+    ).all()
+    return [
+        MatchRow(
+            id=row[0],
+            title=row[1] or "",
+            organization=row[2] or "",
+            target=row[3] or "",
+            url=row[4],
+            active=row[5],
+            title_norm=row[6],
+            description_norm=row[7],
+            # 交付団体は値の種類が少ないため読み込み時に正規化する
+            organization_norm=normalize_query(row[2] or ""),
+            target_norm=row[8],
+            keywords=tuple(row[9].split(",")) if row[9] else (),
+        )
+        for row in results
+    ]
+
+# シングルトンインスタンス
+_index: Optional[MatchIndex] = None
+_rebuild_lock = threading.Lock()
+
+def rebuild_match_index() -> MatchIndex:
+    """インデックスを再構築（データ更新後に呼び出す、同時に呼ばれても構築は1回）"""
+    global _index
+    with _rebuild_lock:
+        version = get_data_version()
+        if _index is not None and _index.version == version:
+            # 待っている間に他のスレッドが構築済み
+            return _index
+        # 他のエンドポイントと同じ世代のデータを使うため、スナップショットがあればそこから構築する
+        # （列は mmap を参照し、ワーカーごとに持つのはポスティングのみ）
+        snapshot = current_snapshot()
+        if snapshot is not None:
+            rows = SnapshotMatchRows(snapshot)
+        else:
+            with Session(engine) as session:
+                rows = load_match_rows(session)
+        index = MatchIndex(rows, version)
+        _index = index
+    logger.info(f"マッチングインデックスを構築: {len(index)}件")
+    return index
+
+def get_match_index() -> MatchIndex:
+    """インデックスを取得（未構築・データ更新後なら構築）"""
+    if _index is None or _index.version != get_data_version():
+        return rebuild_match_index()
+    return _index
+
+def current_match_index() -> Optional[MatchIndex]:
+    """構築済みのインデックス（データ更新後の再構築を待たない、未構築なら None）"""
+    return _index
+
+_rebuild_task: Optional[asyncio.Task] = None
+
+async def _rebuild_in_background():
+    try:
+        await asyncio.to_thread(rebuild_match_index)
+    except Exception as e:
+        logger.error(f"マッチングインデックスの構築に失敗: {e}")
+
+def schedule_match_rebuild():
+    """バックグラウンドで再構築（実行中なら何もしない）"""
+    global _rebuild_task
+    if _rebuild_task is None or _rebuild_task.done():
+        _rebuild_task = asyncio.get_running_loop().create_task(_rebuild_in_background())
+
+def match_to_dict(row: MatchRow, score: int) -> Dict[str, Any]:
+    """マッチング結果を辞書形式に変換"""
+    return {
+        "id": row.id,
+        "title": row.title,
+        "organization": row.organization,
+        "score": score,
+        "url": row.url,
+        "target": row.target,
+        "is_active": row.active,
+    }
@@ -0,0 +1,213 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# レイテンシのバケット（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# 1リクエストあたりのクエリ数のバケット
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# 取り込み時間のバケット（秒）
+INGEST_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    """ラベルごとの累積値"""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in values]
+
+class Histogram:
+    """ラベルごとのバケット別件数・合計・件数"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._values: Dict[Labels, List[float]] = {}  # バケット別件数 + [合計, 件数]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            counts[-2] += value
+            counts[-1] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(counts)) for key, counts in self._values.items()]
+        lines = []
+        for key, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {int(counts[-1])}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(counts[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {int(counts[-1])}")
+        return lines
+
+class CallbackMetric:
+    """出力時に値を取得する指標（他のモジュールが持つ値、関数は ラベル -> 値 の辞書を返す）"""
+
+    def __init__(self, name: str, help_text: str, collect: Callable[[], Dict[Labels, float]], kind: str = "gauge"):
+        self.name = name
+        self.help = help_text
+        self.collect = collect
+        self.kind = kind
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in self.collect().items()]
+
+class Registry:
+    """指標の一覧（Prometheus のテキスト形式で出力）"""
+
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# HTTP
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTPリクエスト数（ルート・メソッド・ステータス別）"
+))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTPリクエストの処理時間", LATENCY_BUCKETS
+))
+http_db_queries = registry.register(Histogram(
+    "http_request_db_queries", "1リクエストあたりのSQLクエリ数", QUERY_COUNT_BUCKETS
+))
+http_db_time = registry.register(Histogram(
+    "http_request_db_duration_seconds", "1リクエストあたりのSQL実行時間の合計", LATENCY_BUCKETS
+))
+
+# SQL（リクエスト外の取り込み・バックグラウンド処理を含む）
+db_queries = registry.register(Counter("db_queries_total", "SQLクエリ数（エンジン別）"))
+db_time = registry.register(Counter("db_query_duration_seconds_total", "SQL実行時間の合計（エンジン別）"))
+
+# 取り込み
+ingest_runs = registry.register(Counter("ingest_runs_total", "データソースの更新回数（結果別）"))
+ingest_rows_fetched = registry.register(Counter("ingest_rows_fetched_total", "データソースから取得した件数"))
+ingest_rows_written = registry.register(Counter("ingest_rows_written_total", "追加・更新した件数"))
+ingest_duration = registry.register(Histogram(
+    "ingest_duration_seconds", "データソースの更新時間", INGEST_BUCKETS
+))
+
+# リクエストごとのSQL集計 [クエリ数, 実行時間]
+_request_db: ContextVar[Optional[List[float]]] = ContextVar("request_db", default=None)
+# 実行中のクエリの開始時刻（接続ごと）
+_QUERY_STARTED = "metrics_query_started"
+
+def instrument_engine(engine: Engine, name: str) -> Engine:
+    """エンジンにクエリ数・実行時間の計測イベントを登録"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_QUERY_STARTED, []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info[_QUERY_STARTED].pop()
+        elapsed = time.perf_counter() - started
+        db_queries.inc(engine=name)
+        db_time.inc(elapsed, engine=name)
+        current = _request_db.get()
+        if current is not None:
+            current[0] += 1
+            current[1] += elapsed
+
+    return engine
+
+def record_ingest(source: str, written: int, duration: float, error: Optional[str] = None):
+    """データソースの更新結果を記録"""
+    ingest_runs.inc(source=source, result="error" if error else "ok")
+    ingest_rows_written.inc(written, source=source)
+    ingest_duration.observe(duration, source=source)
+
+def record_fetched(source: str, count: int):
+    """データソースから取得した件数を記録"""
+    ingest_rows_fetched.inc(count, source=source)
+
+class MetricsMiddleware:
+    """ルートごとの処理時間・SQLクエリ数を記録するASGIミドルウェア
+
+    ラベルにはURLではなくルートのパス（/api/subsidies/{subsidy_id} など）を使う。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        db = [0, 0.0]
+        token = _request_db.set(db)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_db.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests.inc(route=path, method=method, status=str(status["code"]))
+            http_latency.observe(elapsed, route=path, method=method)
+            http_db_queries.observe(db[0], route=path, method=method)
+            http_db_time.observe(db[1], route=path, method=method)
@@ -1,9 +1,19 @@
 from datetime import datetime, date
 from typing import Optional, List
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 
 class Subsidy(SQLModel, table=True):
     """補助金情報モデル"""
+    __table_args__ = (
+        # 更新時の (source, url) 照合用
+        Index("ix_subsidy_source_url", "source", "url", unique=True),
+        # 交付団体での絞り込み・統計の集計用（集計は索引のみで完結する）
+        Index("ix_subsidy_organization_active", "organization", "source", "active"),
+        # 募集中の絞り込み・締切間近（締切の範囲）の検索用
+        Index("ix_subsidy_active", "active", "application_end"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     description: Optional[str] = None
@@ -15,15 +25,22 @@ class Subsidy(SQLModel, table=True):
     url: str
     keywords: str = ""  # キーワード（カンマ区切り）
     source: str  # "jgrants" or "scraping"
+    content_hash: str = Field(default="", sa_column_kwargs={"server_default": ""})  # 内容のハッシュ（変更検知用）
+    # 検索・マッチング用の正規化済みテキスト（取り込み時に作成、normalization.normalize_text）
+    title_norm: str = Field(default="", sa_column_kwargs={"server_default": ""})
+    description_norm: str = Field(default="", sa_column_kwargs={"server_default": ""})
+    target_norm: str = Field(default="", sa_column_kwargs={"server_default": ""})
+    keywords_norm: str = Field(default="", sa_column_kwargs={"server_default": ""})  # 正規化したキーワード（カンマ区切り）
+    # 募集中フラグ（取り込み時に設定し、日付の変更時に active_window.refresh_active_flags で更新）
+    active: bool = Field(default=True, sa_column_kwargs={"server_default": "1"})
+    # 類似する補助金を計算した時点の content_hash（異なる行は similar.update_similar_subsidies で再計算する）
+    similar_hash: str = Field(default="", sa_column_kwargs={"server_default": ""})
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
 
     def is_active(self) -> bool:
-        """現在募集中かどうかを判定"""
-        today = date.today()
-        if self.application_end is None:
-            return True
-        return self.application_end >= today
+        """現在募集中かどうか（保存済みの募集中フラグ）"""
+        return self.active
 
     def to_dict(self):
         """辞書形式に変換"""
@@ -42,4 +59,30 @@ class Subsidy(SQLModel, table=True):
             "is_active": self.is_active(),
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat()
-        }
\ No newline at end of file
+        }
+
+class SubsidySimilar(SQLModel, table=True):
+    """類似する補助金（取り込み後に similar.update_similar_subsidies で作成、1行1件）"""
+    subsidy_id: int = Field(primary_key=True, foreign_key="subsidy.id")
+    rank: int = Field(primary_key=True)  # 類似度の順位（0始まり）
+    similar_id: int = Field(foreign_key="subsidy.id")
+    score: float  # コサイン類似度
+
+class SourceState(SQLModel, table=True):
+    """データソースの取得状態（条件付きリクエスト用のバリデータ）"""
+    key: str = Field(primary_key=True)  # "tokyo" / "jgrants:1"（ページ単位）など
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_sha256: Optional[str] = None  # レスポンス本文のハッシュ
+    item_count: int = 0  # 前回取得時の件数（ページング継続の判定用）
+    next_url: Optional[str] = None  # 前回取得時の次ページURL
+    checked_at: datetime = Field(default_factory=datetime.now)
+
+class SourceRun(SQLModel, table=True):
+    """データソースの定期更新の実行記録（再起動後も次回の実行時刻を引き継ぐ）"""
+    name: str = Field(primary_key=True)  # "jgrants" / "tokyo"
+    last_run: Optional[datetime] = None  # 前回の開始時刻
+    next_run: Optional[datetime] = None  # 次回の予定時刻（実行中は他プロセス向けの予約期限）
+    duration: float = 0  # 前回の所要時間（秒）
+    rows_written: int = 0  # 前回の追加・更新件数
+    error: Optional[str] = None  # 前回のエラー
@@ -0,0 +1,54 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+# ひらがな -> カタカナ（ぁ〜ゖ、ゝゞ）
+_HIRAGANA_TO_KATAKANA = {code: code + 0x60 for code in range(0x3041, 0x3097)}
+_HIRAGANA_TO_KATAKANA.update({0x309D: 0x30FD, 0x309E: 0x30FE})
+
+# キーワードの区切り（半角・全角のカンマ、読点）
+_KEYWORD_SEPARATOR = re.compile(r"[,、，]+")
+_SPACES = re.compile(r"\s+")
+
+def normalize_text(text: Optional[str]) -> str:
+    """検索・マッチング用にテキストを正規化
+
+    - NFKC（全角英数・半角カナの統一）
+    - 大文字小文字の統一（casefold）
+    - ひらがなをカタカナに統一
+    - 連続する空白を1つにまとめる
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text).casefold().translate(_HIRAGANA_TO_KATAKANA)
+    return _SPACES.sub(" ", text).strip()
+
+@lru_cache(maxsize=4096)
+def normalize_query(text: str) -> str:
+    """クエリの語を正規化（同じ語が繰り返し来るためキャッシュする）"""
+    return normalize_text(text)
+
+def split_keywords(keywords: Optional[str]) -> List[str]:
+    """キーワード文字列を正規化したトークンに分割（重複を除き順序を保つ）"""
+    tokens = (normalize_text(token) for token in _KEYWORD_SEPARATOR.split(keywords or ""))
+    return list(dict.fromkeys(token for token in tokens if token))
+
+def split_terms(text: Optional[str]) -> List[Tuple[str, str]]:
+    """区切り文字（カンマ・読点）で分割して (正規化した語, 元の語) の組にする（正規化後の重複を除く）"""
+    terms: Dict[str, str] = {}
+    for token in _KEYWORD_SEPARATOR.split(text or ""):
+        token = token.strip()
+        normalized = normalize_query(token)
+        if normalized and normalized not in terms:
+            terms[normalized] = token
+    return list(terms.items())
+
+def normalized_columns(row: Dict[str, Any]) -> Dict[str, str]:
+    """取り込み時に保存する正規化済みの列"""
+    return {
+        "title_norm": normalize_text(row.get("title")),
+        "description_norm": normalize_text(row.get("description")),
+        "target_norm": normalize_text(row.get("target")),
+        "keywords_norm": ",".join(split_keywords(row.get("keywords"))),
+    }
@@ -0,0 +1,157 @@
+import re
+import unicodedata
+from datetime import date
+from typing import List, Dict, Any, Optional, Tuple
+import lxml.html
+
+# HTMLパーサー（BeautifulSoupを使わず lxml のXPathで直接解析する）
+
+def _has_class(name: str) -> str:
+    """class属性に name を含む要素のXPath条件"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+# 補助金の項目（.subsidy-item, .content-box, article, .list-item）
+_ITEM_XPATH = (
+    f"//*[self::article or {_has_class('subsidy-item')} or "
+    f"{_has_class('content-box')} or {_has_class('list-item')}]"
+)
+# タイトル（h3, h2, .title, .heading → 補助金リンク → 最初のリンク）
+_TITLE_XPATHS = (
+    f"(.//*[self::h3 or self::h2 or {_has_class('title')} or {_has_class('heading')}])[1]",
+    "(.//a[contains(@href, 'subsidy') or contains(@href, 'josei')])[1]",
+    "(.//a)[1]",
+)
+# 説明文（p, .description, .summary）
+_DESCRIPTION_XPATH = f"(.//*[self::p or {_has_class('description')} or {_has_class('summary')}])[1]"
+# リンク
+_LINK_XPATH = "(.//a)[1]"
+# script/style を除くテキスト
+_TEXT_XPATH = ".//text()[not(ancestor::script) and not(ancestor::style)]"
+
+def _first(element, xpath: str):
+    """XPathの最初の要素を取得"""
+    found = element.xpath(xpath)
+    return found[0] if found else None
+
+def element_text(element) -> str:
+    """要素のテキストを取得（BeautifulSoup の get_text(strip=True) 相当）"""
+    return "".join(text.strip() for text in element.xpath(_TEXT_XPATH))
+
+def absolute_url(href: str, base_url: str) -> str:
+    """相対URLを絶対URLに変換"""
+    if href and not href.startswith(('http://', 'https://')):
+        return f"{base_url.rstrip('/')}/{href.lstrip('/')}"
+    return href
+
+def parse_tokyo_html(content: bytes, base_url: str) -> List[Dict[str, Any]]:
+    """東京都の補助金一覧ページを解析（同期処理、スレッドで実行する）"""
+    if not content:
+        return []
+    document = lxml.html.document_fromstring(content)
+
+    subsidies = []
+    for item in document.xpath(_ITEM_XPATH):
+        title_elem: Optional[Any] = None
+        for xpath in _TITLE_XPATHS:
+            title_elem = _first(item, xpath)
+            if title_elem is not None:
+                break
+        link_elem = _first(item, _LINK_XPATH)
+        if title_elem is None or link_elem is None:
+            continue
+
+        desc_elem = _first(item, _DESCRIPTION_XPATH)
+        subsidies.append({
+            "title": element_text(title_elem),
+            "description": element_text(desc_elem) if desc_elem is not None else "",
+            "organization": "東京都",
+            "target": "中小企業等",  # 詳細ページから取得するとよい
+            "url": absolute_url(link_elem.get('href', ''), base_url),
+            "source": "scraping"
+        })
+    return subsidies
+
+# 詳細ページの項目名（見出しに含まれる語 -> 項目）
+_DETAIL_LABELS = (
+    ("target", ("対象者", "対象事業者", "申請資格", "助成対象", "補助対象")),
+    ("amount", ("助成額", "補助額", "助成限度額", "補助上限", "助成率", "補助率", "金額")),
+    ("period", ("申請期間", "受付期間", "募集期間", "申請受付", "受付", "締切", "期限")),
+)
+# 項目判定から除外する見出し（「助成対象経費」など）
+_EXCLUDED_LABELS = ("経費", "事業期間")
+
+_ERAS = {"令和": 2018, "平成": 1988}
+_DATE_PATTERN = re.compile(r"(?:(令和|平成)\s*(\d+|元)\s*年|(\d{4})\s*年)?\s*(\d{1,2})\s*月\s*(\d{1,2})\s*日")
+_LABEL_LINE_PATTERN = re.compile(r"^[\s■□●○◆◇【\[]*([^：:】\]]{1,15})[】\]]?\s*[：:]\s*(.+)$")
+
+def parse_japanese_dates(text: str) -> List[date]:
+    """日本語の日付（令和6年4月1日、2024年4月1日、4月1日）をすべて抽出
+
+    年が省略された日付は直前の日付の年を引き継ぐ。
+    """
+    text = unicodedata.normalize("NFKC", text)
+    dates = []
+    year: Optional[int] = None
+    for era, era_year, western_year, month, day in _DATE_PATTERN.findall(text):
+        if era:
+            year = _ERAS[era] + (1 if era_year == "元" else int(era_year))
+        elif western_year:
+            year = int(western_year)
+        if year is None:
+            continue
+        try:
+            dates.append(date(year, int(month), int(day)))
+        except ValueError:
+            continue
+    return dates
+
+def _label_field(label: str) -> Optional[str]:
+    """見出しから項目を判定"""
+    if any(word in label for word in _EXCLUDED_LABELS):
+        return None
+    for field, words in _DETAIL_LABELS:
+        if any(word in label for word in words):
+            return field
+    return None
+
+def _detail_pairs(document) -> List[Tuple[str, str]]:
+    """詳細ページから（見出し, 値）の組を抽出"""
+    pairs = []
+    # 表形式（th/td）
+    for row in document.xpath("//tr[th and td]"):
+        pairs.append((element_text(row.xpath("th")[0]), element_text(row.xpath("td")[0])))
+    # 定義リスト（dt/dd）
+    for dt in document.xpath("//dt[following-sibling::dd]"):
+        pairs.append((element_text(dt), element_text(dt.xpath("following-sibling::dd[1]")[0])))
+    # 「見出し：値」形式の段落
+    for elem in document.xpath("//p | //li"):
+        match = _LABEL_LINE_PATTERN.match(element_text(elem))
+        if match:
+            pairs.append((match.group(1), match.group(2)))
+    return pairs
+
+def parse_tokyo_detail_html(content: bytes) -> Dict[str, Any]:
+    """東京都の補助金詳細ページから対象者・金額・申請期間を抽出
+
+    見つからなかった項目は結果に含めない。
+    """
+    if not content:
+        return {}
+    document = lxml.html.document_fromstring(content)
+
+    detail: Dict[str, Any] = {}
+    for label, value in _detail_pairs(document):
+        field = _label_field(label)
+        if field is None or not value:
+            continue
+        if field == "period":
+            if "application_end" in detail:
+                continue
+            dates = parse_japanese_dates(value)
+            if len(dates) >= 2:
+                detail["application_start"], detail["application_end"] = dates[0], dates[-1]
+            elif len(dates) == 1:
+                detail["application_end"] = dates[0]
+        elif field not in detail:
+            detail[field] = value
+    return detail
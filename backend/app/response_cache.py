@@ -0,0 +1,165 @@
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from .config import settings
+from .database import get_data_version
+from .metrics import CallbackMetric, registry
+
+# キャッシュしたレスポンスで保持するヘッダー
+CACHED_HEADERS = ("x-next-cursor",)
+
+class CachedResponse(NamedTuple):
+    """キャッシュしたレスポンス本文"""
+    body: bytes
+    media_type: str
+    headers: Dict[str, str]
+    etag: str
+    expires_at: float
+
+def normalize_params(request: Request) -> Tuple[Tuple[str, str], ...]:
+    """クエリパラメータを正規化（空値を除き、前後の空白を除去してキー順に並べる）"""
+    params = []
+    for name, value in request.query_params.multi_items():
+        value = value.strip()
+        if value:
+            params.append((name, value))
+    return tuple(sorted(params))
+
+def make_etag(body: bytes) -> str:
+    """本文からETagを作成"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match が ETag と一致するか（弱いETagも比較対象）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag == etag or tag == f"W/{etag}" for tag in candidates)
+
+class ResponseCache:
+    """読み取りAPIのレスポンスキャッシュ（LRU + TTL）
+
+    キーにデータバージョンを含め、取り込みの完了でバージョンが進んだら
+    古いエントリを破棄する。
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        self._version = get_data_version()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, request: Request) -> tuple:
+        """キャッシュキー（データバージョン・日付・パス・正規化したパラメータ）"""
+        version = get_data_version()
+        if version != self._version:
+            # データ更新後は古いエントリを参照しないため先に解放する
+            self.clear()
+            self._version = version
+        # 締切間近など日付に依存する結果があるため日付もキーに含める
+        return (version, date.today(), request.url.path, normalize_params(request))
+
+    def get(self, key: tuple) -> Optional[CachedResponse]:
+        """有効なエントリを取得"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, key: tuple, entry: CachedResponse):
+        """エントリを保存（上限を超えたら古いものから削除）"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """全エントリを削除"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット・ミスの集計"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.RESPONSE_CACHE_ENABLED,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+            "data_version": get_data_version(),
+        }
+
+# シングルトンインスタンス
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL_SECONDS)
+
+# メトリクス（/api/metrics）
+for _field in ("hits", "misses", "not_modified", "evictions"):
+    registry.register(CallbackMetric(
+        f"response_cache_{_field}_total",
+        f"レスポンスキャッシュの {_field} の回数",
+        lambda field=_field: {(): getattr(response_cache, field)},
+        kind="counter"
+    ))
+registry.register(CallbackMetric(
+    "response_cache_entries", "レスポンスキャッシュのエントリ数", lambda: {(): len(response_cache)}
+))
+
+def _to_cached(response: Response) -> CachedResponse:
+    """レスポンスをキャッシュ用の形式に変換"""
+    headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+    return CachedResponse(
+        body=response.body,
+        media_type=response.media_type,
+        headers=headers,
+        etag=make_etag(response.body),
+        expires_at=time.monotonic() + response_cache.ttl_seconds
+    )
+
+async def cached_response(request: Request, build: Callable[[], Awaitable[Response]]) -> Response:
+    """レスポンスをキャッシュから返す（ETag一致なら304）
+
+    build はキャッシュがない場合にのみ呼び出す。
+    """
+    entry = None
+    key = None
+    if settings.RESPONSE_CACHE_ENABLED:
+        key = response_cache.key(request)
+        entry = response_cache.get(key)
+    if entry is None:
+        entry = _to_cached(await build())
+        if key is not None:
+            response_cache.set(key, entry)
+
+    headers = dict(entry.headers)
+    headers["ETag"] = entry.etag
+    headers["Cache-Control"] = f"public, max-age={settings.HTTP_CACHE_MAX_AGE}"
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
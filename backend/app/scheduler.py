@@ -0,0 +1,209 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from loguru import logger
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .catalog_snapshot import publish_snapshot
+from .config import settings
+from .database import async_engine, async_read_engine
+from .data_sources import SOURCES, run_source, summarize_runs
+from .match_index import get_match_index
+from .suggest_index import get_suggest_index
+from .models import SourceRun
+from .similar import refresh_similar_subsidies
+
+# データソースごとの更新間隔（時間）
+SOURCE_INTERVAL_HOURS: Dict[str, float] = {
+    "jgrants": settings.JGRANTS_INTERVAL_HOURS,
+    "tokyo": settings.TOKYO_INTERVAL_HOURS,
+}
+
+class SourceScheduler:
+    """データソースの定期更新
+
+    - ソースごとの間隔で実行し、次回の予定時刻を SourceRun に保存する（再起動しても即時に再取得しない）
+    - 同じソースの実行が重なった場合は実行中のタスクの結果を待つ（single-flight）
+    - 次回の予定時刻にランダムな幅を加え、複数台での同時実行を避ける
+    - 予定時刻を過ぎたソースは SourceRun の条件付き更新で予約してから実行する（他プロセスと重複しない）
+    """
+
+    def __init__(
+        self,
+        sources: Dict[str, Callable[[], Awaitable[int]]],
+        intervals: Dict[str, float],
+        jitter_seconds: float = 0,
+    ):
+        self.sources = sources
+        self.intervals = {name: timedelta(hours=intervals.get(name, settings.SCRAPE_INTERVAL_HOURS)) for name in sources}
+        self.jitter_seconds = jitter_seconds
+        self._runs: Dict[str, SourceRun] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def _jitter(self) -> timedelta:
+        return timedelta(seconds=random.uniform(0, self.jitter_seconds))
+
+    async def load(self) -> Dict[str, SourceRun]:
+        """実行記録を取得（未登録のソースは予定時刻なし＝実行対象として登録）"""
+        async with AsyncSession(async_engine) as session:
+            runs = {run.name: run for run in (await session.exec(select(SourceRun))).all()}
+            missing = [name for name in self.sources if name not in runs]
+            if missing:
+                for name in missing:
+                    session.add(SourceRun(name=name))
+                try:
+                    await session.commit()
+                except IntegrityError:
+                    # 他プロセスが先に登録した
+                    await session.rollback()
+                runs = {run.name: run for run in (await session.exec(select(SourceRun))).all()}
+        self._runs = {name: run for name, run in runs.items() if name in self.sources}
+        return self._runs
+
+    async def read_runs(self) -> Dict[str, SourceRun]:
+        """状況表示用に実行記録を取得（読み取り用エンジン、スケジューラの状態は変更しない）"""
+        async with AsyncSession(async_read_engine, expire_on_commit=False) as session:
+            runs = (await session.exec(select(SourceRun))).all()
+        return {run.name: run for run in runs if run.name in self.sources}
+
+    async def _claim(self, name: str, now: datetime) -> bool:
+        """予定時刻を過ぎていれば予約する（実行中の予定時刻はタイムアウトまで先送り）"""
+        lease = now + timedelta(seconds=settings.SOURCE_TIMEOUT_SECONDS)
+        async with AsyncSession(async_engine) as session:
+            result = await session.execute(
+                update(SourceRun)
+                .where(
+                    SourceRun.name == name,
+                    or_(SourceRun.next_run == None, SourceRun.next_run <= now)
+                )
+                .values(next_run=lease)
+            )
+            await session.commit()
+        return result.rowcount == 1
+
+    async def _record(self, name: str, started_at: datetime, result: Dict[str, Any]):
+        """実行結果と次回の予定時刻を保存"""
+        if result["error"]:
+            next_run = datetime.now() + timedelta(seconds=settings.SCHEDULER_RETRY_SECONDS)
+        else:
+            next_run = started_at + self.intervals[name] + self._jitter()
+        run = SourceRun(
+            name=name,
+            last_run=started_at,
+            next_run=next_run,
+            duration=result["duration"],
+            rows_written=result["count"],
+            error=result["error"],
+        )
+        async with AsyncSession(async_engine) as session:
+            await session.merge(run)
+            await session.commit()
+        self._runs[name] = run
+
+    async def _run_source(self, name: str) -> Dict[str, Any]:
+        started_at = datetime.now()
+        try:
+            result = await run_source(name, self.sources[name])
+            try:
+                await self._record(name, started_at, result)
+            except Exception as e:
+                logger.error(f"{name} の実行記録の保存に失敗: {e}")
+            return result
+        finally:
+            self._inflight.pop(name, None)
+
+    def _start(self, name: str) -> asyncio.Task:
+        """ソースの実行を開始（実行中ならそのタスクを返す）"""
+        task = self._inflight.get(name)
+        if task is None:
+            task = self._inflight[name] = asyncio.create_task(self._run_source(name))
+        return task
+
+    async def run(self, names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """ソースを今すぐ実行（実行中のソースは完了を待つ）"""
+        names = list(self.sources) if names is None else names
+        # 呼び出し元のキャンセルで共有中のタスクを止めない
+        results = await asyncio.gather(*(asyncio.shield(self._start(name)) for name in names))
+        summary = summarize_runs(dict(zip(names, results)))
+
+        # 変更があれば類似する補助金・スナップショットを更新し、マッチング・入力補完のインデックスを更新
+        # （データバージョンが変わった場合のみ再構築される）
+        if summary["total"]:
+            await refresh_similar_subsidies()
+            await publish_snapshot()
+            await asyncio.to_thread(get_match_index)
+            await asyncio.to_thread(get_suggest_index)
+        return summary
+
+    async def run_due(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """予定時刻を過ぎたソースを実行"""
+        now = now or datetime.now()
+        await self.load()
+        due = [
+            name for name, run in self._runs.items()
+            if name not in self._inflight and (run.next_run is None or run.next_run <= now)
+        ]
+        claimed = [name for name in due if await self._claim(name, now)]
+        if claimed:
+            logger.info(f"定期データ更新を開始: {', '.join(claimed)}")
+        return await self.run(claimed)
+
+    def _seconds_until_next(self) -> float:
+        """次に予定時刻を迎えるまでの秒数（他プロセスの更新を反映するため上限あり）"""
+        now = datetime.now()
+        waits = [
+            (run.next_run - now).total_seconds() if run.next_run else 0
+            for run in self._runs.values()
+        ]
+        return min([settings.SCHEDULER_POLL_SECONDS, *waits]) if waits else settings.SCHEDULER_POLL_SECONDS
+
+    async def _loop(self):
+        # 複数台が同時に起動しても開始をずらす
+        await asyncio.sleep(self._jitter().total_seconds())
+        while True:
+            try:
+                result = await self.run_due()
+                if result["total"] or result.get("errors"):
+                    logger.info(f"定期データ更新完了: {result}")
+            except Exception as e:
+                logger.error(f"定期データ更新に失敗: {e}")
+            await asyncio.sleep(max(self._seconds_until_next(), 1))
+
+    def start(self):
+        """定期実行を開始"""
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """定期実行と実行中の更新を停止"""
+        tasks = [task for task in (self._loop_task, *self._inflight.values()) if task]
+        self._loop_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def status(self, runs: Optional[Dict[str, SourceRun]] = None) -> Dict[str, Any]:
+        """ソースごとの実行状況（runs を省略した場合は読み込み済みの実行記録）"""
+        if runs is None:
+            runs = self._runs
+        sources = {}
+        for name in self.sources:
+            run = runs.get(name) or SourceRun(name=name)
+            sources[name] = {
+                "last_run": run.last_run,
+                "next_run": run.next_run,
+                "duration": run.duration,
+                "rows_written": run.rows_written,
+                "error": run.error,
+                "running": name in self._inflight,
+                "interval_hours": self.intervals[name].total_seconds() / 3600,
+            }
+        return {"enabled": self._loop_task is not None, "sources": sources}
+
+# シングルトンインスタンス
+source_scheduler = SourceScheduler(SOURCES, SOURCE_INTERVAL_HOURS, settings.SCHEDULER_JITTER_SECONDS)
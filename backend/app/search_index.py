@@ -0,0 +1,126 @@
+from typing import Optional
+from loguru import logger
+from sqlalchemy import column, func, literal_column, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlmodel import or_
+
+from .models import Subsidy
+from .normalization import normalize_query
+
+# FTS5仮想テーブル名
+FTS_TABLE = "subsidy_fts"
+
+# trigramトークナイザは3文字未満の語を検索できない
+FTS_MIN_QUERY_LENGTH = 3
+
+# 索引対象の列（取り込み時に正規化した列）
+FTS_COLUMNS = ("title_norm", "description_norm", "keywords_norm")
+_COLUMNS = ", ".join(FTS_COLUMNS)
+_NEW_VALUES = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+_OLD_VALUES = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+# 日本語は空白で区切られないため trigram で分割する
+_CREATE_STATEMENTS = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {_COLUMNS},
+        content='subsidy', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON subsidy BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_COLUMNS})
+        VALUES (new.id, {_NEW_VALUES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON subsidy BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_COLUMNS})
+        VALUES ('delete', old.id, {_OLD_VALUES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_COLUMNS} ON subsidy BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_COLUMNS})
+        VALUES ('delete', old.id, {_OLD_VALUES});
+        INSERT INTO {FTS_TABLE}(rowid, {_COLUMNS})
+        VALUES (new.id, {_NEW_VALUES});
+    END
+    """,
+]
+
+# 索引対象の列を変更した場合に作り直す
+_DROP_STATEMENTS = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+# FTS5が利用可能かどうか（create_search_index で判定）
+_fts_available = False
+
+def create_search_index(engine: Engine) -> bool:
+    """FTS5仮想テーブルと同期用トリガーを作成"""
+    global _fts_available
+    if engine.dialect.name != "sqlite":
+        _fts_available = False
+        return False
+
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE}
+            ).first()
+            if exists:
+                columns = tuple(row[1] for row in conn.execute(text(f"PRAGMA table_info({FTS_TABLE})")))
+                if columns != FTS_COLUMNS:
+                    logger.info(f"全文検索インデックスの列を変更: {columns} -> {FTS_COLUMNS}")
+                    for statement in _DROP_STATEMENTS:
+                        conn.execute(text(statement))
+                    exists = None
+            for statement in _CREATE_STATEMENTS:
+                conn.execute(text(statement))
+
+            # 既存データがある場合は初回のみ索引を構築
+            if not exists:
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        _fts_available = True
+        logger.info("全文検索インデックス（FTS5）の初期化完了")
+    except OperationalError as e:
+        _fts_available = False
+        logger.warning(f"FTS5が利用できないため LIKE 検索を使用します: {e}")
+    return _fts_available
+
+def fts_available() -> bool:
+    """FTS5が利用可能かどうか"""
+    return _fts_available
+
+def _fts_phrase(q: str) -> str:
+    """検索語をFTS5のフレーズ（部分一致）に変換"""
+    return '"' + q.replace('"', '""') + '"'
+
+def apply_keyword_search(query, q: Optional[str]):
+    """キーワード条件をクエリに追加（FTS5が使えればbm25順、正規化した列で照合）"""
+    q = normalize_query(q or "")
+    if not q:
+        return query
+
+    if _fts_available and len(q) >= FTS_MIN_QUERY_LENGTH:
+        fts = table(FTS_TABLE, column("rowid"))
+        return (
+            query.join(fts, fts.c.rowid == Subsidy.id)
+            .where(literal_column(FTS_TABLE).op("MATCH")(_fts_phrase(q)))
+            .order_by(func.bm25(literal_column(FTS_TABLE)))
+        )
+
+    # フォールバック: LIKE検索
+    return query.where(
+        or_(
+            Subsidy.title_norm.contains(q),
+            Subsidy.description_norm.contains(q),
+            Subsidy.keywords_norm.contains(q)
+        )
+    )
@@ -0,0 +1,37 @@
+from typing import Any, Dict, List, Sequence
+
+from .models import Subsidy
+
+# レスポンスの項目（Subsidy.to_dict と同じ並び）
+SUBSIDY_FIELDS = (
+    "id", "title", "description", "organization", "target", "amount",
+    "application_start", "application_end", "url", "keywords", "source",
+    "is_active", "created_at", "updated_at"
+)
+
+# 出力項目 -> 列名（is_active は保存済みの募集中フラグ）
+_FIELD_COLUMNS = {"is_active": "active"}
+
+def subsidy_columns(fields: Sequence[str]) -> List[Any]:
+    """指定項目の出力に必要な列（id は常に含める）"""
+    names = {"id"} | {_FIELD_COLUMNS.get(f, f) for f in fields}
+    return [
+        getattr(Subsidy, column)
+        for column in (_FIELD_COLUMNS.get(name, name) for name in SUBSIDY_FIELDS)
+        if column in names
+    ]
+
+def rows_to_dicts(
+    rows: Sequence[Sequence[Any]],
+    fields: Sequence[str],
+    columns: Sequence[Any]
+) -> List[Dict[str, Any]]:
+    """結果の行（タプル）から項目の辞書を作成
+
+    モデルのインスタンス化・to_dict を経由せず、日付は orjson に任せる。
+    """
+    names = [column.key for column in columns]
+    positions = [names.index(_FIELD_COLUMNS.get(field, field)) for field in fields]
+    if positions == list(range(len(names))):
+        return [dict(zip(fields, row)) for row in rows]
+    return [{field: row[pos] for field, pos in zip(fields, positions)} for row in rows]
@@ -0,0 +1,280 @@
+import asyncio
+import threading
+import time
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Sequence, Set, Tuple, TYPE_CHECKING
+from loguru import logger
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from .config import settings
+from .database import engine, bump_data_version
+from .models import Subsidy, SubsidySimilar
+
+if TYPE_CHECKING:
+    import numpy as np
+    from scipy import sparse
+
+# 文字n-gramの長さ
+NGRAM_SIZES = (2, 3)
+# タイトル・キーワードのn-gramの重み（説明は1）
+TITLE_WEIGHT = 2
+KEYWORDS_WEIGHT = 2
+# 出現する補助金の割合がこれを超えるn-gram（「補助」「支援」など）は使わない
+MAX_DOCUMENT_FREQUENCY = 0.5
+# 1件にしか出現しないn-gramは類似度に寄与しないため使わない
+MIN_DOCUMENT_FREQUENCY = 2
+# これ未満の類似度は保存しない
+MIN_SCORE = 0.05
+
+# /subsidies/{id}/similar の項目（is_active は Subsidy.active、score は類似度）
+SIMILAR_FIELDS = ("id", "title", "organization", "target", "application_end", "is_active", "url", "score")
+
+Neighbors = List[Tuple[int, float]]  # [(類似する補助金の行番号, 類似度)]
+
+def text_grams(title: str, description: str, keywords: str) -> Counter:
+    """正規化済みのタイトル・説明・キーワードの文字n-gramの出現回数（重み付き）"""
+    counts: Counter = Counter()
+    fields = [(title, TITLE_WEIGHT), (description, 1)]
+    fields += [(keyword, KEYWORDS_WEIGHT) for keyword in keywords.split(",") if keyword]
+    for text, weight in fields:
+        for n in NGRAM_SIZES:
+            grams = [text[i:i + n] for i in range(len(text) - n + 1)]
+            for _ in range(weight):
+                counts.update(grams)
+    return counts
+
+def tfidf_matrix(documents: Iterable[Counter]) -> "sparse.csr_matrix":
+    """n-gramの出現回数から行ごとにL2正規化したTF-IDF行列（補助金 x n-gram）を作成"""
+    import numpy as np  # 取り込み後の計算でのみ使用（起動時に読み込まない）
+    from scipy import sparse
+
+    vocabulary: Dict[str, int] = {}
+    indptr = array("q", [0])
+    indices = array("i")
+    counts = array("f")
+    for grams in documents:
+        for gram, count in grams.items():
+            indices.append(vocabulary.setdefault(gram, len(vocabulary)))
+            counts.append(count)
+        indptr.append(len(indices))
+
+    n_rows = len(indptr) - 1
+    indices_np = np.frombuffer(indices, dtype=np.int32)
+    df = np.bincount(indices_np, minlength=len(vocabulary))
+    idf = (np.log((1 + n_rows) / (1 + df)) + 1).astype(np.float32)
+    idf[(df < MIN_DOCUMENT_FREQUENCY) | (df > MAX_DOCUMENT_FREQUENCY * n_rows)] = 0
+
+    # サブリニアTF x IDF
+    data = (1 + np.log(np.frombuffer(counts, dtype=np.float32))) * idf[indices_np]
+    matrix = sparse.csr_matrix(
+        (data, indices_np, np.frombuffer(indptr, dtype=np.int64)),
+        shape=(n_rows, len(vocabulary))
+    )
+    # 使わないn-gramの列を除く（類似度の計算で密にする幅を減らす）
+    matrix = matrix[:, np.flatnonzero(idf)]
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms).astype(np.float32) @ matrix
+
+def _ranked(positions: "np.ndarray", scores: "np.ndarray", k: int) -> Neighbors:
+    """類似度順（同点は行番号 = ID順）の上位 k 件"""
+    import numpy as np
+
+    order = np.lexsort((positions, -scores))[:k]
+    return [(int(positions[i]), round(float(scores[i]), 4)) for i in order if scores[i] >= MIN_SCORE]
+
+def batch_scores(matrix: "sparse.csr_matrix", batch: "np.ndarray") -> "np.ndarray":
+    """batch の行 x 全行 の類似度（密行列）
+
+    疎行列同士の積より、batch 側を密にした 疎 x 密 の積の方が速い（出力はほぼ密になるため）。
+    """
+    return (matrix @ matrix[batch].T.toarray()).T
+
+def top_neighbors(matrix: "sparse.csr_matrix", positions: Sequence[int], k: int) -> Dict[int, Neighbors]:
+    """positions の行ごとに類似度上位 k 件（自身を除く）"""
+    import numpy as np
+
+    results: Dict[int, Neighbors] = {}
+    for start in range(0, len(positions), settings.SIMILAR_BATCH_SIZE):
+        batch = np.asarray(positions[start:start + settings.SIMILAR_BATCH_SIZE])
+        scores = batch_scores(matrix, batch)
+        scores[np.arange(len(batch)), batch] = 0
+        # 行ごとの上位 k 件を選んでから並べ替える
+        if scores.shape[1] > k:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        for row, candidates, pos in zip(scores, top, batch):
+            results[int(pos)] = _ranked(candidates, row[candidates], k)
+    return results
+
+def _load_neighbors(conn, position: Dict[int, int]) -> Dict[int, Neighbors]:
+    """保存済みの類似する補助金（行番号で返す、削除済みの補助金を含む行は空にする）"""
+    saved: Dict[int, Neighbors] = {}
+    stale: Set[int] = set()
+    rows = conn.execute(
+        select(SubsidySimilar.subsidy_id, SubsidySimilar.similar_id, SubsidySimilar.score)
+        .order_by(SubsidySimilar.subsidy_id, SubsidySimilar.rank)
+    )
+    for subsidy_id, similar_id, score in rows:
+        pos = position.get(subsidy_id)
+        if pos is None:
+            continue
+        if similar_id in position:
+            saved.setdefault(pos, []).append((position[similar_id], score))
+        else:
+            stale.add(pos)
+    for pos in stale:
+        saved[pos] = []
+    return saved
+
+def _merge_changed(
+    saved: Dict[int, Neighbors],
+    computed: Dict[int, Neighbors],
+    changed: Set[int],
+    matrix: "sparse.csr_matrix",
+    k: int,
+) -> Tuple[Dict[int, Neighbors], Set[int]]:
+    """変更のない行の保存済みリストに変更行を反映
+
+    類似度は対称なので、変更行 x 全行 の類似度から各行に入るべき変更行が分かる。
+    変更行・削除行を含んでいたリスト（削除行を含むものは空で渡される）は順位が変わる可能性があるため、
+    再計算する行として返す。
+    """
+    import numpy as np
+
+    recompute = {
+        pos for pos, neighbors in saved.items()
+        if pos not in changed and (not neighbors or any(other in changed for other, _ in neighbors))
+    }
+    # リストが k 件に満たない行は類似度が MIN_SCORE 以上なら追加できる
+    thresholds = np.full(matrix.shape[0], MIN_SCORE, dtype=np.float32)
+    for pos, neighbors in saved.items():
+        if len(neighbors) >= k:
+            thresholds[pos] = max(neighbors[-1][1], MIN_SCORE)
+
+    additions: Dict[int, Neighbors] = {}
+    changed_positions = sorted(changed)
+    for start in range(0, len(changed_positions), settings.SIMILAR_BATCH_SIZE):
+        batch = np.asarray(changed_positions[start:start + settings.SIMILAR_BATCH_SIZE])
+        scores = batch_scores(matrix, batch)
+        for i, pos in zip(*np.nonzero(scores >= thresholds)):
+            other = int(pos)
+            if other not in changed and other not in recompute:
+                additions.setdefault(other, []).append((int(batch[i]), float(scores[i, pos])))
+
+    merged: Dict[int, Neighbors] = {}
+    for pos, extra in additions.items():
+        candidates = saved.get(pos, []) + extra
+        merged[pos] = _ranked(
+            np.asarray([other for other, _ in candidates]),
+            np.asarray([score for _, score in candidates], dtype=np.float32),
+            k
+        )
+    merged.update(computed)
+    return merged, recompute
+
+def _save_neighbors(conn, neighbors: Dict[int, Neighbors], ids: Sequence[int]):
+    """補助金ごとの類似リストを置き換え"""
+    chunk_size = settings.BULK_CHUNK_SIZE
+    subsidy_ids = [ids[pos] for pos in neighbors]
+    for i in range(0, len(subsidy_ids), chunk_size):
+        conn.execute(delete(SubsidySimilar).where(SubsidySimilar.subsidy_id.in_(subsidy_ids[i:i + chunk_size])))
+    values = [
+        {"subsidy_id": ids[pos], "rank": rank, "similar_id": ids[other], "score": score}
+        for pos, items in neighbors.items()
+        for rank, (other, score) in enumerate(items)
+    ]
+    for i in range(0, len(values), chunk_size):
+        conn.execute(insert(SubsidySimilar), values[i:i + chunk_size])
+
+_update_lock = threading.Lock()
+
+def update_similar_subsidies(full: bool = False) -> int:
+    """類似する補助金を計算して保存（前回の計算以降に内容が変わった行のみ）
+
+    - 全行の文字n-gramからTF-IDF行列を作成し、変更行の上位 k 件を行列積で求める
+    - 変更のない行のリストには、変更行との類似度（対称）が k 位を上回るものを追加する
+    - 変更行・削除行を含んでいたリストは再計算する
+    - 変更が SIMILAR_FULL_REBUILD_RATIO を超える場合・未計算の場合は全件を再計算する
+      （増分更新では変更のない行同士の類似度は前回のIDFのまま）
+    戻り値は類似リストを書き込んだ補助金の件数。
+    """
+    with _update_lock:
+        started = time.perf_counter()
+        k = settings.SIMILAR_TOP_K
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(
+                    Subsidy.id, Subsidy.content_hash, Subsidy.similar_hash,
+                    Subsidy.title_norm, Subsidy.description_norm, Subsidy.keywords_norm
+                ).order_by(Subsidy.id)
+            ).all()
+            ids = [row[0] for row in rows]
+            position = {subsidy_id: pos for pos, subsidy_id in enumerate(ids)}
+            changed = {pos for pos, row in enumerate(rows) if row[1] != row[2]}
+            if not rows or (not changed and not full):
+                return 0
+            has_saved = conn.execute(select(SubsidySimilar.subsidy_id).limit(1)).first() is not None
+            full = full or not has_saved or len(changed) > settings.SIMILAR_FULL_REBUILD_RATIO * len(rows)
+            saved = {} if full else _load_neighbors(conn, position)
+
+        matrix = tfidf_matrix(text_grams(row[3], row[4], row[5]) for row in rows)
+        if full:
+            neighbors = top_neighbors(matrix, range(len(rows)), k)
+        else:
+            computed = top_neighbors(matrix, sorted(changed), k)
+            neighbors, recompute = _merge_changed(saved, computed, changed, matrix, k)
+            neighbors.update(top_neighbors(matrix, sorted(recompute), k))
+
+        with engine.begin() as conn:
+            if full:
+                conn.execute(delete(SubsidySimilar))
+            else:
+                # 削除済みの補助金のリスト
+                conn.execute(delete(SubsidySimilar).where(SubsidySimilar.subsidy_id.not_in(select(Subsidy.id))))
+            _save_neighbors(conn, neighbors, ids)
+            # 計算に使った内容のハッシュを記録（計算中に更新された行は次回再計算される）
+            hashes = [{"row_id": rows[pos][0], "hash": rows[pos][1]} for pos in (range(len(rows)) if full else changed)]
+            conn.execute(
+                update(Subsidy)
+                .where(Subsidy.id == bindparam("row_id"))
+                .values(similar_hash=bindparam("hash")),
+                hashes
+            )
+
+        if neighbors:
+            bump_data_version()
+        logger.info(
+            f"類似する補助金を{'全件' if full else '増分'}更新: 変更 {len(changed)}件, "
+            f"書き込み {len(neighbors)}件（{time.perf_counter() - started:.1f}秒）"
+        )
+        return len(neighbors)
+
+async def refresh_similar_subsidies() -> int:
+    """取り込み後に類似する補助金を更新（失敗しても取り込みの結果には影響させない）"""
+    try:
+        return await asyncio.to_thread(update_similar_subsidies)
+    except Exception as e:
+        logger.error(f"類似する補助金の更新に失敗: {e}")
+        return 0
+
+def similar_query(subsidy_id: int, limit: int):
+    """類似する補助金を取得するクエリ（主キー (subsidy_id, rank) の範囲検索と id での結合）"""
+    return (
+        select(
+            Subsidy.id,
+            Subsidy.title,
+            Subsidy.organization,
+            Subsidy.target,
+            Subsidy.application_end,
+            Subsidy.active,
+            Subsidy.url,
+            SubsidySimilar.score,
+        )
+        .join(SubsidySimilar, SubsidySimilar.similar_id == Subsidy.id)
+        .where(SubsidySimilar.subsidy_id == subsidy_id)
+        .order_by(SubsidySimilar.rank)
+        .limit(limit)
+    )
@@ -0,0 +1,59 @@
+from typing import Dict, Any, Optional, Tuple
+from loguru import logger
+from sqlalchemy import case
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .active_window import active_condition
+from .database import async_read_engine, get_data_version
+from .models import Subsidy
+
+def stats_query():
+    """交付団体・データソースごとの件数を集計するクエリ（募集中は保存済みのフラグで数える）"""
+    active = case((active_condition(), 1), else_=0)
+    return select(
+        Subsidy.organization,
+        Subsidy.source,
+        func.count(Subsidy.id),
+        func.sum(active)
+    ).group_by(Subsidy.organization, Subsidy.source)
+
+async def compute_stats(session: AsyncSession) -> Dict[str, Any]:
+    """統計情報を1回の GROUP BY で集計"""
+    results = (await session.exec(stats_query())).all()
+
+    total_count = 0
+    active_count = 0
+    organizations: Dict[str, int] = {}
+    sources: Dict[str, Dict[str, int]] = {}
+    for organization, source, count, active_sum in results:
+        active_sum = active_sum or 0
+        total_count += count
+        active_count += active_sum
+        organizations[organization] = organizations.get(organization, 0) + count
+        source_stats = sources.setdefault(source, {"total_count": 0, "active_count": 0})
+        source_stats["total_count"] += count
+        source_stats["active_count"] += active_sum
+
+    return {
+        "total_count": total_count,
+        "active_count": active_count,
+        "organizations": organizations,
+        "sources": sources
+    }
+
+# キャッシュ（データバージョン -> 統計）
+_cache: Optional[Tuple[int, Dict[str, Any]]] = None
+
+async def get_cached_stats() -> Dict[str, Any]:
+    """統計情報を取得（データ更新までキャッシュ、募集中フラグの更新もデータ更新として扱う）"""
+    global _cache
+    key = get_data_version()
+    if _cache is not None and _cache[0] == key:
+        return _cache[1]
+
+    async with AsyncSession(async_read_engine) as session:
+        stats = await compute_stats(session)
+    _cache = (key, stats)
+    logger.debug(f"統計情報を再集計: {stats['total_count']}件")
+    return stats
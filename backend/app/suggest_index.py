@@ -0,0 +1,196 @@
+import asyncio
+import heapq
+import threading
+from bisect import bisect_left
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from loguru import logger
+from sqlmodel import Session, select
+
+from .catalog_snapshot import CatalogSnapshot, current_snapshot
+from .config import settings
+from .database import engine, get_data_version
+from .models import Subsidy
+from .normalization import normalize_query, split_terms
+
+# 候補の種別（同じ語が複数の種別に出現する場合は先の種別にまとめる）
+SUGGEST_KINDS = ("organization", "target", "keyword", "title")
+_KIND_ORDER = {kind: i for i, kind in enumerate(SUGGEST_KINDS)}
+
+# 募集中の補助金での出現の重み（終了したものは1）
+ACTIVE_WEIGHT = 3
+
+# 前方一致する語がこれ以下なら問い合わせ時に並べ替え、超えるなら上位を事前計算しておく
+SCAN_LIMIT = 256
+
+# 前方一致の範囲の上限（どの語よりも後ろに並ぶ文字）
+_MAX_CHAR = "\U0010ffff"
+
+# 補助金1件分の候補: (タイトル, 正規化済みタイトル, キーワード, 交付団体, 対象者, 募集中)
+SuggestRow = Tuple[str, str, str, str, str, bool]
+
+class SuggestIndex:
+    """入力補完用の前方一致インデックス
+
+    正規化済みの語（normalization.normalize_text）を並べた配列を二分探索して前方一致の範囲を求める。
+    語の重みは出現した補助金の数（募集中は ACTIVE_WEIGHT 倍）。
+    範囲が SCAN_LIMIT を超える接頭辞（短い入力）は重み順の上位を構築時に計算しておき、
+    問い合わせ時に並べ替える語の数を抑える。
+    """
+
+    def __init__(self, rows: Iterable[SuggestRow], version: int = 0):
+        self.version = version
+        # 正規化した語 -> [表示する語, 種別, 出現数, 募集中の出現数]
+        terms: Dict[str, List[Any]] = {}
+
+        def add(normalized: str, display: str, kind: str, active: bool):
+            term = terms.get(normalized)
+            if term is None:
+                term = terms[normalized] = [display, kind, 0, 0]
+            elif _KIND_ORDER[kind] < _KIND_ORDER[term[1]]:
+                term[0], term[1] = display, kind
+            term[2] += 1
+            if active:
+                term[3] += 1
+
+        for title, title_norm, keywords, organization, target, active in rows:
+            if title_norm:
+                add(title_norm, title, "title", active)
+            for normalized, keyword in split_terms(keywords):
+                add(normalized, keyword, "keyword", active)
+            normalized = normalize_query(organization)
+            if normalized:
+                add(normalized, organization, "organization", active)
+            for normalized, value in split_terms(target):
+                add(normalized, value, "target", active)
+
+        self.keys: List[str] = sorted(terms)
+        self.terms: List[List[Any]] = [terms[key] for key in self.keys]
+        # 重み順（同じ重みは語の順）の順位
+        order = sorted(
+            range(len(self.keys)),
+            key=lambda pos: (-(self.terms[pos][2] + (ACTIVE_WEIGHT - 1) * self.terms[pos][3]), self.keys[pos])
+        )
+        self._rank = [0] * len(order)
+        for rank, pos in enumerate(order):
+            self._rank[pos] = rank
+        self._top: Dict[str, List[int]] = {}
+        self._build_top("", 0, len(self.keys))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _build_top(self, prefix: str, lo: int, hi: int) -> List[int]:
+        """keys[lo:hi]（prefix で始まる語）の重み順の上位（範囲が広い接頭辞は保存する）"""
+        rank = self._rank.__getitem__
+        limit = settings.SUGGEST_MAX_LIMIT
+        if hi - lo <= SCAN_LIMIT:
+            return sorted(range(lo, hi), key=rank)[:limit]
+
+        # 1文字長い接頭辞ごとの上位を合わせる（prefix そのものの語は先頭に並ぶ）
+        keys = self.keys
+        depth = len(prefix)
+        candidates = []
+        pos = lo
+        if len(keys[pos]) == depth:
+            candidates.append(pos)
+            pos += 1
+        while pos < hi:
+            child = keys[pos][:depth + 1]
+            end = bisect_left(keys, child + _MAX_CHAR, pos, hi)
+            candidates.extend(self._build_top(child, pos, end))
+            pos = end
+        top = heapq.nsmallest(limit, candidates, key=rank)
+        self._top[prefix] = top
+        return top
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """prefix で始まる語を重み順に返す（prefix は正規化して照合する）"""
+        prefix = normalize_query(prefix)
+        if not prefix:
+            return []
+        top = self._top.get(prefix)
+        if top is None:
+            lo = bisect_left(self.keys, prefix)
+            hi = bisect_left(self.keys, prefix + _MAX_CHAR, lo)
+            top = heapq.nsmallest(limit, range(lo, hi), key=self._rank.__getitem__)
+        return [
+            {"text": text, "type": kind, "count": count, "active_count": active}
+            for text, kind, count, active in (self.terms[pos] for pos in top[:limit])
+        ]
+
+def load_suggest_rows(session: Session) -> List[SuggestRow]:
+    """DBから入力補完の対象の列を取得"""
+    results = session.exec(
+        select(
+            Subsidy.title,
+            Subsidy.title_norm,
+            Subsidy.keywords,
+            Subsidy.organization,
+            Subsidy.target,
+            Subsidy.active,
+        )
+    ).all()
+    return [
+        (row[0] or "", row[1], row[2] or "", row[3] or "", row[4] or "", row[5])
+        for row in results
+    ]
+
+def load_suggest_rows_from_snapshot(snapshot: CatalogSnapshot) -> Iterable[SuggestRow]:
+    """カタログスナップショットから入力補完の対象の列を取得（DBを読まない）"""
+    value = snapshot.value
+    for pos in range(len(snapshot)):
+        yield (
+            value(pos, "title") or "",
+            value(pos, "title_norm"),
+            value(pos, "keywords") or "",
+            value(pos, "organization") or "",
+            value(pos, "target") or "",
+            value(pos, "is_active"),
+        )
+
+# シングルトンインスタンス
+_index: Optional[SuggestIndex] = None
+_rebuild_lock = threading.Lock()
+
+def rebuild_suggest_index() -> SuggestIndex:
+    """インデックスを再構築（データ更新後に呼び出す）"""
+    global _index
+    with _rebuild_lock:
+        version = get_data_version()
+        if _index is not None and _index.version == version:
+            # 待っている間に他のスレッドが構築済み
+            return _index
+        snapshot = current_snapshot()
+        if snapshot is not None:
+            rows = load_suggest_rows_from_snapshot(snapshot)
+        else:
+            with Session(engine) as session:
+                rows = load_suggest_rows(session)
+        index = SuggestIndex(rows, version)
+        _index = index
+    logger.info(f"入力補完インデックスを構築: {len(index)}語")
+    return index
+
+def get_suggest_index() -> SuggestIndex:
+    """インデックスを取得（未構築・データ更新後なら構築）"""
+    if _index is None or _index.version != get_data_version():
+        return rebuild_suggest_index()
+    return _index
+
+def current_suggest_index() -> Optional[SuggestIndex]:
+    """構築済みのインデックス（データ更新後の再構築を待たない、未構築なら None）"""
+    return _index
+
+_rebuild_task: Optional[asyncio.Task] = None
+
+async def _rebuild_in_background():
+    try:
+        await asyncio.to_thread(rebuild_suggest_index)
+    except Exception as e:
+        logger.error(f"入力補完インデックスの構築に失敗: {e}")
+
+def schedule_suggest_rebuild():
+    """バックグラウンドで再構築（実行中なら何もしない）"""
+    global _rebuild_task
+    if _rebuild_task is None or _rebuild_task.done():
+        _rebuild_task = asyncio.get_running_loop().create_task(_rebuild_in_background())
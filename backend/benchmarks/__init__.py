@@ -0,0 +1 @@
+"""パフォーマンス計測用スクリプト（backend ディレクトリで python -m benchmarks.<name> として実行）"""
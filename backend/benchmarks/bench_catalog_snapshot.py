@@ -0,0 +1,158 @@
+"""カタログスナップショットのベンチマーク（書き出し時間、DBとのレイテンシ比較、ワーカーごとのメモリ）
+
+    python -m benchmarks.bench_catalog_snapshot [--rows 20000] [--workers 1 2 4 8] [--ops 300]
+
+1. 合成データのDBからスナップショットを書き出す時間とファイルサイズ
+2. benchmarks.suite を CATALOG_SNAPSHOT_ENABLED=false / true で実行した一覧・詳細・マッチングのレイテンシ
+3. ワーカー数ごとのメモリ（Linux のみ、/proc/self/smaps を参照）
+   - snapshot: 各プロセスがスナップショットを mmap して全行を読む（ページは共有され、PSS はワーカー数で割られる）
+   - python:   各プロセスが全行をDBから辞書として読み込む（ワーカーごとに同じ量の私有メモリを使う）
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ["subsidy_detail", "subsidies_page", "match", "match_index_build"]
+
+# ワーカー役のプロセス: 読み込み後に ready を出力し、全ワーカーの読み込みが終わってから計測する
+WORKER_CODE = """
+import json, os, sys
+from app.catalog_snapshot import CatalogSnapshot, default_snapshot_path
+from app.serialization import SUBSIDY_FIELDS
+
+def smaps(path=None):
+    # path 指定時はそのファイルのマッピングのみ、未指定ならプロセス全体（KiB）
+    totals = {"Rss": 0, "Pss": 0, "Private": 0}
+    current = path is None
+    with open("/proc/self/smaps") as f:
+        for line in f:
+            parts = line.split()
+            if not parts[0].endswith(":"):
+                current = path is None or (len(parts) >= 6 and parts[5] == path)
+                continue
+            if not current:
+                continue
+            key = parts[0][:-1]
+            if key in ("Rss", "Pss"):
+                totals[key] += int(parts[1])
+            elif key in ("Private_Clean", "Private_Dirty"):
+                totals["Private"] += int(parts[1])
+    return totals
+
+before = smaps()
+mode = sys.argv[1]
+if mode == "snapshot":
+    path = os.path.abspath(default_snapshot_path())
+    snapshot = CatalogSnapshot(path)
+    # 全行・全項目を読んでページに触れる（値は保持しない）
+    for start in range(0, len(snapshot), 1000):
+        snapshot.records(range(start, min(start + 1000, len(snapshot))), SUBSIDY_FIELDS)
+else:
+    from sqlmodel import Session, select
+    from app.database import engine
+    from app.models import Subsidy
+    with Session(engine) as session:
+        catalog = [subsidy.to_dict() for subsidy in session.exec(select(Subsidy))]
+    mapping = {"Rss": 0, "Pss": 0, "Private": 0}
+print("ready", flush=True)
+sys.stdin.readline()
+after = smaps()
+if mode == "snapshot":
+    mapping = smaps(path)
+print(json.dumps({"mapping": mapping, "private_delta": after["Private"] - before["Private"]}), flush=True)
+sys.stdin.read()
+"""
+
+def seed(env, rows: int) -> float:
+    """合成データを登録してスナップショットを書き出す（書き出し時間を返す）"""
+    code = (
+        "import asyncio, time\n"
+        "from app.database import create_db_and_tables\n"
+        "from app.catalog_snapshot import export_snapshot\n"
+        "from benchmarks.synthetic import seed_database\n"
+        "create_db_and_tables()\n"
+        f"asyncio.run(seed_database({rows}))\n"
+        "started = time.perf_counter()\n"
+        "export_snapshot()\n"
+        "print(time.perf_counter() - started)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, check=True, capture_output=True, text=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+def run_suite(env, enabled: bool, args, output: str) -> dict:
+    env = dict(env, CATALOG_SNAPSHOT_ENABLED="true" if enabled else "false")
+    command = [
+        sys.executable, "-m", "benchmarks.suite",
+        "--rows", str(args.rows), "--ops", str(args.ops), "--output", output,
+    ]
+    for name in SCENARIOS:
+        command += ["--scenario", name]
+    subprocess.run(command, cwd=BACKEND_DIR, env=env, check=True, stderr=subprocess.DEVNULL)
+    with open(output, encoding="utf-8") as f:
+        return json.load(f)["scenarios"]
+
+def measure_workers(env, mode: str, count: int) -> dict:
+    """count 個のワーカーを同時に起動して、1ワーカーあたりのメモリ（KiB）を返す"""
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", WORKER_CODE, mode], cwd=BACKEND_DIR, env=env,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        for _ in range(count)
+    ]
+    try:
+        for process in processes:
+            process.stdout.readline()  # ready
+        for process in processes:
+            process.stdin.write("\n")
+            process.stdin.flush()
+        results = [json.loads(process.stdout.readline()) for process in processes]
+    finally:
+        for process in processes:
+            process.stdin.close()
+            process.wait()
+    n = len(results)
+    return {
+        "mapping_rss": sum(r["mapping"]["Rss"] for r in results) / n,
+        "mapping_pss": sum(r["mapping"]["Pss"] for r in results) / n,
+        "mapping_private": sum(r["mapping"]["Private"] for r in results) / n,
+        "private_delta": sum(r["private_delta"] for r in results) / n,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--ops", type=int, default=300)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/subsidies.db", LOG_LEVEL="WARNING")
+    export_seconds = seed(env, args.rows)
+    size = os.path.getsize(os.path.join(tmp, "catalog.snapshot"))
+    print(f"export {args.rows} rows: {export_seconds * 1000:.0f} ms, {size / 1024 / 1024:.1f} MiB")
+
+    # suite は自身の一時DBを作成する
+    off = run_suite(env, False, args, os.path.join(tmp, "off.json"))
+    on = run_suite(env, True, args, os.path.join(tmp, "on.json"))
+    print(f"\n{'scenario':<18} {'db p50':>10} {'snap p50':>10} {'db p99':>10} {'snap p99':>10}")
+    for name in SCENARIOS:
+        print(f"{name:<18} {off[name]['p50_ms']:>8.3f}ms {on[name]['p50_ms']:>8.3f}ms "
+              f"{off[name]['p99_ms']:>8.3f}ms {on[name]['p99_ms']:>8.3f}ms")
+
+    if not os.path.exists("/proc/self/smaps"):
+        print("\n/proc/self/smaps がないためメモリの計測を省略します")
+        return
+    print(f"\n{'mode':<9} {'workers':>7} {'map RSS':>10} {'map PSS':>10} {'map private':>12} {'heap delta':>11}  (KiB / worker)")
+    for mode in ("snapshot", "python"):
+        for count in args.workers:
+            r = measure_workers(env, mode, count)
+            print(f"{mode:<9} {count:>7} {r['mapping_rss']:>10.0f} {r['mapping_pss']:>10.0f} "
+                  f"{r['mapping_private']:>12.0f} {r['private_delta']:>11.0f}")
+
+if __name__ == "__main__":
+    main()
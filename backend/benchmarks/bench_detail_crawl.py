@@ -0,0 +1,71 @@
+"""詳細ページクローラーのベンチマーク（保存済みHTMLを MockTransport で配信）
+
+    python -m benchmarks.bench_detail_crawl [--pages 300] [--latency-ms 80] [--host-rate 20]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from app.crawler import CrawlCache, DetailCrawler
+from app.config import settings
+
+FIXTURE = Path(__file__).parent / "fixtures" / "tokyo_detail.html"
+HOSTS = ("www.metro.tokyo.lg.jp", "www.sangyo-rodo.metro.tokyo.lg.jp")
+
+def make_transport(content: bytes, latency: float, failure_every: int) -> httpx.MockTransport:
+    """遅延と一時的なエラーを再現するモック"""
+    attempts = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        url = str(request.url)
+        attempts[url] = attempts.get(url, 0) + 1
+        # 一部のURLは初回のみ 503 を返す（再試行の確認用）
+        index = int(url.rsplit("/", 1)[-1].split(".")[0])
+        if failure_every and index % failure_every == 0 and attempts[url] == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, content=content, headers={"Content-Type": "text/html; charset=utf-8"})
+
+    return httpx.MockTransport(handler)
+
+async def run(args) -> None:
+    content = FIXTURE.read_bytes()
+    items = [
+        {"title": f"補助金{i}", "url": f"https://{HOSTS[i % len(HOSTS)]}/josei/{i:04d}.html", "target": "中小企業等"}
+        for i in range(args.pages)
+    ]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = CrawlCache(cache_dir, ttl_seconds=3600)
+        async with httpx.AsyncClient(transport=make_transport(content, args.latency_ms / 1000, args.failure_every)) as client:
+            for label in ("cold", "cached"):
+                crawler = DetailCrawler(
+                    client=client,
+                    concurrency=args.concurrency,
+                    host_rate=args.host_rate,
+                    backoff_seconds=0.1,
+                    cache=cache
+                )
+                started = time.perf_counter()
+                results = await crawler.crawl(items)
+                elapsed = time.perf_counter() - started
+                enriched = sum(1 for r in results if "application_end" in r)
+                print(f"{label:>6}: {len(items)} pages in {elapsed:.2f} s ({len(items) / elapsed:.0f} pages/s), enriched {enriched}")
+
+    print(f"sample: {results[0]}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--concurrency", type=int, default=settings.CRAWL_CONCURRENCY)
+    parser.add_argument("--host-rate", type=float, default=settings.CRAWL_HOST_RATE)
+    parser.add_argument("--failure-every", type=int, default=25)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
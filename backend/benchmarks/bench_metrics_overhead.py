@@ -0,0 +1,44 @@
+"""メトリクス計測のオーバーヘッド（METRICS_ENABLED=true / false でスイートを実行して比較）
+
+    python -m benchmarks.bench_metrics_overhead [--rows 10000] [--ops 500]
+
+設定は起動時に読み込まれるため、benchmarks.suite を別プロセスで2回実行する。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+SCENARIOS = ["subsidy_detail", "subsidies_page", "search_filters", "match", "stats"]
+
+def run_suite(enabled: bool, args, output: str) -> dict:
+    env = dict(os.environ, METRICS_ENABLED="true" if enabled else "false")
+    command = [
+        sys.executable, "-m", "benchmarks.suite",
+        "--rows", str(args.rows), "--ops", str(args.ops), "--output", output,
+    ]
+    for name in SCENARIOS:
+        command += ["--scenario", name]
+    subprocess.run(command, env=env, check=True, stderr=subprocess.DEVNULL)
+    with open(output, encoding="utf-8") as f:
+        return json.load(f)["scenarios"]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--ops", type=int, default=500)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    off = run_suite(False, args, os.path.join(tmp, "off.json"))
+    on = run_suite(True, args, os.path.join(tmp, "on.json"))
+
+    print(f"{'scenario':<16} {'off p50':>10} {'on p50':>10} {'overhead':>10}")
+    for name in SCENARIOS:
+        before, after = off[name]["p50_ms"], on[name]["p50_ms"]
+        print(f"{name:<16} {before:>8.3f}ms {after:>8.3f}ms {(after - before) * 1000:>8.0f}us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""正規化マッチングのベンチマーク（クエリ時に正規化する走査と取り込み時に正規化したインデックスの比較）
+
+    python -m benchmarks.bench_normalized_match [--rows 5000] [--profiles 200]
+
+取り込み時の正規化がない場合、表記ゆれ（全角英数・ひらがな等）を吸収するには
+クエリのたびに全件のテキストを正規化して走査する必要がある。
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+from app.match_index import (
+    BUSINESS_TYPE_WEIGHT, KEYWORD_DESCRIPTION_WEIGHT, KEYWORD_KEYWORDS_WEIGHT,
+    KEYWORD_TITLE_WEIGHT, MATCH_LIMIT, PREFECTURE_WEIGHT, TARGET_WEIGHT, MatchIndex,
+)
+from app.normalization import normalize_text, split_keywords
+from benchmarks.bench_match_batch import ORGS, TARGETS, WORDS, make_match_row
+
+# 表記ゆれのある条件（全角英数・ひらがな・大文字小文字）
+QUERY_WORDS = WORDS + ["ＤＸ", "ｉｔ", "Dx", "でじたる", "ものづくり", "ほじょ"]
+
+def make_items(count: int, rng: random.Random) -> List[dict]:
+    """合成した補助金（元のテキスト）"""
+    today = date.today()
+    return [
+        {
+            "id": i + 1,
+            "title": f"{rng.choice(WORDS)}{rng.choice(WORDS)}支援補助金{i}",
+            "description": "これは" + "、".join(rng.sample(WORDS, 4)) + "を支援する補助金です。",
+            "organization": rng.choice(ORGS),
+            "target": rng.choice(TARGETS),
+            "keywords": ",".join(rng.sample(WORDS, 3)),
+            "application_end": today + timedelta(days=rng.randint(-100, 100)),
+        }
+        for i in range(count)
+    ]
+
+def scan_match(items: List[dict], business_type, prefecture, target_type, keyword_list) -> List[Tuple[int, int]]:
+    """クエリ時に正規化して全件を走査（MatchIndex.match と同じ採点）"""
+    business_type = normalize_text(business_type)
+    prefecture = normalize_text(prefecture)
+    target_type = normalize_text(target_type)
+    keywords = [k for k in (normalize_text(k) for k in keyword_list) if k]
+    scores: Dict[int, int] = {}
+    for item in items:
+        title = normalize_text(item["title"])
+        description = normalize_text(item["description"])
+        score = 0
+        if prefecture and prefecture in normalize_text(item["organization"]):
+            score += PREFECTURE_WEIGHT
+        if target_type and target_type in normalize_text(item["target"]):
+            score += TARGET_WEIGHT
+        if business_type and business_type in description:
+            score += BUSINESS_TYPE_WEIGHT
+        tokens = split_keywords(item["keywords"])
+        for keyword in keywords:
+            if keyword in title:
+                score += KEYWORD_TITLE_WEIGHT
+            elif keyword in description:
+                score += KEYWORD_DESCRIPTION_WEIGHT
+            elif keyword in tokens:
+                score += KEYWORD_KEYWORDS_WEIGHT
+        if score:
+            scores[item["id"]] = score
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return ranked[:MATCH_LIMIT]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--profiles", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    items = make_items(args.rows, rng)
+    profiles = [
+        (
+            rng.choice([None, "it", "ＩＴ", "製造業", "観光"]),
+            rng.choice([None, "東京都", "大阪", "国"]),
+            rng.choice([None, "中小企業", "ふりーらんす", "ＮＰＯ"]),
+            rng.sample(QUERY_WORDS, rng.randint(1, 3)),
+        )
+        for _ in range(args.profiles)
+    ]
+
+    started = time.perf_counter()
+    expected = [scan_match(items, *profile) for profile in profiles]
+    scan_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    index = MatchIndex([make_match_row(item["id"], item, item["application_end"]) for item in items])
+    build_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = [[(row.id, score) for row, score in index.match(*profile)] for profile in profiles]
+    index_time = time.perf_counter() - started
+
+    print(f"{args.profiles} profiles x {args.rows} subsidies")
+    print(f"normalize per query  {scan_time / args.profiles * 1000:8.2f} ms/profile")
+    print(f"normalized index     {index_time / args.profiles * 1000:8.2f} ms/profile  ({scan_time / index_time:.0f}x, build {build_time * 1000:.0f} ms)")
+    print(f"same results: {actual == expected}")
+
+if __name__ == "__main__":
+    main()
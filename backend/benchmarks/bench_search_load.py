@@ -0,0 +1,154 @@
+"""/api/search の負荷ベンチマーク（同期Session と AsyncSession の比較）
+
+uvicorn を別プロセスで起動し、同時接続クライアントから /api/search を呼び出して
+レイテンシの p50/p99 を計測する。「旧」は以前のハンドラと同じく
+async def 内で同期 Session を使うルート（/legacy/search）。
+
+    python -m benchmarks.bench_search_load [--rows 20000] [--clients 100] [--requests 10]
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+def seed(rows: int):
+    """検索対象のデータを作成"""
+    from datetime import date, timedelta
+    from sqlmodel import Session
+    from app.database import create_db_and_tables, engine
+    from app.models import Subsidy
+
+    create_db_and_tables()
+    words = ["創業", "DX", "デジタル化", "商店街", "ものづくり", "観光", "省エネ", "雇用", "研究開発", "海外展開"]
+    orgs = ["国", "東京都", "大阪府", "北海道", "神奈川県", "福岡県"]
+    rng = random.Random(1)
+    with Session(engine) as session:
+        for i in range(rows):
+            session.add(Subsidy(
+                title=f"{rng.choice(words)}{rng.choice(words)}支援補助金{i}",
+                description="、".join(rng.sample(words, 4)) + "を支援する補助金です。",
+                organization=rng.choice(orgs),
+                target="中小企業",
+                url=f"https://example.jp/{i}",
+                keywords=",".join(rng.sample(words, 3)),
+                source="jgrants",
+                application_end=date.today() + timedelta(days=rng.randint(-100, 100))
+            ))
+        session.commit()
+
+def create_app():
+    """ベンチマーク用アプリ（uvicorn --factory で起動）"""
+    from fastapi import FastAPI
+    from sqlmodel import Session, select
+    from app.api import router
+    from app.database import engine, create_db_and_tables
+    from app.models import Subsidy
+    from app.search_index import apply_keyword_search
+
+    create_db_and_tables()
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+
+    @app.get("/legacy/search")
+    async def legacy_search(q: str, organization: str = None):
+        """旧ハンドラ相当（async def 内で同期 Session を使用）
+
+        Depends(get_session) のままだとセッションの解放がイベントループ待ちになり、
+        接続プール（既定 5+10）を超える同時接続でデッドロックするため、ここでは即時に閉じる。
+        """
+        query = apply_keyword_search(select(Subsidy), q)
+        if organization:
+            query = query.where(Subsidy.organization == organization)
+        with Session(engine) as db:
+            return [subsidy.to_dict() for subsidy in db.exec(query).all()]
+
+    return app
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+async def load(base_url: str, path: str, params_list, clients: int, requests: int):
+    """clients 並列で requests 回ずつ呼び出し、レイテンシ（ms）を返す"""
+    latencies = []
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def worker(n: int):
+            for i in range(requests):
+                params = params_list[(n * requests + i) % len(params_list)]
+                started = time.perf_counter()
+                response = await client.get(path, params=params)
+                latencies.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(clients)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_ready(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/api/stats", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("サーバーが起動しません")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=10)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/subsidies.db"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    seed(args.rows)
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--factory", "benchmarks.bench_search_load:create_app",
+         "--port", str(port), "--log-level", "warning"],
+        env=os.environ.copy(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    params_list = [
+        {"q": q, "organization": org}
+        for q in ("商店街支援補助金1", "デジタル化研究開発", "観光省エネ支援補助金2", "ものづくり雇用")
+        for org in ("東京都", "大阪府", "北海道")
+    ]
+    try:
+        wait_ready(base_url)
+        print(f"rows={args.rows} clients={args.clients} requests/client={args.requests}")
+        for label, path in (("sync Session (before)", "/legacy/search"), ("AsyncSession (after)", "/api/search")):
+            latencies, elapsed = asyncio.run(load(base_url, path, params_list, args.clients, args.requests))
+            print(
+                f"{label:<22} p50 {statistics.median(latencies):7.1f} ms  "
+                f"p99 {percentile(latencies, 0.99):7.1f} ms  "
+                f"{len(latencies) / elapsed:6.0f} req/s",
+                flush=True
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
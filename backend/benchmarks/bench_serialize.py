@@ -0,0 +1,108 @@
+"""検索結果のJSON化のベンチマーク（to_dict + FastAPI検証 + json と 行タプル + orjson の比較）
+
+    python -m benchmarks.bench_serialize [--rows 10000] [--repeat 5]
+
+一時DBに作成した全件を /api/search と同じ条件で取得し、レスポンスを受け取るまでの
+時間を計測する（ASGIで直接呼び出すためネットワークは含まない）。
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+def seed(rows: int) -> None:
+    """計測用のデータを作成"""
+    from sqlmodel import Session
+    from app.active_window import refresh_active_flags
+    from app.database import create_db_and_tables, engine
+    from app.models import Subsidy
+
+    create_db_and_tables()
+    words = ["創業", "DX", "デジタル化", "商店街", "ものづくり", "観光", "省エネ", "雇用", "研究開発", "海外展開"]
+    rng = random.Random(1)
+    with Session(engine) as session:
+        for i in range(rows):
+            session.add(Subsidy(
+                title=f"{rng.choice(words)}{rng.choice(words)}支援補助金{i}",
+                description="、".join(rng.sample(words, 4)) + "を支援する補助金です。" * 3,
+                organization=rng.choice(["国", "東京都", "大阪府"]),
+                target="中小企業,個人事業主",
+                amount="最大100万円（補助率2/3）",
+                application_start=date.today() - timedelta(days=30),
+                application_end=None if rng.random() < 0.1 else date.today() + timedelta(days=rng.randint(-100, 100)),
+                url=f"https://example.jp/{i}",
+                keywords=",".join(rng.sample(words, 3)),
+                source="jgrants"
+            ))
+        session.commit()
+    refresh_active_flags()
+
+def create_app():
+    """変更前後のハンドラを持つベンチマーク用アプリ"""
+    from fastapi import Depends, FastAPI
+    from fastapi.responses import ORJSONResponse
+    from sqlmodel import select
+    from sqlmodel.ext.asyncio.session import AsyncSession
+    from app.api import search_query
+    from app.database import get_async_session
+    from app.models import Subsidy
+    from app.serialization import SUBSIDY_FIELDS, rows_to_dicts
+
+    app = FastAPI()
+
+    @app.get("/before", response_model=List[Dict[str, Any]])
+    async def before(db: AsyncSession = Depends(get_async_session)):
+        """変更前: モデル取得 → to_dict → response_model 検証 → json"""
+        subsidies = (await db.exec(select(Subsidy))).all()
+        return [subsidy.to_dict() for subsidy in subsidies]
+
+    @app.get("/after", response_model=List[Dict[str, Any]])
+    async def after(db: AsyncSession = Depends(get_async_session)):
+        """変更後: 列のタプル取得 → rows_to_dicts → orjson"""
+        query = search_query()
+        rows = (await db.exec(query)).all()
+        return ORJSONResponse(rows_to_dicts(rows, SUBSIDY_FIELDS, query.selected_columns))
+
+    return app
+
+async def run(args) -> None:
+    import httpx
+
+    transport = httpx.ASGITransport(app=create_app())
+    bodies = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for label, path in (("to_dict + validate + json", "/before"), ("row tuples + orjson", "/after")):
+            await client.get(path)  # ウォームアップ
+            latencies = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies.append((time.perf_counter() - started) * 1000)
+            bodies[label] = response.json()
+            print(
+                f"{label:<26} median {statistics.median(latencies):7.1f} ms  "
+                f"min {min(latencies):7.1f} ms  ({len(response.content) / 1024:.0f} KiB, {len(bodies[label])} rows)"
+            )
+
+    before_body, after_body = bodies.values()
+    print(f"same JSON: {before_body == after_body}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/subsidies.db"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    seed(args.rows)
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""類似する補助金のベンチマーク（全件・増分の計算時間、増分の精度、API のレイテンシ）
+
+    python -m benchmarks.bench_similar [--rows 20000] [--changed 0.01] [--ops 500]
+
+合成データで全件を計算したあと、--changed の割合の補助金の内容を変更して取り込み、
+増分更新の時間と、全件を再計算した結果との一致率（上位 k 件の再現率）を出力する。
+/api/subsidies/{id}/similar（保存済みのリストの取得）と、リクエストごとに
+類似度を計算した場合（TF-IDF行列の作成 + 1行分の行列積）のレイテンシも比較する。
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import THEMES, generate_subsidies, seed_database
+
+def percentile(values, q: int) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] if len(values) > 1 else values[0]
+
+def saved_lists():
+    """保存済みの類似リスト（補助金ID -> 類似する補助金IDのリスト）"""
+    from sqlmodel import Session, select
+    from app.database import engine
+    from app.models import SubsidySimilar
+
+    lists = {}
+    with Session(engine) as session:
+        rows = session.exec(
+            select(SubsidySimilar.subsidy_id, SubsidySimilar.similar_id)
+            .order_by(SubsidySimilar.subsidy_id, SubsidySimilar.rank)
+        )
+        for subsidy_id, similar_id in rows:
+            lists.setdefault(subsidy_id, []).append(similar_id)
+    return lists
+
+async def change_rows(rows: int, ratio: float, seed: int) -> int:
+    """ratio の割合の補助金のタイトル・説明を変更して取り込む"""
+    from app.data_sources import bulk_upsert_subsidies
+    from app.database import bump_data_version
+
+    rng = random.Random(seed)
+    items = list(generate_subsidies(rows, 1))
+    changed = rng.sample(items, max(1, int(rows * ratio)))
+    for item in changed:
+        theme = rng.choice(THEMES)
+        item["title"] = f"{item['title']}（{theme}枠）"
+        item["description"] = f"{theme}に取り組む事業者を重点的に支援します。{item['description']}"
+    counts = await bulk_upsert_subsidies("jgrants", changed)
+    bump_data_version()
+    return counts["updated"]
+
+async def measure_api(ids, ops: int):
+    import httpx
+    from app.main import app
+
+    rng = random.Random(1)
+    latencies = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(ops):
+            subsidy_id = rng.choice(ids)
+            started = time.perf_counter()
+            response = await client.get(f"/api/subsidies/{subsidy_id}/similar")
+            latencies.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+    return latencies
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--changed", type=float, default=0.01, help="増分更新で変更する割合")
+    parser.add_argument("--ops", type=int, default=500)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/subsidies.db"
+    os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from loguru import logger
+    logger.remove()
+    logger.add(sys.stderr, level=os.environ["LOG_LEVEL"])
+
+    from app.database import create_db_and_tables
+    from app.similar import text_grams, tfidf_matrix, top_neighbors, update_similar_subsidies
+    from app.config import settings
+
+    create_db_and_tables()
+    asyncio.run(seed_database(args.rows))
+
+    started = time.perf_counter()
+    update_similar_subsidies()
+    full_seconds = time.perf_counter() - started
+    print(f"full build      {args.rows} rows: {full_seconds:7.2f} s")
+
+    updated = asyncio.run(change_rows(args.rows, args.changed, seed=2))
+    started = time.perf_counter()
+    written = update_similar_subsidies()
+    incremental_seconds = time.perf_counter() - started
+    print(f"incremental     {updated} changed: {incremental_seconds:7.2f} s  ({written} lists written)")
+
+    incremental = saved_lists()
+    update_similar_subsidies(full=True)
+    reference = saved_lists()
+    recall = statistics.fmean(
+        len(set(incremental.get(i, [])) & set(expected)) / len(expected)
+        for i, expected in reference.items() if expected
+    )
+    print(f"incremental vs full rebuild: recall@{settings.SIMILAR_TOP_K} {recall:.4f}")
+
+    ids = list(reference)
+    latencies = asyncio.run(measure_api(ids, args.ops))
+    print(f"/similar (stored)        p50 {percentile(latencies, 50):8.3f} ms  p99 {percentile(latencies, 99):8.3f} ms")
+
+    # リクエストごとに計算する場合: 行列の作成（全件）と1行分の行列積
+    from sqlmodel import Session, select
+    from app.database import engine
+    from app.models import Subsidy
+    with Session(engine) as session:
+        rows = session.exec(
+            select(Subsidy.title_norm, Subsidy.description_norm, Subsidy.keywords_norm).order_by(Subsidy.id)
+        ).all()
+    started = time.perf_counter()
+    matrix = tfidf_matrix(text_grams(*row) for row in rows)
+    build_ms = (time.perf_counter() - started) * 1000
+    rng = random.Random(1)
+    on_demand = []
+    for _ in range(min(args.ops, 100)):
+        started = time.perf_counter()
+        top_neighbors(matrix, [rng.randrange(len(rows))], settings.SIMILAR_TOP_K)
+        on_demand.append((time.perf_counter() - started) * 1000)
+    print(f"on demand (matrix built) p50 {percentile(on_demand, 50):8.3f} ms  p99 {percentile(on_demand, 99):8.3f} ms"
+          f"  + matrix build {build_ms:.0f} ms")
+
+if __name__ == "__main__":
+    main()
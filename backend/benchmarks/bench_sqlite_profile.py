@@ -0,0 +1,100 @@
+"""書き込みトランザクション中の読み取り遅延（ジャーナルモード別）
+
+    python -m benchmarks.bench_sqlite_profile [--rows 20000] [--hold 2.0] [--reads 200]
+
+書き込み用の接続で長いトランザクションを開いたまま、読み取り用の接続から
+検索クエリを繰り返し実行する。ロールバックジャーナル（DELETE）では読み取りが
+書き込みの完了まで待たされ、WAL では待たずに完了する。
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.config import settings
+from app.database import apply_sqlite_pragmas
+
+SCHEMA = "CREATE TABLE subsidy (id INTEGER PRIMARY KEY, title TEXT, organization TEXT)"
+READ_QUERY = "SELECT COUNT(*) FROM subsidy WHERE organization = :org"
+
+def make_engines(path: str, journal_mode: str):
+    """指定のジャーナルモードで書き込み用・読み取り用エンジンを作成"""
+    settings.SQLITE_JOURNAL_MODE = journal_mode
+    url = f"sqlite:///{path}"
+    writer = apply_sqlite_pragmas(create_engine(url, connect_args={"check_same_thread": False}))
+    reader = apply_sqlite_pragmas(create_engine(url, connect_args={"check_same_thread": False}), read_only=True)
+    return writer, reader
+
+def seed(writer, rows: int) -> None:
+    with writer.begin() as conn:
+        conn.execute(text(SCHEMA))
+        conn.execute(
+            text("INSERT INTO subsidy (title, organization) VALUES (:title, :org)"),
+            [{"title": f"補助金{i}", "org": f"団体{i % 50}"} for i in range(rows)]
+        )
+
+def hold_write_lock(writer, hold: float, started: threading.Event) -> None:
+    """書き込みロックを取得したまま hold 秒待機
+
+    大量の取り込みでページキャッシュがあふれた状態（排他ロック）を BEGIN EXCLUSIVE で再現する。
+    """
+    with writer.connect() as conn:
+        conn.exec_driver_sql("BEGIN EXCLUSIVE")
+        conn.exec_driver_sql("UPDATE subsidy SET title = title || '（更新）'")
+        started.set()
+        time.sleep(hold)
+        conn.exec_driver_sql("COMMIT")
+
+def run_profile(journal_mode: str, args) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        writer, reader = make_engines(os.path.join(directory, "bench.db"), journal_mode)
+        seed(writer, args.rows)
+
+        latencies = []
+        errors = 0
+        # 読み取り用の接続はプール済み（PRAGMA適用済み）の状態で計測する
+        with reader.connect() as conn:
+            conn.execute(text(READ_QUERY), {"org": "団体0"}).scalar_one()
+            conn.commit()
+
+            started = threading.Event()
+            thread = threading.Thread(target=hold_write_lock, args=(writer, args.hold, started))
+            thread.start()
+            started.wait()
+
+            for i in range(args.reads):
+                begin = time.perf_counter()
+                try:
+                    conn.execute(text(READ_QUERY), {"org": f"団体{i % 50}"}).scalar_one()
+                except Exception:
+                    errors += 1
+                latencies.append((time.perf_counter() - begin) * 1000)
+                conn.commit()
+            thread.join()
+        writer.dispose()
+        reader.dispose()
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{journal_mode:>6}: {args.reads} reads during a {args.hold:.1f} s write  "
+        f"p50 {statistics.median(latencies):8.2f} ms  p99 {p99:8.2f} ms  "
+        f"max {latencies[-1]:8.2f} ms  errors {errors}"
+    )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--hold", type=float, default=2.0)
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+
+    for journal_mode in ("DELETE", "WAL"):
+        run_profile(journal_mode, args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""起動時間のベンチマーク（import 時間、ポートが応答するまで、初期データ取得の完了まで）
+
+    python -m benchmarks.bench_startup [--rows 2000] [--source-delay 5] [--repeat 3]
+
+一時DBに既存データを作成し、応答の遅いデータソース（ローカルのHTTPサーバー）を
+指定して uvicorn を起動する。/api/health が200を返すまでの時間と、
+初期データ取得が完了する（initial_load が done になる）までの時間を計測する。
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_slow_source(delay: float) -> ThreadingHTTPServer:
+    """delay 秒待ってから503を返すデータソース"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(503)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def seed(env, rows: int) -> None:
+    """既存データを作成（別プロセス）"""
+    code = (
+        "import asyncio\n"
+        "from datetime import date, timedelta\n"
+        "from app.database import create_db_and_tables\n"
+        "from app.data_sources import bulk_upsert_subsidies\n"
+        "create_db_and_tables()\n"
+        f"items = [dict(title=f'創業支援補助金{{i}}', description='中小企業の創業を支援する補助金です。', "
+        "organization='東京都', target='中小企業', url=f'https://example.jp/{i}', keywords='創業,中小企業', "
+        f"application_end=date.today() + timedelta(days=i % 90)) for i in range({rows})]\n"
+        "asyncio.run(bulk_upsert_subsidies('jgrants', items))\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, check=True)
+
+def import_time(env) -> float:
+    """app.main の import 時間（秒）"""
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, check=True, capture_output=True, text=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+async def wait_for(client, url: str, predicate, started: float, timeout: float = 120) -> float:
+    """predicate(response) が真になるまでの経過時間（秒）"""
+    while time.perf_counter() - started < timeout:
+        try:
+            response = await client.get(url)
+            if predicate(response):
+                return time.perf_counter() - started
+        except Exception:
+            pass
+        await asyncio.sleep(0.01)
+    raise TimeoutError(url)
+
+async def measure_server(env) -> tuple:
+    """(応答開始, レディネス, 初期データ取得の完了) までの秒数"""
+    import httpx
+
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=1) as client:
+            live = await wait_for(client, "/api/health", lambda r: r.status_code == 200, started)
+            ready = await wait_for(client, "/api/health/ready", lambda r: r.status_code == 200, started)
+            loaded = await wait_for(
+                client, "/api/health", lambda r: r.json()["initial_load"] in ("done", "failed"), started
+            )
+        return live, ready, loaded
+    finally:
+        process.terminate()
+        process.wait()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--source-delay", type=float, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    source = start_slow_source(args.source_delay)
+    source_url = f"http://127.0.0.1:{source.server_address[1]}"
+    tmp = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp}/subsidies.db",
+        LOG_LEVEL="WARNING",
+        JGRANTS_API_URL=f"{source_url}/jgrants",
+        TOKYO_SUBSIDY_URL=f"{source_url}/tokyo",
+        CRAWL_DETAILS="false",
+        SCHEDULER_ENABLED="false",
+    )
+    seed(env, args.rows)
+
+    imports = [import_time(env) for _ in range(args.repeat)]
+    print(f"import app.main        median {statistics.median(imports) * 1000:7.0f} ms")
+
+    results = []
+    for _ in range(args.repeat):
+        # 実行記録を消して毎回データソースを取得させる
+        subprocess.run(
+            [sys.executable, "-c", "import sqlite3, sys; sqlite3.connect(sys.argv[1]).execute('DELETE FROM sourcerun').connection.commit()",
+             f"{tmp}/subsidies.db"],
+            check=True
+        )
+        results.append(asyncio.run(measure_server(env)))
+    live, ready, loaded = (statistics.median(values) for values in zip(*results))
+    print(f"/api/health 200        median {live * 1000:7.0f} ms")
+    print(f"/api/health/ready 200  median {ready * 1000:7.0f} ms")
+    print(f"initial load finished  median {loaded * 1000:7.0f} ms  (source delay {args.source_delay:.0f} s)")
+    source.shutdown()
+
+if __name__ == "__main__":
+    main()
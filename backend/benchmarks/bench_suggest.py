@@ -0,0 +1,133 @@
+"""入力補完（/api/suggest）のベンチマーク（インデックスの構築時間、検索・APIのレイテンシ）
+
+    python -m benchmarks.bench_suggest [--rows 100000] [--ops 5000]
+
+合成データの語（タイトル・キーワード・交付団体・対象者）の先頭 1〜8 文字を入力として、
+SuggestIndex.suggest の直接呼び出しと /api/suggest のレイテンシを計測する。
+/api/suggest はアプリを ASGI で直接呼び出した時間（ミドルウェア・依存関係を含み、HTTPの解析・
+ネットワークは含まない）と、参考として httpx.ASGITransport 経由の時間（クライアント側の処理を含む）を出力する。
+比較として同じ入力での /api/search（キーワード検索、--search-ops 回）も計測する。
+目標は /api/suggest（ASGI）の p99 が 1 ms 未満。
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+from benchmarks.synthetic import seed_database
+
+TARGET_P99_MS = 1.0
+
+def percentile(values, q: int) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] if len(values) > 1 else values[0]
+
+def report(name: str, latencies) -> float:
+    p99 = percentile(latencies, 99)
+    print(f"{name:<22} p50 {percentile(latencies, 50):8.3f} ms  p99 {p99:8.3f} ms  max {max(latencies):8.3f} ms")
+    return p99
+
+def sample_prefixes(index, count: int, seed: int = 1):
+    """入力中の文字列（語の表示形の先頭 1〜8 文字）"""
+    rng = random.Random(seed)
+    displays = [term[0] for term in index.terms]
+    prefixes = []
+    for _ in range(count):
+        text = rng.choice(displays)
+        prefixes.append(text[:rng.randint(1, min(len(text), 8))])
+    return prefixes
+
+async def asgi_get(app, path: str, params) -> int:
+    """アプリを ASGI で直接呼び出す（ステータスコードを返す）"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": urlencode(params).encode(), "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+async def measure_asgi(path: str, param: str, prefixes):
+    from app.main import app
+
+    latencies = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        status = await asgi_get(app, path, {param: prefix})
+        latencies.append((time.perf_counter() - started) * 1000)
+        if status != 200:
+            raise RuntimeError(f"{path}: {status}")
+    return latencies
+
+async def measure_httpx(path: str, param: str, prefixes):
+    import httpx
+    from app.main import app
+
+    latencies = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for prefix in prefixes:
+            started = time.perf_counter()
+            response = await client.get(path, params={param: prefix})
+            latencies.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+    return latencies
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--search-ops", type=int, default=50)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/subsidies.db"
+    os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from loguru import logger
+    logger.remove()
+    logger.add(sys.stderr, level=os.environ["LOG_LEVEL"])
+
+    from app.catalog_snapshot import publish_snapshot
+    from app.database import create_db_and_tables
+    from app.suggest_index import get_suggest_index, rebuild_suggest_index
+
+    create_db_and_tables()
+    asyncio.run(seed_database(args.rows))
+    asyncio.run(publish_snapshot())
+
+    started = time.perf_counter()
+    index = rebuild_suggest_index()
+    build_seconds = time.perf_counter() - started
+    print(f"build {args.rows} rows: {build_seconds:.2f} s, {len(index)} terms, "
+          f"{len(index._top)} precomputed prefixes")
+
+    prefixes = sample_prefixes(index, args.ops)
+    latencies = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        index.suggest(prefix, 10)
+        latencies.append((time.perf_counter() - started) * 1000)
+    report("SuggestIndex.suggest", latencies)
+
+    assert get_suggest_index() is index
+    api_p99 = report("/api/suggest (asgi)", asyncio.run(measure_asgi("/api/suggest", "prefix", prefixes)))
+    report("/api/suggest (httpx)", asyncio.run(measure_httpx("/api/suggest", "prefix", prefixes)))
+    if args.search_ops:
+        report("/api/search (asgi)", asyncio.run(measure_asgi("/api/search", "q", prefixes[:args.search_ops])))
+    print(f"target p99 < {TARGET_P99_MS} ms: {'OK' if api_p99 < TARGET_P99_MS else 'NG'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""東京都ページ解析のベンチマーク（旧: BeautifulSoup / 新: lxml XPath）
+
+    python -m benchmarks.bench_tokyo_parse [--repeat 20]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+
+from bs4 import BeautifulSoup
+
+from app.parsers import parse_tokyo_html
+
+FIXTURE = Path(__file__).parent / "fixtures" / "tokyo_subsidies.html"
+BASE_URL = "https://www.metro.tokyo.lg.jp/tosei/hodohappyo/press/2024/04/index.html"
+
+def parse_tokyo_html_bs4(content: bytes, url: str) -> List[Dict[str, Any]]:
+    """旧実装（scrape_tokyo_subsidies 内の BeautifulSoup 解析）"""
+    subsidies = []
+    soup = BeautifulSoup(content, 'lxml')
+    for item in soup.select('.subsidy-item, .content-box, article, .list-item'):
+        title_elem = (
+            item.select_one('h3, h2, .title, .heading') or
+            item.select_one('a[href*="subsidy"], a[href*="josei"]') or
+            item.select_one('a')
+        )
+        desc_elem = item.select_one('p, .description, .summary')
+        link_elem = item.select_one('a')
+        if title_elem and link_elem:
+            href = link_elem.get('href', '')
+            if href and not href.startswith(('http://', 'https://')):
+                href = f"{url.rstrip('/')}/{href.lstrip('/')}"
+            subsidies.append({
+                "title": title_elem.get_text(strip=True),
+                "description": desc_elem.get_text(strip=True) if desc_elem else "",
+                "organization": "東京都",
+                "target": "中小企業等",
+                "url": href,
+                "source": "scraping"
+            })
+    return subsidies
+
+def time_parser(parser, content: bytes, repeat: int) -> List[float]:
+    """解析時間（ms）を計測"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parser(content, BASE_URL)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+async def max_loop_lag(parse_coro) -> float:
+    """解析中のイベントループの最大遅延（ms）を計測"""
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append((time.perf_counter() - started) * 1000 - 1)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    await parse_coro
+    done.set()
+    await task
+    return max(lags)
+
+async def measure_lag(content: bytes):
+    async def inline_old():
+        parse_tokyo_html_bs4(content, BASE_URL)
+
+    async def threaded_new():
+        await asyncio.to_thread(parse_tokyo_html, content, BASE_URL)
+
+    return await max_loop_lag(inline_old()), await max_loop_lag(threaded_new())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    content = FIXTURE.read_bytes()
+    old = parse_tokyo_html_bs4(content, BASE_URL)
+    new = parse_tokyo_html(content, BASE_URL)
+    assert old == new, "旧実装と新実装の解析結果が一致しません"
+
+    old_ms = time_parser(parse_tokyo_html_bs4, content, args.repeat)
+    new_ms = time_parser(parse_tokyo_html, content, args.repeat)
+    print(f"fixture: {FIXTURE.name} ({len(content) / 1024:.0f} KB, {len(new)} items)")
+    print(f"BeautifulSoup: median {statistics.median(old_ms):.2f} ms, min {min(old_ms):.2f} ms")
+    print(f"lxml XPath:    median {statistics.median(new_ms):.2f} ms, min {min(new_ms):.2f} ms")
+    print(f"speed-up: x{statistics.median(old_ms) / statistics.median(new_ms):.1f}")
+
+    inline_lag, threaded_lag = asyncio.run(measure_lag(content))
+    print(f"event loop max lag: inline BeautifulSoup {inline_lag:.1f} ms, threaded lxml {threaded_lag:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""APIのクエリプランを確認（インデックスを使うべきクエリで全件走査していないか）
+
+    python -m benchmarks.check_query_plans [--rows 5000]
+
+一時DBにデータを作成し、API・更新処理と同じクエリ作成関数で組み立てたクエリに
+EXPLAIN QUERY PLAN を実行する。インデックスを使う前提のクエリで subsidy の
+全件走査（SCAN subsidy）が出た場合は終了コード1を返す。
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import date, timedelta
+
+# 全件走査（インデックスなし）の行
+FULL_SCAN = re.compile(r"^SCAN subsidy$")
+
+def seed(rows: int) -> None:
+    """確認用のデータを作成"""
+    from sqlmodel import Session
+    from app.active_window import refresh_active_flags
+    from app.database import create_db_and_tables, engine
+    from app.models import Subsidy
+
+    create_db_and_tables()
+    words = ["創業", "DX", "デジタル化", "商店街", "ものづくり", "観光", "省エネ", "雇用", "研究開発", "海外展開"]
+    orgs = ["国", "東京都", "大阪府", "北海道", "神奈川県", "福岡県", "東京都港区", "愛知県"]
+    rng = random.Random(1)
+    today = date.today()
+    with Session(engine) as session:
+        for i in range(rows):
+            session.add(Subsidy(
+                title=f"{rng.choice(words)}{rng.choice(words)}支援補助金{i}",
+                description="、".join(rng.sample(words, 4)) + "を支援する補助金です。",
+                organization=rng.choice(orgs),
+                target=rng.choice(["中小企業", "個人事業主", "NPO"]),
+                url=f"https://example.jp/{i}",
+                keywords=",".join(rng.sample(words, 3)),
+                source=rng.choice(["jgrants", "scraping"]),
+                # 大半は募集終了済み、一部は期限なし
+                application_end=None if rng.random() < 0.05 else today + timedelta(days=rng.randint(-1000, 60))
+            ))
+        session.commit()
+    refresh_active_flags()
+
+def plan_checks():
+    """(名前, クエリ, インデックス必須か) の一覧"""
+    from app.api import SUBSIDY_FIELDS, _encode_cursor, closing_soon_query, search_query, subsidies_query
+    from app.data_sources import existing_hashes_query
+    from app.models import Subsidy
+    from app.similar import similar_query
+    from app.stats import stats_query
+    from sqlmodel import select
+
+    today = date.today()
+    urls = [f"https://example.jp/{i}" for i in range(0, 1000, 7)]
+    return [
+        ("/subsidies?cursor=...", subsidies_query(list(SUBSIDY_FIELDS), _encode_cursor(100)), True),
+        ("/subsidies/{id}", select(Subsidy).where(Subsidy.id == 1), True),
+        ("/subsidies/{id}/similar", similar_query(1, 5), True),
+        ("/search?organization=", search_query(organization="東京都"), True),
+        ("/search?active_only=true", search_query(active_only=True), True),
+        ("/search?organization=&active_only=true", search_query(organization="東京都", active_only=True), True),
+        ("/closing-soon", closing_soon_query(14, today=today), True),
+        ("/search?q=(FTS)", search_query(q="デジタル化"), True),
+        ("/search?q=(FTS)&organization=", search_query(q="デジタル化", organization="東京都"), True),
+        ("/stats", stats_query(), True),
+        ("updater (source, url) lookup", existing_hashes_query("jgrants", urls), True),
+        # 部分一致のためインデックスを使えない（参考表示）
+        ("/search?q=(2文字, LIKE)", search_query(q="DX"), False),
+        ("/search?target=", search_query(target="中小企業"), False),
+        ("/subsidies?skip=", subsidies_query(list(SUBSIDY_FIELDS), skip=100), False),
+    ]
+
+def explain(conn, query):
+    """EXPLAIN QUERY PLAN の detail 列を取得"""
+    compiled = query.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+    return [row[-1] for row in rows]
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/subsidies.db"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    seed(args.rows)
+
+    from sqlalchemy import text
+    from app.database import engine
+
+    failures = 0
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        for name, query, requires_index in plan_checks():
+            details = explain(conn, query)
+            full_scan = any(FULL_SCAN.match(detail) for detail in details)
+            if full_scan and requires_index:
+                status = "FAIL"
+                failures += 1
+            else:
+                status = "ok" if requires_index else "info"
+            print(f"[{status:>4}] {name}")
+            for detail in details:
+                print(f"         {detail}")
+
+    print(f"{failures} failure(s)")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
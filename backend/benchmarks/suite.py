@@ -0,0 +1,291 @@
+"""APIと取り込みのベンチマークスイート（合成データ、結果はJSONで保存・比較できる）
+
+    python -m benchmarks.suite [--rows 10000] [--ops 200] [--scenario search_keyword ...]
+                               [--output results.json] [--compare baseline.json]
+
+一時DBに synthetic.generate_subsidies の補助金を取り込み、各シナリオを ASGI で
+直接呼び出して計測する（ネットワークは含まない）。シナリオごとに ops/s、
+レイテンシ（p50/p95/p99）、その時点のピークRSSを出力する。
+既定ではレスポンスキャッシュを無効にしてハンドラ自体を計測する（--response-cache で有効）。
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks.synthetic import CITIES, PREFECTURES, PURPOSES, TARGETS, THEMES, generate_subsidies, jgrants_item, seed_database
+
+# シナリオ: (client, rng) -> 1回分の処理
+Scenario = Callable[[Any, random.Random], Awaitable[None]]
+
+def peak_rss_mb() -> Optional[float]:
+    """プロセスのピークRSS（MiB）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KiB、macOS はバイト
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def _get(client, url: str, **params) -> None:
+    response = await client.get(url, params=params)
+    response.raise_for_status()
+
+def build_scenarios(rows: int, ingest_rows: int) -> Dict[str, Scenario]:
+    """シナリオ一覧（名前 -> 1回分の処理）"""
+    from app.api import _encode_cursor
+    from app.database import bump_data_version
+    from app.match_index import rebuild_match_index
+
+    organizations = PREFECTURES + CITIES
+    ingest_seed = iter(range(1000, 1_000_000))
+
+    async def subsidies_page(client, rng):
+        await _get(client, "/api/subsidies", limit=100, cursor=_encode_cursor(rng.randint(0, rows)))
+
+    async def subsidy_detail(client, rng):
+        await _get(client, f"/api/subsidies/{rng.randint(1, rows)}")
+
+    async def similar(client, rng):
+        # 取り込み後に計算済みの類似する補助金（詳細ページで表示する件数）
+        await _get(client, f"/api/subsidies/{rng.randint(1, rows)}/similar", limit=5)
+
+    async def search_keyword(client, rng):
+        await _get(client, "/api/search", q=rng.choice(THEMES))
+
+    async def search_filters(client, rng):
+        await _get(client, "/api/search", organization=rng.choice(organizations), active_only="true")
+
+    async def search_target(client, rng):
+        await _get(client, "/api/search", target=rng.choice(TARGETS), active_only="true")
+
+    async def closing_soon(client, rng):
+        await _get(client, "/api/closing-soon", days=rng.choice([7, 14, 30]))
+
+    async def match(client, rng):
+        await _get(
+            client, "/api/match",
+            business_type=rng.choice(THEMES),
+            prefecture=rng.choice(PREFECTURES),
+            target_type=rng.choice(TARGETS),
+            keywords=",".join(rng.sample(PURPOSES, 2))
+        )
+
+    async def match_batch(client, rng):
+        profiles = [
+            {
+                "business_type": rng.choice(THEMES),
+                "prefecture": rng.choice(PREFECTURES),
+                "target_type": rng.choice(TARGETS),
+                "keywords": rng.sample(PURPOSES, 2),
+            }
+            for _ in range(100)
+        ]
+        response = await client.post("/api/match/batch", json={"profiles": profiles})
+        response.raise_for_status()
+
+    async def suggest(client, rng):
+        # 入力途中の文字列（語の先頭 1〜3 文字）
+        await _get(client, "/api/suggest", prefix=rng.choice(THEMES + PREFECTURES + TARGETS)[:rng.randint(1, 3)])
+
+    async def stats(client, rng):
+        await _get(client, "/api/stats")
+
+    async def stats_cold(client, rng):
+        # データ更新直後（統計のキャッシュなし）
+        bump_data_version()
+        await _get(client, "/api/stats")
+
+    async def match_index_build(client, rng):
+        # データ更新直後（同じバージョンのインデックスは再構築されない）
+        bump_data_version()
+        await asyncio.to_thread(rebuild_match_index)
+
+    async def ingest_jgrants(client, rng):
+        # 新規の ingest_rows 件を jGrants API（モック）から取り込む
+        import httpx
+        from app.config import settings
+        from app.data_sources import update_jgrants_subsidies
+
+        seed = next(ingest_seed)
+        items = [jgrants_item(row) for row in generate_subsidies(ingest_rows, seed)]
+        page_size = settings.JGRANTS_PAGE_SIZE
+
+        def handler(request):
+            page = int(request.url.params.get("page", 1))
+            data = items[(page - 1) * page_size:page * page_size]
+            return httpx.Response(200, json={"data": data})
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as mock:
+            written = await update_jgrants_subsidies(client=mock)
+        bump_data_version()
+        if written != ingest_rows:
+            raise RuntimeError(f"取り込み件数が一致しません: {written} != {ingest_rows}")
+
+    return {
+        "subsidies_page": subsidies_page,
+        "subsidy_detail": subsidy_detail,
+        "similar": similar,
+        "search_keyword": search_keyword,
+        "search_filters": search_filters,
+        "search_target": search_target,
+        "closing_soon": closing_soon,
+        "match": match,
+        "match_batch": match_batch,
+        "suggest": suggest,
+        "stats": stats,
+        "stats_cold": stats_cold,
+        "match_index_build": match_index_build,
+        # データを追加するため最後に実行する
+        "ingest_jgrants": ingest_jgrants,
+    }
+
+# 1回が重いシナリオの回数（--ops より優先）
+HEAVY_OPS = {"match_index_build": 5, "ingest_jgrants": 3, "stats_cold": 20}
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, Any]:
+    """レイテンシ（秒）の集計"""
+    ms = [latency * 1000 for latency in latencies]
+    cuts = statistics.quantiles(ms, n=100, method="inclusive") if len(ms) > 1 else ms * 99
+    return {
+        "ops": len(ms),
+        "ops_per_sec": round(len(ms) / elapsed, 2),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(cuts[49], 3),
+        "p95_ms": round(cuts[94], 3),
+        "p99_ms": round(cuts[98], 3),
+        "max_ms": round(max(ms), 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+async def run_scenario(client, scenario: Scenario, ops: int, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    await scenario(client, rng)  # ウォームアップ
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(ops):
+        op_started = time.perf_counter()
+        await scenario(client, rng)
+        latencies.append(time.perf_counter() - op_started)
+    return summarize(latencies, time.perf_counter() - started)
+
+async def run(args) -> Dict[str, Any]:
+    import httpx
+    from app.catalog_snapshot import publish_snapshot
+    from app.database import create_db_and_tables
+    from app.main import app
+    from app.similar import refresh_similar_subsidies
+
+    create_db_and_tables()
+    started = time.perf_counter()
+    await seed_database(args.rows, args.seed)
+    seed_seconds = time.perf_counter() - started
+    # 取り込み後と同じく類似する補助金を計算し、スナップショットを書き出す
+    # （CATALOG_SNAPSHOT_ENABLED=false なら書き出さない）
+    await refresh_similar_subsidies()
+    await publish_snapshot()
+    print(f"seeded {args.rows} subsidies in {seed_seconds:.1f} s", file=sys.stderr)
+
+    scenarios = build_scenarios(args.rows, args.ingest_rows)
+    names = args.scenario or list(scenarios)
+    unknown = [name for name in names if name not in scenarios]
+    if unknown:
+        raise SystemExit(f"unknown scenario: {', '.join(unknown)}")
+
+    results: Dict[str, Any] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name in names:
+            ops = min(args.ops, HEAVY_OPS.get(name, args.ops))
+            results[name] = await run_scenario(client, scenarios[name], ops, args.seed)
+            r = results[name]
+            print(
+                f"{name:<18} {r['ops_per_sec']:>9.1f} ops/s  p50 {r['p50_ms']:>9.2f} ms  "
+                f"p95 {r['p95_ms']:>9.2f} ms  p99 {r['p99_ms']:>9.2f} ms  rss {r['peak_rss_mb']} MiB",
+                file=sys.stderr
+            )
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rows": args.rows,
+            "seed": args.seed,
+            "seed_seconds": round(seed_seconds, 2),
+            "response_cache": args.response_cache,
+        },
+        "scenarios": results,
+    }
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """2つの結果の比較（p50・p99 は baseline / current、1より大きければ高速化）"""
+    print(f"baseline {baseline['meta'].get('commit')} ({baseline['meta']['rows']} rows) -> "
+          f"current {current['meta'].get('commit')} ({current['meta']['rows']} rows)")
+    for name, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before:
+            print(f"{name:<18} (new)")
+            continue
+        print(
+            f"{name:<18} p50 {before['p50_ms']:>9.2f} -> {result['p50_ms']:>9.2f} ms ({before['p50_ms'] / result['p50_ms']:.2f}x)  "
+            f"p99 {before['p99_ms']:>9.2f} -> {result['p99_ms']:>9.2f} ms ({before['p99_ms'] / result['p99_ms']:.2f}x)"
+        )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--ops", type=int, default=200, help="シナリオごとの実行回数")
+    parser.add_argument("--ingest-rows", type=int, default=1000, help="ingest_jgrants の1回あたりの件数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scenario", action="append", help="実行するシナリオ（複数指定可、既定は全て）")
+    parser.add_argument("--response-cache", action="store_true", help="レスポンスキャッシュを有効にする")
+    parser.add_argument("--output", help="結果のJSONの保存先（既定は標準出力）")
+    parser.add_argument("--compare", help="比較する結果のJSON")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/subsidies.db"
+    os.environ["RESPONSE_CACHE_ENABLED"] = "true" if args.response_cache else "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from loguru import logger
+    logger.remove()
+    logger.add(sys.stderr, level=os.environ["LOG_LEVEL"])
+
+    result = asyncio.run(run(args))
+    payload = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), result)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""ベンチマーク用の合成データ（同じ seed なら同じ補助金を生成する）
+
+    from benchmarks.synthetic import generate_subsidies, seed_database
+
+実在しそうなタイトル・交付団体（国・省庁・都道府県・市区町村）・締切の分布を持つ
+補助金を生成する。jGrants API 形式への変換（jgrants_item）も提供する。
+"""
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+PREFECTURES = [
+    "北海道", "青森県", "岩手県", "宮城県", "秋田県", "山形県", "福島県", "茨城県", "栃木県", "群馬県",
+    "埼玉県", "千葉県", "東京都", "神奈川県", "新潟県", "富山県", "石川県", "福井県", "山梨県", "長野県",
+    "岐阜県", "静岡県", "愛知県", "三重県", "滋賀県", "京都府", "大阪府", "兵庫県", "奈良県", "和歌山県",
+    "鳥取県", "島根県", "岡山県", "広島県", "山口県", "徳島県", "香川県", "愛媛県", "高知県", "福岡県",
+    "佐賀県", "長崎県", "熊本県", "大分県", "宮崎県", "鹿児島県", "沖縄県",
+]
+CITIES = [
+    "東京都港区", "東京都渋谷区", "東京都新宿区", "東京都世田谷区", "東京都八王子市", "神奈川県横浜市",
+    "神奈川県川崎市", "大阪府大阪市", "大阪府堺市", "愛知県名古屋市", "福岡県福岡市", "北海道札幌市",
+    "宮城県仙台市", "広島県広島市", "京都府京都市", "兵庫県神戸市", "埼玉県さいたま市", "千葉県千葉市",
+    "静岡県浜松市", "新潟県新潟市", "熊本県熊本市", "岡山県岡山市",
+]
+NATIONAL = ["国", "経済産業省", "中小企業庁", "厚生労働省", "農林水産省", "環境省", "観光庁"]
+THEMES = [
+    "ものづくり・商業・サービス生産性向上", "IT導入", "事業再構築", "小規模事業者持続化", "創業", "DX推進",
+    "省エネルギー設備導入", "海外展開", "人材育成", "テレワーク導入", "観光振興", "商店街活性化", "事業承継",
+    "研究開発", "GX推進", "デジタル化", "販路開拓", "雇用調整", "キャリアアップ", "スマート農業",
+    "再生可能エネルギー", "脱炭素", "インバウンド対応", "BCP策定", "サイバーセキュリティ対策",
+]
+KINDS = ["補助金", "助成金", "支援事業", "奨励金", "促進事業費補助金"]
+TARGETS = [
+    "中小企業", "小規模事業者", "個人事業主", "フリーランス", "スタートアップ", "NPO法人",
+    "製造業", "商店街", "農業者", "医療法人", "社会福祉法人", "大学等研究機関",
+]
+PURPOSES = [
+    "生産性の向上", "業務の効率化", "新たな販路の開拓", "設備投資", "人材の確保と育成", "新製品の開発",
+    "省エネルギー化", "働き方改革", "地域経済の活性化", "事業の継続", "デジタル技術の活用", "海外市場への進出",
+]
+RATES = ["1/2", "2/3", "3/4", "定額", "1/3"]
+
+def _organization(rng: random.Random) -> str:
+    """交付団体（国:都道府県:市区町村 = 2:5:3）"""
+    roll = rng.random()
+    if roll < 0.2:
+        return rng.choice(NATIONAL)
+    if roll < 0.7:
+        return rng.choice(PREFECTURES)
+    return rng.choice(CITIES)
+
+def _application_end(rng: random.Random, today: date) -> Optional[date]:
+    """締切（1割は期限なし、大半は終了済み、一部は募集中）"""
+    roll = rng.random()
+    if roll < 0.1:
+        return None
+    if roll < 0.7:
+        return today - timedelta(days=rng.randint(1, 1000))
+    return today + timedelta(days=rng.randint(0, 180))
+
+def generate_subsidy(i: int, rng: random.Random, today: date, url_prefix: str) -> Dict[str, Any]:
+    """補助金1件（bulk_upsert_subsidies に渡せる形式）"""
+    organization = _organization(rng)
+    theme = rng.choice(THEMES)
+    region = "" if organization in NATIONAL else organization
+    year = today.year - rng.randint(0, 3)
+    purposes = rng.sample(PURPOSES, 2)
+    targets = rng.sample(TARGETS, rng.randint(1, 3))
+    application_end = _application_end(rng, today)
+    return {
+        "title": f"令和{year - 2018}年度 {region}{theme}{rng.choice(KINDS)}",
+        "description": (
+            f"{'、'.join(targets)}を対象に、{theme}に取り組む事業者の{purposes[0]}と{purposes[1]}を支援します。"
+            f"補助対象経費の一部を補助します。申請は電子申請により受け付けます。"
+        ),
+        "organization": organization,
+        "target": ",".join(targets),
+        "amount": f"最大{rng.choice([50, 100, 200, 300, 500, 1000, 3000])}万円（補助率{rng.choice(RATES)}）",
+        "application_start": (application_end or today) - timedelta(days=rng.randint(30, 120)),
+        "application_end": application_end,
+        "url": f"{url_prefix}/{i}",
+        "keywords": ",".join([theme] + rng.sample(PURPOSES, 2)),
+    }
+
+def generate_subsidies(
+    count: int,
+    seed: int = 1,
+    today: Optional[date] = None,
+    url_prefix: Optional[str] = None
+) -> Iterator[Dict[str, Any]]:
+    """count 件の補助金を生成（同じ seed・today なら同じ内容）"""
+    rng = random.Random(seed)
+    today = today or date.today()
+    url_prefix = url_prefix or f"https://example.jp/subsidies/{seed}"
+    for i in range(count):
+        yield generate_subsidy(i, rng, today, url_prefix)
+
+def jgrants_item(row: Dict[str, Any]) -> Dict[str, Any]:
+    """jGrants API の1件の形式に変換（日付は文字列、キーワードはリスト）"""
+    return dict(
+        row,
+        application_start=row["application_start"].isoformat() if row["application_start"] else None,
+        application_end=row["application_end"].isoformat() if row["application_end"] else None,
+        keywords=row["keywords"].split(","),
+    )
+
+async def seed_database(count: int, seed: int = 1, source: str = "jgrants", chunk_size: int = 10000) -> int:
+    """合成データを取り込み処理（bulk_upsert_subsidies）でDBに登録（最後にデータバージョンを進める）"""
+    from app.data_sources import bulk_upsert_subsidies
+    from app.database import bump_data_version
+
+    written = 0
+    chunk: List[Dict[str, Any]] = []
+    for row in generate_subsidies(count, seed):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            counts = await bulk_upsert_subsidies(source, chunk)
+            written += counts["added"] + counts["updated"]
+            chunk = []
+    if chunk:
+        counts = await bulk_upsert_subsidies(source, chunk)
+        written += counts["added"] + counts["updated"]
+    bump_data_version()
+    return written
@@ -0,0 +1,43 @@
+"""テスト共通の設定（app を読み込む前に一時DBを指定する）
+
+    cd backend && python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/subsidies.db"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import pytest
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    from app.database import create_db_and_tables
+    create_db_and_tables()
+
+@pytest.fixture
+def jgrants_update():
+    """MockTransport の handler で jGrants API を置き換えた更新処理（run_source に渡す）"""
+    import httpx
+
+    from app.data_sources import update_jgrants_subsidies
+
+    def make(handler):
+        async def update():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                return await update_jgrants_subsidies(client=client)
+        return update
+
+    return make
+
+@pytest.fixture(scope="session")
+def run():
+    """コルーチンを実行（非同期エンジンの接続がイベントループに結び付くため、全テストで同じループを使う）"""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
@@ -0,0 +1,52 @@
+"""日付の変更後の募集中フラグ（リクエストは更新を待たず、完了までは締切日で判定）"""
+import threading
+from datetime import date, timedelta
+
+import httpx
+from sqlalchemy import update
+
+from app import active_window
+from app.data_sources import bulk_upsert_subsidies
+from app.database import engine
+from app.models import Subsidy
+
+def test_requests_do_not_wait_for_flag_refresh(run, monkeypatch):
+    from app.main import app
+
+    yesterday = date.today() - timedelta(days=1)
+    url = "https://example.jp/active-window/closed"
+    run(bulk_upsert_subsidies("test", [{
+        "title": "昨日締切の補助金",
+        "description": "日付の変更のテスト",
+        "organization": "国",
+        "target": "中小企業",
+        "url": url,
+        "application_end": yesterday,
+    }]))
+    # 前日に更新したままのフラグ（締切を過ぎても募集中）
+    with engine.begin() as conn:
+        conn.execute(update(Subsidy).where(Subsidy.url == url).values(active=True))
+    monkeypatch.setattr(active_window, "_refreshed_on", yesterday)
+
+    release = threading.Event()
+    original = active_window.refresh_active_flags
+
+    def slow_refresh(today=None):
+        release.wait(5)
+        return original(today)
+
+    monkeypatch.setattr(active_window, "refresh_active_flags", slow_refresh)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            # 更新の完了前に応答し、締切を過ぎた補助金は募集中に含めない
+            response = await client.get("/api/search", params={"active_only": "true"})
+            assert response.status_code == 200
+            assert url not in [row["url"] for row in response.json()]
+            assert not active_window.active_flags_current()
+
+            release.set()
+            await active_window._refresh_task
+        assert active_window.active_flags_current()
+
+    run(scenario())
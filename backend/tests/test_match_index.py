@@ -0,0 +1,65 @@
+"""マッチングインデックスの再構築（同時に呼ばれても1回、データ更新は取り込み1回につき1回）"""
+import threading
+
+import httpx
+
+from app import match_index
+from app.config import settings
+from app.data_sources import run_source
+from app.database import bump_data_version, get_data_version
+
+def test_concurrent_rebuilds_build_once(monkeypatch):
+    bump_data_version()
+    builds = []
+    original = match_index.MatchIndex
+
+    def counting(*args, **kwargs):
+        builds.append(1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(match_index, "MatchIndex", counting)
+    threads = [threading.Thread(target=match_index.get_match_index) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+    assert match_index.current_match_index().version == get_data_version()
+
+def test_ingest_bumps_version_once(run, monkeypatch, jgrants_update):
+    from benchmarks.synthetic import generate_subsidies, jgrants_item
+
+    # 3ページ・3バッチに分けて書き込む
+    page_size = settings.JGRANTS_PAGE_SIZE
+    monkeypatch.setattr(settings, "INGEST_BATCH_SIZE", page_size)
+    items = [jgrants_item(row) for row in generate_subsidies(page_size * 3, seed=11)]
+
+    def handler(request):
+        page = int(request.url.params.get("page", 1))
+        return httpx.Response(200, json={"data": items[(page - 1) * page_size:page * page_size]})
+
+    before = get_data_version()
+    result = run(run_source("jgrants", jgrants_update(handler)))
+    assert result["count"] == page_size * 3
+    assert get_data_version() == before + 1
+
+def test_match_serves_previous_index_while_rebuilding(run):
+    from app.main import app
+    from app.response_cache import response_cache
+
+    match_index.get_match_index()
+    previous = match_index.current_match_index()
+    bump_data_version()
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            entries = len(response_cache)
+            response = await client.get("/api/match", params={"prefecture": "東京都"})
+            assert response.status_code == 200
+            # 再構築を待たずに前のインデックスで返し、その結果はキャッシュしない
+            assert len(response_cache) == entries
+            await match_index._rebuild_task
+
+    run(scenario())
+    assert match_index.current_match_index() is not previous
+    assert match_index.current_match_index().version == get_data_version()
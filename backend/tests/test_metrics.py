@@ -0,0 +1,25 @@
+"""取り込みの結果が ingest_runs_total の result ラベルに反映されること"""
+import httpx
+
+from app.data_sources import run_source
+from app.metrics import registry
+
+def _ingest_runs(source: str, result: str) -> float:
+    """/api/metrics の出力から ingest_runs_total の値を取得"""
+    prefix = f'ingest_runs_total{{result="{result}",source="{source}"}} '
+    for line in registry.render().splitlines():
+        if line.startswith(prefix):
+            return float(line[len(prefix):])
+    return 0
+
+def test_failed_fetch_is_counted_as_error(run, jgrants_update):
+    errors, ok = _ingest_runs("jgrants", "error"), _ingest_runs("jgrants", "ok")
+    run(run_source("jgrants", jgrants_update(lambda request: httpx.Response(500))))
+    assert _ingest_runs("jgrants", "error") == errors + 1
+    assert _ingest_runs("jgrants", "ok") == ok
+
+def test_successful_fetch_is_counted_as_ok(run, jgrants_update):
+    errors, ok = _ingest_runs("jgrants", "error"), _ingest_runs("jgrants", "ok")
+    run(run_source("jgrants", jgrants_update(lambda request: httpx.Response(200, json={"data": []}))))
+    assert _ingest_runs("jgrants", "ok") == ok + 1
+    assert _ingest_runs("jgrants", "error") == errors
@@ -0,0 +1,127 @@
+"""データソースの取得失敗が SourceRun・メトリクスに記録されること"""
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from app import data_sources
+from app.config import settings
+from app.data_sources import run_source, update_tokyo_subsidies
+from app.database import get_data_version
+from app.scheduler import SourceScheduler
+
+def _server_error(request):
+    return httpx.Response(500)
+
+def _connect_error(request):
+    raise httpx.ConnectError("connection refused", request=request)
+
+HANDLERS = {"status_500": _server_error, "connect_error": _connect_error}
+
+@pytest.fixture
+def tokyo_client(monkeypatch, run):
+    """東京都の取得に使うHTTPクライアントを差し替える"""
+    clients = []
+
+    def use(handler):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        clients.append(client)
+        monkeypatch.setattr(data_sources, "get_http_client", lambda: client)
+        return update_tokyo_subsidies
+
+    yield use
+    for client in clients:
+        run(client.aclose())
+
+@pytest.mark.parametrize("failure", list(HANDLERS))
+def test_jgrants_fetch_failure_is_an_error(failure, run, jgrants_update):
+    result = run(run_source("jgrants", jgrants_update(HANDLERS[failure])))
+    assert result["count"] == 0
+    assert result["error"]
+
+@pytest.mark.parametrize("failure", list(HANDLERS))
+def test_tokyo_fetch_failure_is_an_error(failure, tokyo_client, run):
+    result = run(run_source("tokyo", tokyo_client(HANDLERS[failure])))
+    assert result["count"] == 0
+    assert result["error"]
+
+@pytest.mark.parametrize("failure", list(HANDLERS))
+def test_failed_fetch_schedules_retry(failure, tokyo_client, run, jgrants_update):
+    sources = {"jgrants": jgrants_update(HANDLERS[failure]), "tokyo": tokyo_client(HANDLERS[failure])}
+    scheduler = SourceScheduler(sources, {"jgrants": 24, "tokyo": 24})
+    before = datetime.now()
+    summary = run(scheduler.run())
+
+    assert set(summary["errors"]) == {"jgrants", "tokyo"}
+    retry = timedelta(seconds=settings.SCHEDULER_RETRY_SECONDS)
+    for name in sources:
+        source_run = scheduler.status()["sources"][name]
+        assert source_run["error"]
+        # 間隔（24時間）ではなく再試行の間隔で次回を予定する
+        assert before + retry <= source_run["next_run"] <= datetime.now() + retry
+
+def test_jgrants_partial_fetch_keeps_written_rows(run, monkeypatch, jgrants_update):
+    from benchmarks.synthetic import generate_subsidies, jgrants_item
+
+    page_size = settings.JGRANTS_PAGE_SIZE
+    # 1ページ分でバッチを書き込む
+    monkeypatch.setattr(settings, "INGEST_BATCH_SIZE", page_size)
+    items = [jgrants_item(row) for row in generate_subsidies(page_size, seed=7)]
+
+    def handler(request):
+        if int(request.url.params.get("page", 1)) == 1:
+            return httpx.Response(200, json={"data": items})
+        return httpx.Response(500)
+
+    result = run(run_source("jgrants", jgrants_update(handler)))
+    # 1ページ目は書き込まれ、スナップショット等の更新対象になる
+    assert result["count"] == page_size
+    assert "500" in result["error"]
+
+def test_status_reads_runs_without_changing_scheduler(run):
+    from sqlmodel import Session
+
+    from app.database import engine
+    from app.main import app
+    from app.models import SourceRun
+    from app.scheduler import source_scheduler
+
+    with Session(engine) as session:
+        record = session.get(SourceRun, "tokyo") or SourceRun(name="tokyo")
+        record.rows_written = 7
+        session.add(record)
+        session.commit()
+    loaded = source_scheduler._runs
+
+    async def status():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return (await client.get("/api/scheduler/status")).json()
+
+    # DBの実行記録を返し、スケジューラが読み込んだ記録は置き換えない
+    assert run(status())["sources"]["tokyo"]["rows_written"] == 7
+    assert source_scheduler._runs is loaded
+
+def _write_then(failure):
+    """1バッチ書き込んでから失敗する更新処理"""
+    async def update():
+        await data_sources.bulk_upsert_subsidies("test", [{
+            "title": f"途中で{failure}",
+            "description": "書き込み後に失敗する更新処理",
+            "organization": "国",
+            "target": "中小企業",
+            "url": f"https://example.jp/partial/{failure}/{datetime.now().timestamp()}",
+        }])
+        if failure == "timeout":
+            await asyncio.sleep(60)
+        raise RuntimeError("書き込み後のエラー")
+    return update
+
+@pytest.mark.parametrize("failure", ["timeout", "exception"])
+def test_failed_run_counts_committed_rows(failure, run, monkeypatch):
+    monkeypatch.setattr(settings, "SOURCE_TIMEOUT_SECONDS", 0.5)
+    before = get_data_version()
+    result = run(run_source("test", _write_then(failure)))
+    assert result["error"]
+    assert result["count"] == 1
+    assert get_data_version() == before + 1
@@ -0,0 +1,80 @@
+"""カタログスナップショットの書き出し（DBと一致していれば書き出し直さない、失敗時はDBから読む）"""
+import os
+import threading
+
+import httpx
+
+from app import catalog_snapshot
+from app.catalog_snapshot import CatalogSnapshot, default_snapshot_path, export_snapshot, publish_snapshot, publish_snapshot_if_stale
+from app.data_sources import bulk_upsert_subsidies
+from app.database import bump_data_version, get_data_version
+
+def _subsidy(title):
+    return {
+        "title": title,
+        "description": "スナップショットのテスト",
+        "organization": "国",
+        "target": "中小企業",
+        "url": f"https://example.jp/snapshot/{title}",
+    }
+
+def test_publish_only_when_stale(run):
+    run(bulk_upsert_subsidies("test", [_subsidy("スナップショット1")]))
+    assert run(publish_snapshot())
+    path = default_snapshot_path()
+    stat = os.stat(path)
+    version = get_data_version()
+
+    # 一致していれば書き出さず、データバージョンも進めない
+    assert not run(publish_snapshot_if_stale())
+    assert os.stat(path).st_mtime_ns == stat.st_mtime_ns
+    assert get_data_version() == version
+
+    # DBが変わっていれば書き出し直す
+    run(bulk_upsert_subsidies("test", [_subsidy("スナップショット2")]))
+    assert run(publish_snapshot_if_stale())
+    assert os.stat(path).st_mtime_ns != stat.st_mtime_ns
+
+def test_failed_export_falls_back_to_db(run, monkeypatch):
+    from app.main import app
+
+    run(bulk_upsert_subsidies("test", [_subsidy("スナップショット3")]))
+    assert run(publish_snapshot())
+
+    def fail(path=None):
+        raise OSError("ディスクがいっぱいです")
+
+    monkeypatch.setattr(catalog_snapshot, "export_snapshot", fail)
+    run(bulk_upsert_subsidies("test", [_subsidy("スナップショット4")]))
+    bump_data_version()
+    assert not run(publish_snapshot())
+    assert catalog_snapshot.current_snapshot() is None
+
+    async def titles():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/api/subsidies", params={"limit": 1000, "fields": "title"})
+            return [row["title"] for row in response.json()]
+
+    assert "スナップショット4" in run(titles())
+
+def test_concurrent_exports_publish_a_valid_file(run):
+    run(bulk_upsert_subsidies("test", [_subsidy("スナップショット5")]))
+    path = default_snapshot_path()
+    errors = []
+
+    def export():
+        try:
+            export_snapshot(path)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=export) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    snapshot = CatalogSnapshot(path)
+    assert snapshot.fingerprint() == catalog_snapshot.db_fingerprint()
+    assert not [name for name in os.listdir(os.path.dirname(path)) if name.endswith(".tmp")]
@@ -0,0 +1,49 @@
+"""書き込みトランザクション中も読み取り用エンジンの読み取りが進むこと（WAL）"""
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import _is_sqlite, async_engine, async_read_engine
+
+# 書き込み中の読み取りの上限（ロック待ちなら busy_timeout まで待たされる）
+READ_BOUND_SECONDS = 1.0
+INSERT_ROWS = 200_000
+
+@pytest.mark.skipif(not _is_sqlite, reason="SQLite のロックの挙動")
+def test_reads_progress_during_long_write(run):
+    async def scenario():
+        async with async_read_engine.connect() as reader:
+            before = (await reader.execute(text("SELECT COUNT(*) FROM subsidy"))).scalar_one()
+
+        async with async_engine.connect() as writer:
+            # ページキャッシュを小さくして挿入中にディスクへ書き出させる
+            # （ロールバックジャーナルならここで排他ロックになり、読み取りが待たされる）
+            await writer.exec_driver_sql("PRAGMA cache_size=100")
+            await writer.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                await writer.exec_driver_sql("CREATE TABLE lock_probe (id INTEGER PRIMARY KEY, payload TEXT)")
+                await writer.exec_driver_sql(
+                    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?) "
+                    "INSERT INTO lock_probe (payload) SELECT printf('row-%d', i) FROM n",
+                    (INSERT_ROWS,)
+                )
+
+                # 書き込みロックを持ったまま、コミット前に読み取りが終わる
+                started = time.perf_counter()
+                async with async_read_engine.connect() as reader:
+                    during = (await asyncio.wait_for(
+                        reader.execute(text("SELECT COUNT(*) FROM subsidy")), READ_BOUND_SECONDS
+                    )).scalar_one()
+                elapsed = time.perf_counter() - started
+                assert writer.in_transaction()
+            finally:
+                await writer.exec_driver_sql("ROLLBACK")
+                await writer.exec_driver_sql(f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}")
+        return before, during, elapsed
+
+    before, during, elapsed = run(scenario())
+    assert elapsed < READ_BOUND_SECONDS
+    assert during == before
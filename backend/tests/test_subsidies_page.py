@@ -0,0 +1,54 @@
+"""一覧のカーソルページング（募集中のみ、スナップショット・DBのどちらでも同じ結果）"""
+from datetime import date, timedelta
+
+import httpx
+import pytest
+from sqlmodel import Session, select
+
+from app import active_window
+from app.catalog_snapshot import publish_snapshot
+from app.config import settings
+from app.data_sources import bulk_upsert_subsidies
+from app.database import bump_data_version, engine
+from app.models import Subsidy
+
+def _walk(run, params):
+    """X-Next-Cursor をたどって全ページのIDを取得"""
+    from app.main import app
+
+    async def pages():
+        ids = []
+        cursor = ""
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            while cursor is not None:
+                response = await client.get("/api/subsidies", params=dict(params, cursor=cursor, limit=3))
+                assert response.status_code == 200
+                ids += [row["id"] for row in response.json()]
+                cursor = response.headers.get("x-next-cursor")
+        return ids
+
+    return run(pages())
+
+@pytest.mark.parametrize("snapshot_enabled", [True, False])
+def test_active_only_cursor_pages(snapshot_enabled, run, monkeypatch):
+    today = date.today()
+    run(bulk_upsert_subsidies("test", [
+        {
+            "title": f"一覧{i}",
+            "description": "一覧のテスト",
+            "organization": "国",
+            "target": "中小企業",
+            "url": f"https://example.jp/page/{i}",
+            "application_end": today + timedelta(days=1 if i % 2 else -1),
+        }
+        for i in range(10)
+    ]))
+    bump_data_version()
+    active_window.refresh_active_flags()
+    assert run(publish_snapshot())
+    monkeypatch.setattr(settings, "CATALOG_SNAPSHOT_ENABLED", snapshot_enabled)
+
+    with Session(engine) as session:
+        expected = session.exec(select(Subsidy.id).where(Subsidy.active == True).order_by(Subsidy.id)).all()
+    assert expected
+    assert _walk(run, {"active_only": "true", "fields": "id,is_active"}) == expected
@@ -19,6 +19,26 @@ export const getSubsidies = async (skip = 0, limit = 100) => {
   }
 };
 
+// 補助金一覧をカーソルで取得（次ページのカーソルはレスポンスヘッダーで返る）
+export const getSubsidiesPage = async ({ cursor = '', limit = 100, fields, activeOnly } = {}) => {
+  try {
+    const queryParams = new URLSearchParams();
+    queryParams.append('cursor', cursor);
+    queryParams.append('limit', limit);
+    if (fields) queryParams.append('fields', fields.join(','));
+    if (activeOnly) queryParams.append('active_only', activeOnly);
+
+    const response = await apiClient.get(`/subsidies?${queryParams.toString()}`);
+    return {
+      items: response.data,
+      nextCursor: response.headers['x-next-cursor'] || null,
+    };
+  } catch (error) {
+    console.error('補助金一覧の取得に失敗:', error);
+    throw error;
+  }
+};
+
 // 補助金詳細を取得
 export const getSubsidyDetail = async (id) => {
   try {
@@ -30,6 +50,29 @@ export const getSubsidyDetail = async (id) => {
   }
 };
 
+// 類似する補助金を取得
+export const getSimilarSubsidies = async (id, limit = 5) => {
+  try {
+    const response = await apiClient.get(`/subsidies/${id}/similar?limit=${limit}`);
+    return response.data;
+  } catch (error) {
+    console.error('類似する補助金の取得に失敗:', error);
+    throw error;
+  }
+};
+
+// 入力補完（前方一致する補助金名・キーワード・交付団体・対象者）
+export const getSuggestions = async (prefix, limit = 8) => {
+  try {
+    const queryParams = new URLSearchParams({ prefix, limit });
+    const response = await apiClient.get(`/suggest?${queryParams.toString()}`);
+    return response.data;
+  } catch (error) {
+    console.error('入力補完の取得に失敗:', error);
+    throw error;
+  }
+};
+
 // 補助金を検索
 export const searchSubsidies = async (params) => {
   try {
@@ -1,13 +1,56 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
+import { getSuggestions } from '../api';
+
+const ORGANIZATIONS = ['国', '東京都'];
+const TARGETS = ['中小企業', '個人事業主', 'NPO'];
+
+// 入力補完の種別の表示名
+const SUGGESTION_LABELS = {
+  title: '補助金',
+  keyword: 'キーワード',
+  organization: '交付団体',
+  target: '対象者'
+};
+
+// 入力が止まってから候補を取得するまでの時間（ミリ秒）
+const SUGGEST_DELAY = 150;
 
 const SearchForm = ({ onSearch }) => {
   const [keyword, setKeyword] = useState('');
   const [organization, setOrganization] = useState('');
   const [target, setTarget] = useState('');
   const [activeOnly, setActiveOnly] = useState(true);
+  const [suggestions, setSuggestions] = useState([]);
+  const [showSuggestions, setShowSuggestions] = useState(false);
+  const [highlighted, setHighlighted] = useState(-1);
+
+  // 入力中のキーワードの候補を取得（古い応答は捨てる）
+  useEffect(() => {
+    const prefix = keyword.trim();
+    if (!prefix) {
+      setSuggestions([]);
+      return undefined;
+    }
+    let cancelled = false;
+    const timer = setTimeout(() => {
+      getSuggestions(prefix)
+        .then((data) => {
+          if (!cancelled) {
+            setSuggestions(data);
+            setHighlighted(-1);
+          }
+        })
+        .catch(() => {});
+    }, SUGGEST_DELAY);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [keyword]);
 
   const handleSubmit = (e) => {
     e.preventDefault();
+    setShowSuggestions(false);
     onSearch({
       q: keyword,
       organization,
@@ -16,20 +59,84 @@ const SearchForm = ({ onSearch }) => {
     });
   };
 
+  // 候補を選択して検索（交付団体・対象者は絞り込み条件として使う）
+  const selectSuggestion = (suggestion) => {
+    const params = { q: keyword, organization, target, activeOnly };
+    if (suggestion.type === 'organization') {
+      params.q = '';
+      params.organization = suggestion.text;
+      setOrganization(suggestion.text);
+      setKeyword('');
+    } else if (suggestion.type === 'target') {
+      params.q = '';
+      params.target = suggestion.text;
+      setTarget(suggestion.text);
+      setKeyword('');
+    } else {
+      params.q = suggestion.text;
+      setKeyword(suggestion.text);
+    }
+    setShowSuggestions(false);
+    onSearch(params);
+  };
+
+  const handleKeyDown = (e) => {
+    if (!showSuggestions || suggestions.length === 0) return;
+    if (e.key === 'ArrowDown') {
+      e.preventDefault();
+      setHighlighted((highlighted + 1) % suggestions.length);
+    } else if (e.key === 'ArrowUp') {
+      e.preventDefault();
+      setHighlighted((highlighted - 1 + suggestions.length) % suggestions.length);
+    } else if (e.key === 'Enter' && highlighted >= 0) {
+      e.preventDefault();
+      selectSuggestion(suggestions[highlighted]);
+    } else if (e.key === 'Escape') {
+      setShowSuggestions(false);
+    }
+  };
+
   return (
     <div className="card p-4">
       <h2 className="text-xl font-bold mb-4">補助金を検索</h2>
 
       <form onSubmit={handleSubmit}>
-        <div className="mb-4">
+        <div className="mb-4 relative">
           <label className="block text-gray-700 mb-2 text-sm font-medium">キーワード</label>
           <input
             type="text"
             className="input"
             placeholder="キーワードで検索"
+            autoComplete="off"
             value={keyword}
-            onChange={(e) => setKeyword(e.target.value)}
+            onChange={(e) => {
+              setKeyword(e.target.value);
+              setShowSuggestions(true);
+            }}
+            onKeyDown={handleKeyDown}
+            onBlur={() => setShowSuggestions(false)}
           />
+          {showSuggestions && suggestions.length > 0 && (
+            <ul className="absolute z-10 mt-1 w-full bg-white border border-gray-200 rounded shadow-lg max-h-72 overflow-y-auto">
+              {suggestions.map((suggestion, i) => (
+                <li
+                  key={`${suggestion.type}-${suggestion.text}`}
+                  className={`px-3 py-2 cursor-pointer flex justify-between items-center text-sm ${
+                    i === highlighted ? 'bg-blue-50' : 'hover:bg-gray-50'
+                  }`}
+                  // クリックより先に入力欄の blur で候補が閉じないようにする
+                  onMouseDown={(e) => e.preventDefault()}
+                  onClick={() => selectSuggestion(suggestion)}
+                  onMouseEnter={() => setHighlighted(i)}
+                >
+                  <span className="truncate">{suggestion.text}</span>
+                  <span className="ml-2 shrink-0 text-xs text-gray-500">
+                    {SUGGESTION_LABELS[suggestion.type]}・募集中 {suggestion.active_count}件
+                  </span>
+                </li>
+              ))}
+            </ul>
+          )}
         </div>
 
         <div className="mb-4">
@@ -40,8 +147,13 @@ const SearchForm = ({ onSearch }) => {
             onChange={(e) => setOrganization(e.target.value)}
           >
             <option value="">すべて</option>
-            <option value="国">国</option>
-            <option value="東京都">東京都</option>
+            {ORGANIZATIONS.map((value) => (
+              <option key={value} value={value}>{value}</option>
+            ))}
+            {/* 入力補完で選択した交付団体 */}
+            {organization && !ORGANIZATIONS.includes(organization) && (
+              <option value={organization}>{organization}</option>
+            )}
           </select>
         </div>
 
@@ -53,9 +165,13 @@ const SearchForm = ({ onSearch }) => {
             onChange={(e) => setTarget(e.target.value)}
           >
             <option value="">すべて</option>
-            <option value="中小企業">中小企業</option>
-            <option value="個人事業主">個人事業主</option>
-            <option value="NPO">NPO</option>
+            {TARGETS.map((value) => (
+              <option key={value} value={value}>{value}</option>
+            ))}
+            {/* 入力補完で選択した対象者 */}
+            {target && !TARGETS.includes(target) && (
+              <option value={target}>{target}</option>
+            )}
           </select>
         </div>
 
@@ -82,4 +198,4 @@ const SearchForm = ({ onSearch }) => {
   );
 };
 
-export default SearchForm;
\ No newline at end of file
+export default SearchForm;
@@ -1,12 +1,13 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, Link } from 'react-router-dom';
-import { getSubsidyDetail } from '../api';
+import { getSubsidyDetail, getSimilarSubsidies } from '../api';
 
 const Detail = () => {
   const { id } = useParams();
   const [subsidy, setSubsidy] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [similar, setSimilar] = useState([]);
 
   useEffect(() => {
     const fetchSubsidyDetail = async () => {
@@ -26,6 +27,20 @@ const Detail = () => {
     fetchSubsidyDetail();
   }, [id]);
 
+  // 類似する補助金（取得できなくても詳細は表示する）
+  useEffect(() => {
+    let cancelled = false;
+    setSimilar([]);
+    getSimilarSubsidies(id)
+      .then((data) => {
+        if (!cancelled) setSimilar(data);
+      })
+      .catch(() => {});
+    return () => {
+      cancelled = true;
+    };
+  }, [id]);
+
   // 期限表示用の日付フォーマッタ
   const formatDate = (dateString) => {
     if (!dateString) return '未設定';
@@ -171,6 +186,34 @@ const Detail = () => {
           </a>
         </div>
       </div>
+
+      {similar.length > 0 && (
+        <div className="bg-white rounded-lg shadow-md p-6 mt-6">
+          <h2 className="text-lg font-semibold mb-2 border-b pb-2">類似する補助金</h2>
+          <ul className="divide-y">
+            {similar.map((item) => (
+              <li key={item.id} className="py-3 flex justify-between items-start">
+                <div>
+                  <Link to={`/subsidies/${item.id}`} className="text-blue-600 hover:text-blue-800 font-semibold">
+                    {item.title}
+                  </Link>
+                  <div className="text-sm text-gray-600">
+                    {item.organization}
+                    {item.application_end && ` ・ 募集終了 ${formatDate(item.application_end)}`}
+                  </div>
+                </div>
+                <span className={`ml-4 px-2 py-1 text-xs font-bold rounded whitespace-nowrap ${
+                  item.is_active
+                    ? 'bg-green-100 text-green-800'
+                    : 'bg-red-100 text-red-800'
+                }`}>
+                  {item.is_active ? '募集中' : '終了'}
+                </span>
+              </li>
+            ))}
+          </ul>
+        </div>
+      )}
     </div>
   );
 };
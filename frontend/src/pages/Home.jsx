@@ -1,11 +1,19 @@
 import React, { useState, useEffect } from 'react';
 import SearchForm from '../components/SearchForm';
 import SubsidyCard from '../components/SubsidyCard';
-import { searchSubsidies, matchSubsidies, getSubsidyStats } from '../api';
+import { searchSubsidies, matchSubsidies, getSubsidyStats, getSubsidiesPage } from '../api';
+
+// 一覧の1ページの件数と、カードに表示する項目
+const PAGE_SIZE = 20;
+const CARD_FIELDS = [
+  'id', 'title', 'description', 'organization', 'target', 'amount', 'application_end', 'url', 'is_active',
+];
 
 const Home = () => {
   const [subsidies, setSubsidies] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null); // 一覧の続き（検索・マッチング結果では null）
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
   const [stats, setStats] = useState(null);
   const [searchMode, setSearchMode] = useState('search'); // 'search' or 'match'
@@ -38,9 +46,10 @@ const Home = () => {
       setLoading(true);
       setError(null);
 
-      // 募集中の補助金を取得
-      const result = await searchSubsidies({ activeOnly: true });
-      setSubsidies(result);
+      // 募集中の補助金の先頭ページを取得（続きは「さらに表示」でカーソルから取得）
+      const page = await getSubsidiesPage({ limit: PAGE_SIZE, fields: CARD_FIELDS, activeOnly: true });
+      setSubsidies(page.items);
+      setNextCursor(page.nextCursor);
     } catch (err) {
       console.error('補助金情報の取得に失敗:', err);
       setError('補助金情報の取得に失敗しました。後でもう一度お試しください。');
@@ -49,11 +58,29 @@ const Home = () => {
     }
   };
 
+  // 一覧の続きを取得
+  const fetchMore = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await getSubsidiesPage({
+        cursor: nextCursor, limit: PAGE_SIZE, fields: CARD_FIELDS, activeOnly: true,
+      });
+      setSubsidies((current) => [...current, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error('補助金情報の取得に失敗:', err);
+      setError('補助金情報の取得に失敗しました。後でもう一度お試しください。');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // 検索実行
   const handleSearch = async (searchParams) => {
     try {
       setLoading(true);
       setError(null);
+      setNextCursor(null);
 
       const result = await searchSubsidies(searchParams);
       setSubsidies(result);
@@ -72,6 +99,7 @@ const Home = () => {
     try {
       setLoading(true);
       setError(null);
+      setNextCursor(null);
 
       const result = await matchSubsidies({
         businessType,
@@ -255,6 +283,17 @@ const Home = () => {
                   <SubsidyCard key={subsidy.id} subsidy={subsidy} />
                 ))}
               </div>
+              {nextCursor && (
+                <div className="flex justify-center mt-6">
+                  <button
+                    className="btn btn-primary"
+                    onClick={fetchMore}
+                    disabled={loadingMore}
+                  >
+                    {loadingMore ? '読み込み中...' : 'さらに表示'}
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </div>